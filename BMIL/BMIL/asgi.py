@@ -2,6 +2,8 @@
 ASGI config for BMIL project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests served here resolve against BMIL.asgi_urls, which routes the
+read-heavy GET endpoints to native async views (authapp/async_views.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -9,8 +11,28 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BMIL.settings')
 
-application = get_asgi_application()
+ASGI_URLCONF = 'BMIL.asgi_urls'
+
+
+class AsyncReadsASGIHandler(ASGIHandler):
+    def create_request(self, scope, body_file):
+        # Per-request urlconf (honoured by Django's URL resolver), so
+        # ROOT_URLCONF stays BMIL.urls for WSGI, management commands and tests
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = ASGI_URLCONF
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = AsyncReadsASGIHandler()
+
+# Background jobs belong to server processes, not manage.py commands or tests
+from authapp.token_cleanup import start_compaction_scheduler  # noqa: E402
+
+start_compaction_scheduler()
@@ -0,0 +1,15 @@
+"""
+URL configuration used under ASGI (selected in BMIL/asgi.py).
+
+Identical to BMIL.urls except that authapp's read-heavy GET endpoints are
+served by native async views.
+"""
+from django.contrib import admin
+from django.urls import path, include
+from authapp.views import metrics
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
+    path('api/auth/', include('authapp.asgi_urls')),
+]
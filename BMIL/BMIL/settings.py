@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -49,6 +50,86 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'authapp.profiling.ProfiledJSONRenderer',  # JSONRenderer + serializer timing
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+# Lead catalog keyset pagination (?page_size= is capped at LEAD_MAX_PAGE_SIZE)
+LEAD_PAGE_SIZE = 20
+LEAD_MAX_PAGE_SIZE = 100
+
+# Offline gazetteer (CSV: name,latitude,longitude) that lead locations are
+# geocoded against on save; ?near= searches are capped at this radius
+LEAD_GAZETTEER = BASE_DIR / 'authapp' / 'data' / 'gazetteer.csv'
+LEAD_GEO_MAX_RADIUS_KM = 500
+
+# "Similar leads" on the lead detail (see authapp/similarity.py): feature
+# vectors are kept in DIR, one matrix file per database; NEIGHBORS per lead
+LEAD_SIMILARITY = {
+    'DIR': BASE_DIR / 'var' / 'similarity',
+    'NEIGHBORS': 8,
+}
+
+# Rows per bulk_create transaction for CSV/NDJSON lead imports
+LEAD_IMPORT_BATCH_SIZE = 1000
+
+# GST split applied to order subtotals (computed server-side)
+ORDER_CGST_RATE = '0.09'
+ORDER_SGST_RATE = '0.09'
+
+# Server worker processes (WEB_CONCURRENCY; gunicorn.conf.py sets it from
+# --workers). 'shared' is a cache every worker on this host can see.
+WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY') or 1)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'var' / 'shared_cache',
+    },
+}
+
+# Versioned lead response cache (see authapp/cache.py). Entries stay in each
+# process; with several workers the version lives in the 'shared' cache so a
+# write in one worker invalidates them all. Across hosts use
+# 'authapp.cache.SharedCacheBackend' with OPTIONS {'ALIAS': ...} pointing at
+# memcached/Redis in CACHES.
+LEAD_RESPONSE_CACHE = {
+    'ENABLED': True,
+    'BACKEND': 'authapp.cache.LocalLRUBackend',
+    'OPTIONS': {
+        'MAX_BYTES': 32 * 1024 * 1024,
+        'TIMEOUT': 60,
+        'VERSION_ALIAS': 'shared' if WEB_WORKERS > 1 else None,
+    },
+}
+
+# Rendered lead PDFs, keyed by a hash of the lead fields + template version
+LEAD_PDF_CACHE = {
+    'DIR': BASE_DIR / 'var' / 'pdf_cache',
+    'MAX_BYTES': 256 * 1024 * 1024,
+}
+
+# Bulk PDF export: render worker processes and max leads per request
+LEAD_PDF_RENDER_WORKERS = 2
+LEAD_BULK_EXPORT_MAX_LEADS = 100
+
+# Lead image downloads for PDFs: pooled, time-bounded, downscaled and cached
+# (PDFs rendered without their image are cached for NEGATIVE_TTL too)
+LEAD_IMAGE_FETCH = {
+    'CACHE_DIR': BASE_DIR / 'var' / 'image_cache',
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 5,
+    'TOTAL_TIMEOUT': 10,
+    'MAX_BYTES': 5 * 1024 * 1024,
+    'MAX_SIZE': (400, 300),  # 2x the 200x150 slot in the PDF
+    'NEGATIVE_TTL': 600,
+    'POOL_SIZE': 10,
+    'MAX_CACHE_BYTES': 64 * 1024 * 1024,  # Least recently used images evicted past this
 }
 
 SIMPLE_JWT = {
@@ -59,7 +140,59 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# In-process caches behind authapp.authentication: users are re-read after
+# USER_CACHE_TTL seconds (sooner in the process that saved them), blacklisted
+# refresh-token jtis are topped up every BLACKLIST_REFRESH_INTERVAL seconds
+JWT_AUTH_CACHE = {
+    'USER_CACHE_TTL': 60,
+    'USER_CACHE_SIZE': 10000,
+    'BLACKLIST_REFRESH_INTERVAL': 5,
+}
+
+# Expired refresh tokens are pruned by `manage.py compact_token_blacklist`
+# (cron; its option defaults come from here). Set INTERVAL (seconds) to also
+# run it in a background thread of each server process (BMIL/wsgi.py, asgi.py).
+TOKEN_BLACKLIST_COMPACTION = {
+    'INTERVAL': None,
+    'BATCH_SIZE': 1000,
+    'PAUSE': 0.05,
+    'MAX_SECONDS': 30,
+}
+
+# authapp.middleware.ProfilingMiddleware: SAMPLE_RATE (0..1) of requests get
+# query/SQL/serializer timings in a Server-Timing header and are checked for
+# N+1 patterns (the same normalized SQL more than N_PLUS_ONE_THRESHOLD times);
+# every request slower than SLOW_REQUEST_MS is logged to authapp.profiling
+REQUEST_PROFILING = {
+    'SAMPLE_RATE': float(os.environ.get('BMIL_PROFILE_SAMPLE_RATE', 0.01)),
+    'SLOW_REQUEST_MS': 500,
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'SERVER_TIMING': True,
+}
+
+# Bearer token Prometheus presents to scrape /metrics; without it only staff
+# sessions can read it. Multi-worker servers need PROMETHEUS_MULTIPROC_DIR
+# (see authapp/metrics.py and gunicorn.conf.py).
+METRICS_TOKEN = os.environ.get('BMIL_METRICS_TOKEN')
+
+# authapp loggers (profiling emits one JSON object per message) go to stderr
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'authapp': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 MIDDLEWARE = [
+    'authapp.middleware.ProfilingMiddleware',
+    'authapp.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,8 +200,11 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'authapp.middleware.ReadRoutingMiddleware',
 ]
 
+# Under ASGI, BMIL/asgi.py resolves requests against BMIL.asgi_urls instead,
+# which serves the read-heavy GET endpoints from native async views
 ROOT_URLCONF = 'BMIL.urls'
 
 TEMPLATES = [
@@ -93,13 +229,50 @@ AUTH_USER_MODEL = 'authapp.CustomUser'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite tuned for concurrent requests: WAL lets readers run alongside the
+# single writer, IMMEDIATE transactions take the write lock up front (a
+# read-then-write transaction then waits out busy_timeout instead of failing
+# with "database is locked"), and connections are reused between requests.
+# BMIL_DATABASE points the app at another file (bench_asgi_wsgi uses it).
+SQLITE_INIT_COMMAND = ';'.join([
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',  # Durable across app crashes; WAL makes it safe
+    'PRAGMA busy_timeout=20000',
+    'PRAGMA mmap_size=268435456',  # 256 MiB
+    'PRAGMA cache_size=-20000',  # 20 MB per connection
+    'PRAGMA temp_store=MEMORY',
+])
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'NAME': os.environ.get('BMIL_DATABASE', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Safe-method requests read through this alias (authapp.routers). It is the
+    # same file opened query-only unless BMIL_READ_REPLICA names a replica
+    # (e.g. one kept in sync by Litestream/LiteFS).
+    'read': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BMIL_READ_REPLICA', os.environ.get('BMIL_DATABASE', BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND + ';PRAGMA query_only=ON',
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
 
+DATABASE_ROUTERS = ['authapp.routers.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
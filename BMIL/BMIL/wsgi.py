@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BMIL.settings')
 
 application = get_wsgi_application()
+
+# Background jobs belong to server processes, not manage.py commands or tests
+from authapp.token_cleanup import start_compaction_scheduler  # noqa: E402
+
+start_compaction_scheduler()
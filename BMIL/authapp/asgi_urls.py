@@ -0,0 +1,19 @@
+"""authapp.urls with the read-heavy GET endpoints served by async views (ASGI only)."""
+from django.urls import path
+
+from . import urls
+from .async_views import CartListView, LeadDetailView, LeadListView, ReviewListView, WishlistListView, split_by_method
+
+ASYNC_VIEWS = {
+    'lead-list-create': LeadListView.as_view(),
+    'lead-detail': LeadDetailView.as_view(),
+    'review-list-create': ReviewListView.as_view(),
+    'wishlist-list': WishlistListView.as_view(),
+    'cart-list': CartListView.as_view(),
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), split_by_method(ASYNC_VIEWS[pattern.name], pattern.callback), name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in urls.urlpatterns
+]
@@ -0,0 +1,155 @@
+"""
+Native async versions of the read-heavy GET endpoints.
+
+Under ASGI these run on the event loop and use the async ORM, so a request
+only occupies a thread while a query is actually executing, not while a
+slow client is sending its request or reading the response. They return
+the same payloads as the DRF views in views.py (and share their response
+cache entries); BMIL/asgi_urls.py routes GETs here and every other method
+to the sync views.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+
+from .authentication import CachedJWTAuthentication
+from .cache import acached_payload
+from .filters import alead_facets, filter_leads, filter_reviews, geo_query
+from .geo import aranking_for, with_distances
+from .membership import awith_membership
+from .models import Cart, Lead, Review, Wishlist
+from .pagination import LeadCursorPagination, LeadDistancePagination, ReviewCursorPagination
+from .profiling import ProfiledJSONRenderer
+from .serializers import CartSerializer, LeadSerializer, ReviewSerializer, WishlistSerializer
+from .similarity import asimilar_leads
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(ProfiledJSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+class AsyncReadView(View):
+    """
+    Async counterpart of the DRF read views: JWT authentication through the
+    same user cache, DRF-shaped error bodies, JSON responses.
+    """
+    authenticator = CachedJWTAuthentication()
+    login_required = False
+
+    async def authenticate(self, request):
+        header = self.authenticator.get_header(request)
+        raw_token = None if header is None else self.authenticator.get_raw_token(header)
+        if raw_token is None:
+            return AnonymousUser()
+        token = self.authenticator.get_validated_token(raw_token)
+        user = self.authenticator.get_cached_user(token)
+        if user is None:
+            user = await sync_to_async(self.authenticator.get_user)(token)
+        return user
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authenticate(request)
+            if self.login_required and not request.user.is_authenticated:
+                raise NotAuthenticated()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def handle_exception(self, request, exc):
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = json_response(data, exc.status_code)
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            response['WWW-Authenticate'] = self.authenticator.authenticate_header(request)
+        return response
+
+
+class LeadListView(AsyncReadView):
+    async def get(self, request):
+        """Same contract as LeadListCreateView.get."""
+        drf_request = Request(request)
+        payload = await acached_payload('leads', [request.build_absolute_uri()], lambda: self.build_page(drf_request))
+        payload = {**payload, 'results': await awith_membership(request.user, payload['results'])}
+        return json_response(payload)
+
+    async def build_page(self, request):
+        leads = filter_leads(Lead.objects.all(), request.query_params)
+        query = geo_query(request.query_params)
+        if query is not None:
+            return await self.build_distance_page(request, leads, query)
+        paginator = LeadCursorPagination()
+        page = paginator.finalize_page([lead async for lead in paginator.get_page_queryset(leads, request)])
+        payload = paginator.get_paginated_payload(list(LeadSerializer(page, many=True).data))
+        if 'cursor' not in request.query_params and request.query_params.get('facets') != '0':
+            payload['facets'] = await alead_facets(leads)
+        return payload
+
+    async def build_distance_page(self, request, leads, query):
+        paginator = LeadDistancePagination()
+        page = paginator.paginate_ranking(await aranking_for(leads, query), request, limit=query[3])
+        by_id = await Lead.objects.ain_bulk([lead_id for _, lead_id in page])
+        data = LeadSerializer([by_id[lead_id] for _, lead_id in page], many=True).data
+        return paginator.get_paginated_payload(with_distances(data, page))
+
+
+class LeadDetailView(AsyncReadView):
+    async def get(self, request, lead_id):
+        data = await acached_payload('lead', [lead_id], lambda: self.build_detail(lead_id))
+        if data is None:
+            return json_response({"error": "Lead not found"}, status.HTTP_404_NOT_FOUND)
+        return json_response((await awith_membership(request.user, [data]))[0])
+
+    async def build_detail(self, lead_id):
+        lead = await Lead.objects.filter(id=lead_id).afirst()
+        if lead is None:
+            return None
+        return {**LeadSerializer(lead).data, 'similar_leads': await asimilar_leads(lead.pk)}
+
+
+class ReviewListView(AsyncReadView):
+    async def get(self, request, lead_id):
+        """Same contract as ReviewListCreateView.get."""
+        drf_request = Request(request)
+        reviews = filter_reviews(Review.objects.filter(lead_id=lead_id), drf_request.query_params)
+        paginator = ReviewCursorPagination()
+        page = paginator.finalize_page([review async for review in paginator.get_page_queryset(reviews, drf_request)])
+        return json_response(paginator.get_paginated_payload(ReviewSerializer(page, many=True).data))
+
+
+class WishlistListView(AsyncReadView):
+    login_required = True
+
+    async def get(self, request):
+        wishlists = [item async for item in Wishlist.objects.filter(user=request.user)]
+        return json_response(WishlistSerializer(wishlists, many=True).data)
+
+
+class CartListView(AsyncReadView):
+    login_required = True
+
+    async def get(self, request):
+        cart_items = [item async for item in Cart.objects.filter(user=request.user)]
+        return json_response(CartSerializer(cart_items, many=True).data)
+
+
+def split_by_method(async_view, sync_view):
+    """
+    One URL, two implementations: GET/HEAD go to `async_view`, everything else
+    to the (DRF) `sync_view` in the thread-sensitive executor.
+    """
+    sync_view_async = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_view_async(request, *args, **kwargs)
+
+    # JWT-authenticated API: like DRF's APIView, no session CSRF check
+    view = csrf_exempt(view)
+    view.async_view, view.sync_view = async_view, sync_view  # For authapp.profiling.view_name
+    return view
@@ -0,0 +1,156 @@
+"""
+JWT authentication without a database round trip per request.
+
+CachedJWTAuthentication resolves the token's user through a small in-process
+TTL cache (invalidated on user save/delete in this process; other worker
+processes pick up changes within USER_CACHE_TTL). Refresh-token blacklist
+checks are answered from an in-memory set of blacklisted jtis that is
+topped up incrementally from BlacklistedToken.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class TTLUserCache:
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._users = {}  # user_id -> (expires_at, user)
+
+    def get(self, user_id):
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return copy.deepcopy(entry[1])  # Callers may mutate request.user
+
+    def set(self, user_id, user):
+        with self._lock:
+            if len(self._users) >= self.max_entries:
+                self._users.clear()  # Crude but bounded; entries refill on demand
+            self._users[user_id] = (time.monotonic() + self.ttl, copy.deepcopy(user))
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+class BlacklistCache:
+    """
+    Set of blacklisted jtis, refreshed at most every `refresh_interval`
+    seconds by loading only rows newer than the last one seen. A full
+    reload every `full_reload_interval` drops jtis whose rows were compacted
+    away.
+    """
+
+    def __init__(self, refresh_interval=5, full_reload_interval=3600):
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self._lock = threading.Lock()
+        self._jtis = set()
+        self._last_id = 0
+        self._refreshed_at = None
+        self._reloaded_at = None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._reloaded_at is None or now - self._reloaded_at > self.full_reload_interval:
+            self._jtis = set()
+            self._last_id = 0
+            self._reloaded_at = now
+        rows = BlacklistedToken.objects.filter(id__gt=self._last_id).order_by('id').values_list('id', 'token__jti')
+        for row_id, jti in rows.iterator(chunk_size=5000):
+            self._jtis.add(jti)
+            self._last_id = row_id
+        self._refreshed_at = now
+
+    def contains(self, jti):
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.refresh_interval:
+            with self._lock:
+                if self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.refresh_interval:
+                    self._refresh()
+        return jti in self._jtis
+
+    def add(self, jti):
+        self._jtis.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._jtis = set()
+            self._last_id = 0
+            self._refreshed_at = None
+            self._reloaded_at = None
+
+
+user_cache = TTLUserCache()
+blacklist_cache = BlacklistCache()
+
+
+def configure_caches():
+    """Apply settings.JWT_AUTH_CACHE to both caches and empty them (again on setting_changed)."""
+    config = getattr(settings, 'JWT_AUTH_CACHE', {})
+    user_cache.ttl = config.get('USER_CACHE_TTL', 60)
+    user_cache.max_entries = config.get('USER_CACHE_SIZE', 10000)
+    user_cache.clear()
+    blacklist_cache.refresh_interval = config.get('BLACKLIST_REFRESH_INTERVAL', 5)
+    blacklist_cache.reset()
+
+
+configure_caches()
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check reads the in-memory jti set."""
+
+    def check_blacklist(self):
+        if blacklist_cache.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_cache.add(self.payload[api_settings.JTI_CLAIM])  # Visible here before the next refresh
+        return result
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves the user from `user_cache` when it can."""
+
+    def get_user(self, validated_token):
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(validated_token[api_settings.USER_ID_CLAIM], user)
+        return user
+
+    def get_cached_user(self, validated_token):
+        """The token's user from `user_cache`, or None on a miss (no database access)."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            return None
+
+        # Same checks the parent performs after its database lookup
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,104 @@
+"""
+Helpers shared by the bench_* management commands.
+
+Benchmarks run against a throwaway test database (the same one `manage.py
+test` would create), never against the configured one, and render PDFs and
+fetch lead images into throwaway cache directories.
+"""
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+
+from . import bulk_pdf, images, pdf
+
+
+def _reset_file_caches():
+    # Rebuilt from (overridden) settings on next use; render workers fork afresh
+    pdf._pdf_cache = None
+    images._fetcher = None
+    bulk_pdf._reset_pool()
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    setup_test_environment()
+    old_config = setup_databases(verbosity=verbosity, interactive=False)
+    cache_dir = tempfile.mkdtemp(prefix='bmil-bench-')
+    caches = override_settings(
+        LEAD_PDF_CACHE={**settings.LEAD_PDF_CACHE, 'DIR': f'{cache_dir}/pdf'},
+        LEAD_IMAGE_FETCH={**settings.LEAD_IMAGE_FETCH, 'CACHE_DIR': f'{cache_dir}/images'},
+    )
+    caches.enable()
+    _reset_file_caches()
+    try:
+        yield
+    finally:
+        _reset_file_caches()
+        caches.disable()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        teardown_databases(old_config, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples, queries=None):
+    """Latency summary in milliseconds (+ mean queries per call when given)."""
+    summary = {
+        'n': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+    if queries is not None:
+        summary['queries'] = statistics.fmean(queries) if queries else 0.0
+    return summary
+
+
+class CaptureAllQueries:
+    """CaptureQueriesContext over every alias, since reads may be routed to 'read'."""
+
+    def __init__(self):
+        self.contexts = [CaptureQueriesContext(connections[alias]) for alias in connections]
+
+    def __enter__(self):
+        for context in self.contexts:
+            context.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for context in reversed(self.contexts):
+            context.__exit__(*exc_info)
+
+    def __len__(self):
+        return sum(len(context) for context in self.contexts)
+
+
+def measure(fn, iterations, warmup=1):
+    """Call `fn` repeatedly; return (latency samples in seconds, query counts)."""
+    for _ in range(warmup):
+        fn()
+    samples, queries = [], []
+    for _ in range(iterations):
+        with CaptureAllQueries() as captured:
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+        queries.append(len(captured))
+    return samples, queries
@@ -0,0 +1,142 @@
+"""
+Bulk lead PDF export.
+
+Pages are rendered in a process pool (ReportLab is CPU-bound and holds the
+GIL) straight into the content-addressed PdfCache, so a bulk export warms
+the same files single downloads use. Workers only receive plain snapshot
+dicts; the response is streamed from the cached files as each one is ready.
+"""
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import django
+from django.apps import apps
+from django.conf import settings
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from .images import get_image_fetcher
+from .pdf import draw_lead_page, get_pdf_cache
+
+CHUNK_SIZE = 64 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # Spawned (non-fork) workers start without Django configured
+    if not apps.ready:
+        django.setup()
+
+
+def get_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.LEAD_PDF_RENDER_WORKERS, initializer=_init_worker)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def render_merged_pdf(snapshot):
+    """Render several leads as consecutive pages of one document."""
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    complete = True
+    for lead in snapshot['leads']:
+        complete = draw_lead_page(pdf, lead) and complete
+    pdf.save()
+    return buffer.getvalue(), complete
+
+
+def render_single_task(snapshot):
+    return snapshot['id'], get_pdf_cache().get_or_render(snapshot)
+
+
+def prefetch_image_task(url):
+    return get_image_fetcher().fetch(url)
+
+
+def render_merged_task(snapshot):
+    return get_pdf_cache().get_or_render(snapshot, render=render_merged_pdf)
+
+
+def _submit(fn, *args):
+    try:
+        return get_render_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        _reset_pool()
+        return get_render_pool().submit(fn, *args)
+
+
+class _StreamBuffer:
+    """Write-only sink for ZipFile; with no seek() zipfile falls back to streaming mode."""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _read_chunks(path):
+    with open(path, 'rb') as pdf_file:
+        while chunk := pdf_file.read(CHUNK_SIZE):
+            yield chunk
+
+
+def stream_zip(snapshots):
+    """Yield a ZIP of per-lead PDFs, adding each entry as soon as its render finishes."""
+    futures = [_submit(render_single_task, snapshot) for snapshot in snapshots]
+    buffer = _StreamBuffer()
+    try:
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for future in as_completed(futures):
+                lead_id, path = future.result()
+                with archive.open(f'lead_{lead_id}.pdf', 'w') as entry:
+                    for chunk in _read_chunks(path):
+                        entry.write(chunk)
+                        if data := buffer.drain():
+                            yield data
+        yield buffer.drain()  # Central directory
+    finally:
+        for future in futures:
+            future.cancel()  # Client went away: drop renders that haven't started
+
+
+def stream_merged(snapshots):
+    """
+    Yield one PDF containing every lead, in the requested order. ReportLab
+    can't append to a finished document, so the pool fetches the images in
+    parallel and a single worker lays out the pages.
+    """
+    urls = {snapshot['image_url'] for snapshot in snapshots if snapshot['image_url']}
+    for future in [_submit(prefetch_image_task, url) for url in urls]:
+        future.result()
+    path = _submit(render_merged_task, {'leads': snapshots}).result()
+    yield from _read_chunks(path)
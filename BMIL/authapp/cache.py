@@ -0,0 +1,283 @@
+"""
+Versioned response cache for the lead catalog.
+
+Every cache key embeds the current catalog version, so a write never has to
+find and delete entries: bumping the version makes all older entries
+unreachable and they age out through normal eviction.
+
+Backends are configured through settings.LEAD_RESPONSE_CACHE:
+
+    LocalLRUBackend   in-process LRU bounded by MAX_BYTES. Each worker keeps
+                      its own entries; with VERSION_ALIAS the version is read
+                      from that (cross-process) Django cache, so a write in
+                      one worker orphans every worker's entries at once.
+                      Without it a write is seen by other workers only after
+                      TIMEOUT seconds.
+    SharedCacheBackend stores entries and the version in a Django cache
+                      alias (memcached, Redis, ...) shared by all workers.
+"""
+import json
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+VERSION_KEY = 'authapp:catalog-version'
+
+
+def _payload_size(value):
+    return len(json.dumps(value, default=str, separators=(',', ':')))
+
+
+def _shared_version(cache):
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def _bump_shared_version(cache):
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:  # Key missing (evicted or never set)
+        cache.add(VERSION_KEY, 2, None)
+        return cache.get(VERSION_KEY, 2)
+
+
+class BaseResponseCache(ABC):
+    in_process = False  # True if get/set never block on I/O (safe on an event loop)
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    @abstractmethod
+    def get(self, key):
+        """The cached value for `key`, or None on a miss."""
+
+    @abstractmethod
+    def set(self, key, value):
+        """Store `value` (a JSON-serializable payload) under `key`."""
+
+    @abstractmethod
+    def get_version(self):
+        """The current catalog version embedded in keys."""
+
+    @abstractmethod
+    def bump_version(self):
+        """Advance the catalog version, orphaning every older entry."""
+
+    @abstractmethod
+    def clear(self):
+        """Drop (or orphan) every entry."""
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'version': self.get_version(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'sets': self.sets,
+            'evictions': self.evictions,
+        }
+
+
+class LocalLRUBackend(BaseResponseCache):
+    """In-process LRU, evicting least recently used entries once MAX_BYTES is exceeded."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, timeout=60, version_alias=None):
+        super().__init__(timeout)
+        self.max_bytes = max_bytes
+        self.version_alias = version_alias
+        self.in_process = version_alias is None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._version = 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value):
+        size = _payload_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.timeout, size, value)
+            self._bytes += size
+            self.sets += 1
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_version(self):
+        if self.version_alias is not None:
+            return _shared_version(caches[self.version_alias])
+        return self._version
+
+    def bump_version(self):
+        if self.version_alias is not None:
+            return _bump_shared_version(caches[self.version_alias])
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        data = super().stats()
+        data.update({'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes})
+        return data
+
+
+class SharedCacheBackend(BaseResponseCache):
+    """Entries and version live in a Django cache alias shared between workers."""
+
+    def __init__(self, alias='default', timeout=300):
+        super().__init__(timeout)
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        value = self.cache.get(key)
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+        self._count('sets')
+
+    def get_version(self):
+        return _shared_version(self.cache)
+
+    def bump_version(self):
+        return _bump_shared_version(self.cache)
+
+    def clear(self):
+        self.bump_version()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'LEAD_RESPONSE_CACHE', {})
+                backend_class = import_string(config.get('BACKEND', 'authapp.cache.LocalLRUBackend'))
+                options = {name.lower(): value for name, value in config.get('OPTIONS', {}).items()}
+                _backend = backend_class(**options)
+    return _backend
+
+
+def reset_response_cache():
+    """Drop the configured backend so the next call rebuilds it from settings (tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def cache_enabled():
+    return getattr(settings, 'LEAD_RESPONSE_CACHE', {}).get('ENABLED', True)
+
+
+def catalog_key(namespace, *parts):
+    version = get_response_cache().get_version()
+    return ':'.join(['authapp', namespace, f'v{version}', *map(str, parts)])
+
+
+def cached_payload(namespace, parts, build):
+    """
+    Return the cached payload for `parts`, calling `build()` on a miss.
+    A `None` result from `build()` (e.g. not found) is not cached.
+    """
+    if not cache_enabled():
+        return build()
+    backend = get_response_cache()
+    key = catalog_key(namespace, *parts)
+    payload = backend.get(key)
+    if payload is None:
+        payload = build()
+        if payload is not None:
+            backend.set(key, payload)
+    return payload
+
+
+async def acached_payload(namespace, parts, build):
+    """cached_payload() for async views; `build` is a coroutine function."""
+    if not cache_enabled():
+        return await build()
+    backend = get_response_cache()
+    if backend.in_process:
+        key = catalog_key(namespace, *parts)
+        payload = backend.get(key)
+    else:
+        key = await sync_to_async(catalog_key)(namespace, *parts)
+        payload = await sync_to_async(backend.get)(key)
+    if payload is None:
+        payload = await build()
+        if payload is not None:
+            if backend.in_process:
+                backend.set(key, payload)
+            else:
+                await sync_to_async(backend.set)(key, payload)
+    return payload
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached lead response. The version is bumped right away
+    and again on commit, so a reader that cached pre-commit data in between
+    can't leave it visible under the final version.
+    """
+    backend = get_response_cache()
+    backend.bump_version()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(backend.bump_version)
+
+
+def cache_stats():
+    return get_response_cache().stats()
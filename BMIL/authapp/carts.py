@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from rest_framework.exceptions import ValidationError
+
+from .models import Cart, Lead
+from .pricing import compute_totals, unit_price
+
+
+def collapse_operations(operations):
+    """
+    Reduce an ordered list of {lead, action, quantity} operations to one net
+    change per lead: ('add', n), ('set', n) or ('remove', None).
+    """
+    net = {}
+    for op in operations:
+        lead_id, action, quantity = op['lead'], op['action'], op.get('quantity', 1)
+        current = net.get(lead_id)
+        if action == 'remove' or (action == 'set' and quantity == 0):
+            net[lead_id] = ('remove', None)
+        elif action == 'set':
+            net[lead_id] = ('set', quantity)
+        elif current is None:
+            net[lead_id] = ('add', quantity)
+        elif current[0] == 'remove':
+            net[lead_id] = ('set', quantity)
+        else:
+            net[lead_id] = (current[0], current[1] + quantity)
+    return net
+
+
+def apply_cart_operations(user, operations):
+    """
+    Apply many cart changes in one transaction with a fixed number of
+    queries. Increments are done by the database (quantity = quantity + n),
+    so concurrent requests adding the same lead never lose an update.
+    """
+    net = collapse_operations(operations)
+    removes = [lead_id for lead_id, (action, _) in net.items() if action == 'remove']
+    sets = {lead_id: qty for lead_id, (action, qty) in net.items() if action == 'set'}
+    adds = {lead_id: qty for lead_id, (action, qty) in net.items() if action == 'add'}
+
+    wanted = set(sets) | set(adds)
+    if wanted:
+        found = set(Lead.objects.filter(id__in=wanted).values_list('id', flat=True))
+        missing = sorted(wanted - found)
+        if missing:
+            raise ValidationError({'operations': [f"Lead {lead_id} not found" for lead_id in missing]})
+
+    with transaction.atomic():
+        if removes:
+            Cart.objects.filter(user=user, lead_id__in=removes).delete()
+        if sets:
+            Cart.objects.bulk_create(
+                [Cart(user=user, lead_id=lead_id, quantity=qty) for lead_id, qty in sets.items()],
+                update_conflicts=True, unique_fields=['user', 'lead'], update_fields=['quantity'],
+            )
+        if adds:
+            # Make sure every row exists, then increment them all in one UPDATE
+            Cart.objects.bulk_create(
+                [Cart(user=user, lead_id=lead_id, quantity=0) for lead_id in adds],
+                ignore_conflicts=True,
+            )
+            Cart.objects.filter(user=user, lead_id__in=adds).update(
+                quantity=F('quantity') + Case(
+                    *[When(lead_id=lead_id, then=Value(qty)) for lead_id, qty in adds.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+            )
+
+
+def cart_summary(user):
+    """The user's full cart with line and order totals, from one joined query."""
+    rows = (
+        Cart.objects.filter(user=user)
+        .order_by('created_at', 'id')
+        .values_list('id', 'lead_id', 'lead__name', 'quantity', 'created_at', 'lead__price', 'lead__discount_price')
+    )
+    items = []
+    priced = []
+    for cart_id, lead_id, lead_name, quantity, created_at, price, discount_price in rows:
+        price = unit_price(price, discount_price)
+        items.append({
+            'id': cart_id,
+            'lead': lead_id,
+            'lead_name': lead_name,
+            'quantity': quantity,
+            'unit_price': price,
+            'line_total': price * quantity if price is not None else None,
+            'created_at': created_at,
+        })
+        if price is not None:
+            priced.append((price, quantity))
+    return {'items': items, **compute_totals(priced)}
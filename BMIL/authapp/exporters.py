@@ -0,0 +1,109 @@
+"""
+Streaming lead export to CSV / NDJSON.
+
+Rows come from `values_list()` through `iterator(chunk_size=...)`, so no model
+instances are built and only one chunk is in memory at a time. The
+generators start yielding right away, so the first byte goes out before
+the query finishes.
+"""
+import csv
+import json
+from datetime import datetime
+from io import StringIO
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+
+from .filters import filter_leads
+
+CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = (
+    'id', 'name', 'location', 'property_type', 'property_status', 'service_required_on',
+    'budget', 'requirement', 'tags', 'image_url', 'price', 'discount_price',
+    'rating_avg', 'rating_count', 'created_at',
+)
+
+# Spreadsheets evaluate cells starting with these as formulas (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _ErrorAsJsonRenderer(BaseRenderer):
+    """Streaming export formats; error responses are rendered as JSON text."""
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class CSVRenderer(_ErrorAsJsonRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(_ErrorAsJsonRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+def _parse_moment(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        day = None if moment else parse_date(value)
+    except ValueError:  # Well formed but not a real date, e.g. 2024-02-30
+        moment = day = None
+    if moment is None:
+        if day is None:
+            raise ValidationError({name: ['Use an ISO 8601 date or datetime.']})
+        moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(queryset, params):
+    """Apply the lead list filters plus a ?created_after= / ?created_before= window."""
+    queryset = filter_leads(queryset, params)
+    created_after = _parse_moment(params, 'created_after')
+    created_before = _parse_moment(params, 'created_before')
+    if created_after:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset.order_by('created_at', 'id').values_list(*EXPORT_FIELDS)
+
+
+def _csv_safe(row):
+    return [f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+            for value in row]
+
+
+def stream_csv(rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for index, row in enumerate(rows.iterator(chunk_size=CHUNK_SIZE)):
+        writer.writerow(_csv_safe(row))
+        if index % CHUNK_SIZE == 0:  # Index 0 sends the header straight away
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    lines = []
+    for index, row in enumerate(rows.iterator(chunk_size=CHUNK_SIZE)):
+        lines.append(encoder.encode(dict(zip(EXPORT_FIELDS, row))))
+        if index % CHUNK_SIZE == 0:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
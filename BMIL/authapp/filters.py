@@ -0,0 +1,174 @@
+import math
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, Value, When
+from rest_framework.exceptions import ValidationError
+
+from .tags import filter_by_tags
+
+# Budget facet buckets as (label, lower bound inclusive, upper bound exclusive)
+BUDGET_BUCKETS = [
+    ('under_1l', None, Decimal('100000')),
+    ('1l_5l', Decimal('100000'), Decimal('500000')),
+    ('5l_10l', Decimal('500000'), Decimal('1000000')),
+    ('10l_25l', Decimal('1000000'), Decimal('2500000')),
+    ('25l_plus', Decimal('2500000'), None),
+]
+
+# Query parameter -> Lead field; comma-separated values mean "any of"
+CHOICE_FILTERS = {
+    'location': 'location',
+    'property_type': 'property_type',
+    'property_status': 'property_status',
+}
+
+
+def _split(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def _decimal_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: ['A valid number is required.']})
+    if not number.is_finite():  # NaN / Infinity parse, but can't be compared with a budget
+        raise ValidationError({name: ['A valid number is required.']})
+    return number
+
+
+def filter_leads(queryset, params):
+    """
+    Apply ?location=, ?property_type=, ?property_status=, ?budget_min=,
+    ?budget_max= and ?tags= (with ?tags_match=any|all) to a Lead queryset.
+    Matches are exact so the composite and tag indexes can be used.
+    """
+    for param, field in CHOICE_FILTERS.items():
+        values = _split(params.get(param, ''))
+        if len(values) == 1:
+            queryset = queryset.filter(**{field: values[0]})
+        elif values:
+            queryset = queryset.filter(**{f'{field}__in': values})
+
+    budget_min = _decimal_param(params, 'budget_min')
+    budget_max = _decimal_param(params, 'budget_max')
+    if budget_min is not None:
+        queryset = queryset.filter(budget__gte=budget_min)
+    if budget_max is not None:
+        queryset = queryset.filter(budget__lte=budget_max)
+
+    tag_names = _split(params.get('tags', ''))
+    if tag_names:
+        match = params.get('tags_match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'tags_match': ['Must be "any" or "all".']})
+        queryset = filter_by_tags(queryset, tag_names, match)
+    return queryset
+
+
+def filter_reviews(queryset, params):
+    """Apply ?min_rating= (1-5) to a lead's Review queryset."""
+    value = params.get('min_rating')
+    if value in (None, ''):
+        return queryset
+    try:
+        min_rating = int(value)
+    except ValueError:
+        raise ValidationError({'min_rating': ['A valid integer is required.']})
+    if not 1 <= min_rating <= 5:
+        raise ValidationError({'min_rating': ['Must be between 1 and 5.']})
+    return queryset.filter(rating__gte=min_rating)
+
+
+def budget_bucket_expression():
+    whens = []
+    for label, low, high in BUDGET_BUCKETS:
+        bounds = {}
+        if low is not None:
+            bounds['budget__gte'] = low
+        if high is not None:
+            bounds['budget__lt'] = high
+        whens.append(When(then=Value(label), **bounds))
+    return Case(*whens, output_field=CharField())
+
+
+def lead_facet_rows(queryset):
+    return (
+        queryset.order_by()
+        .annotate(budget_bucket=budget_bucket_expression())
+        .values('property_type', 'property_status', 'budget_bucket')
+        .annotate(count=Count('id'))
+    )
+
+
+def fold_facets(rows):
+    facets = {
+        'property_type': {},
+        'property_status': {},
+        'budget': {label: 0 for label, _, _ in BUDGET_BUCKETS},
+    }
+    for row in rows:
+        count = row['count']
+        for facet in ('property_type', 'property_status'):
+            facets[facet][row[facet]] = facets[facet].get(row[facet], 0) + count
+        facets['budget'][row['budget_bucket']] += count
+    return facets
+
+
+def lead_facets(queryset):
+    """
+    Count leads per property type, per status and per budget bucket.
+
+    All three facets come from a single GROUP BY over the combination of the
+    three dimensions, rolled up in Python (the number of
+    groups is bounded by the distinct combinations, not the number of leads).
+    """
+    return fold_facets(lead_facet_rows(queryset))
+
+
+async def alead_facets(queryset):
+    return fold_facets([row async for row in lead_facet_rows(queryset)])
+
+
+def _float_param(params, name, low, high):
+    try:
+        value = float(params[name])
+    except ValueError:
+        raise ValidationError({name: ['A valid number is required.']})
+    if not (low <= value <= high) or math.isnan(value):
+        raise ValidationError({name: [f'Must be between {low} and {high}.']})
+    return value
+
+
+def geo_query(params):
+    """
+    Parse ?near=<lat>,<lon> with ?radius_km= and/or ?nearest=<k>.
+    Returns None when ?near= is absent, else (latitude, longitude, radius_km, k).
+    """
+    near = params.get('near')
+    if not near:
+        if 'radius_km' in params or 'nearest' in params:
+            raise ValidationError({'near': ['Required with radius_km or nearest.']})
+        return None
+    try:
+        latitude, longitude = (float(part) for part in near.split(','))
+    except ValueError:
+        raise ValidationError({'near': ['Expected "<latitude>,<longitude>".']})
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError({'near': ['Coordinates out of range.']})
+    radius_km = _float_param(params, 'radius_km', 0, settings.LEAD_GEO_MAX_RADIUS_KM) if 'radius_km' in params else None
+    k = None
+    if 'nearest' in params:
+        try:
+            k = int(params['nearest'])
+        except ValueError:
+            raise ValidationError({'nearest': ['A valid integer is required.']})
+        if not 1 <= k <= settings.LEAD_MAX_PAGE_SIZE:
+            raise ValidationError({'nearest': [f'Must be between 1 and {settings.LEAD_MAX_PAGE_SIZE}.']})
+    if radius_km is None and k is None:
+        raise ValidationError({'near': ['Give radius_km and/or nearest.']})
+    return latitude, longitude, radius_km, k
@@ -0,0 +1,233 @@
+"""
+Lead coordinates and "near a point" queries.
+
+Coordinates come from an offline gazetteer (settings.LEAD_GAZETTEER, a CSV of
+name,latitude,longitude) matched against the free-text location, so writes
+never wait on a geocoding service. Each located lead also stores a geohash;
+nearby leads share its prefix, so a search reads the few cells covering the
+circle as index range scans on `lead_geohash_idx` and then checks the exact
+haversine distance of just those candidates. The work done grows
+with the number of leads near the point, not with the catalog.
+
+Lead.save() imports this module, so it stays free of request handling; the
+?near= parameters are parsed by authapp.filters.geo_query.
+"""
+import csv
+import math
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Q
+
+GEOHASH_PRECISION = 9  # ~5m x 5m cells
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _normalize_place(value):
+    return _WHITESPACE.sub(' ', value).strip().lower()
+
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    with open(settings.LEAD_GAZETTEER, newline='', encoding='utf-8') as source:
+        return {
+            _normalize_place(row['name']): (float(row['latitude']), float(row['longitude']))
+            for row in csv.DictReader(source)
+        }
+
+
+def geocode(location):
+    """
+    (latitude, longitude) for a free-text location, or None.
+
+    The whole string is tried first, then its comma-separated parts from the
+    most specific one ("Baner, Pune" falls back to Pune).
+    """
+    if not location:
+        return None
+    places = gazetteer()
+    normalized = _normalize_place(location)
+    if normalized in places:
+        return places[normalized]
+    for part in normalized.split(','):
+        part = part.strip()
+        if part in places:
+            return places[part]
+    return None
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def fill_coordinates(lead, relocate=False):
+    """
+    Set lead.latitude/longitude from its location (when missing, or always
+    with `relocate`) and lead.geohash from the coordinates.
+    """
+    if relocate or lead.latitude is None or lead.longitude is None:
+        lead.latitude, lead.longitude = geocode(lead.location) or (None, None)
+    if lead.latitude is None or lead.longitude is None:
+        lead.geohash = None
+    else:
+        lead.geohash = encode_geohash(lead.latitude, lead.longitude)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# A search reads at most this many geohash cells (one index range each)
+MAX_COVER_CELLS = 32
+
+
+def covering_cells(latitude, longitude, radius_km, precision):
+    """
+    Geohash cells of `precision` covering the circle's bounding box, or None
+    if that takes more than MAX_COVER_CELLS.
+    """
+    height, width = cell_size(precision)
+    lat_span = radius_km / KM_PER_DEGREE
+    south, north = max(-90.0, latitude - lat_span), min(90.0, latitude + lat_span)
+    shrink = math.cos(math.radians(max(abs(south), abs(north))))
+    lon_span = 180.0 if shrink < 1e-9 else min(180.0, radius_km / (KM_PER_DEGREE * shrink))
+    rows = range(math.floor((south + 90) / height), math.floor((min(north, 89.999999) + 90) / height) + 1)
+    columns = range(math.floor((longitude - lon_span + 180) / width), math.floor((longitude + lon_span + 180) / width) + 1)
+    if len(rows) * len(columns) > MAX_COVER_CELLS:
+        return None
+    return sorted({
+        encode_geohash(-90 + (row + 0.5) * height, (column + 0.5) * width % 360 - 180, precision)
+        for row in rows for column in columns
+    })
+
+
+def cells_filter(cells):
+    # Ranges rather than __startswith: LIKE can't use the index on SQLite
+    condition = Q()
+    for cell in cells:
+        condition |= Q(geohash__gte=cell, geohash__lt=cell + '~')
+    return condition
+
+
+def candidates(queryset, latitude, longitude, radius_km):
+    """(id, latitude, longitude) rows of every lead that may lie within radius_km."""
+    located = queryset.order_by().filter(geohash__isnull=False)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cells = covering_cells(latitude, longitude, radius_km, precision)
+        if cells is not None:
+            located = located.filter(cells_filter(cells))
+            break
+    return located.values_list('id', 'latitude', 'longitude')
+
+
+def rank(rows, latitude, longitude, radius_km=math.inf):
+    """[(distance_km, lead_id)] within radius_km, nearest first."""
+    ranked = []
+    for lead_id, lead_latitude, lead_longitude in rows:
+        distance = haversine_km(latitude, longitude, lead_latitude, lead_longitude)
+        if distance <= radius_km:
+            ranked.append((distance, lead_id))
+    ranked.sort()
+    return ranked
+
+
+def leads_within(queryset, latitude, longitude, radius_km):
+    return rank(candidates(queryset, latitude, longitude, radius_km), latitude, longitude, radius_km)
+
+
+async def aleads_within(queryset, latitude, longitude, radius_km):
+    rows = candidates(queryset, latitude, longitude, radius_km)
+    return rank([row async for row in rows], latitude, longitude, radius_km)
+
+
+# Nearest-k searches a growing radius until it holds k leads. Candidates
+# from the covering cells beyond the radius still bound the answer: with k
+# of them, the k-th distance is a radius that certainly holds the k nearest.
+NEAREST_START_KM = 1
+NEAREST_GROWTH = 4
+HALF_EARTH_KM = math.pi * EARTH_RADIUS_KM
+
+
+def _next_radius(ranked, radius_km, k):
+    """None when `ranked` (all candidates for radius_km) settles the k nearest, else the radius to try next."""
+    if len(ranked) >= k and ranked[k - 1][0] <= radius_km or radius_km >= HALF_EARTH_KM:
+        return None
+    if len(ranked) >= k:
+        return ranked[k - 1][0]
+    return min(radius_km * NEAREST_GROWTH, HALF_EARTH_KM)
+
+
+def nearest_leads(queryset, latitude, longitude, k):
+    radius_km = NEAREST_START_KM
+    while True:
+        ranked = rank(candidates(queryset, latitude, longitude, radius_km), latitude, longitude)
+        next_radius = _next_radius(ranked, radius_km, k)
+        if next_radius is None:
+            return ranked[:k]
+        radius_km = next_radius
+
+
+async def anearest_leads(queryset, latitude, longitude, k):
+    radius_km = NEAREST_START_KM
+    while True:
+        rows = candidates(queryset, latitude, longitude, radius_km)
+        ranked = rank([row async for row in rows], latitude, longitude)
+        next_radius = _next_radius(ranked, radius_km, k)
+        if next_radius is None:
+            return ranked[:k]
+        radius_km = next_radius
+
+
+def _within(ranked, radius_km):
+    return ranked if radius_km is None else [row for row in ranked if row[0] <= radius_km]
+
+
+def ranking_for(queryset, query):
+    """[(distance_km, lead_id)] for a geo_query(): all within radius_km, or the k nearest (within radius_km)."""
+    latitude, longitude, radius_km, k = query
+    if k is None:
+        return leads_within(queryset, latitude, longitude, radius_km)
+    return _within(nearest_leads(queryset, latitude, longitude, k), radius_km)
+
+
+async def aranking_for(queryset, query):
+    latitude, longitude, radius_km, k = query
+    if k is None:
+        return await aleads_within(queryset, latitude, longitude, radius_km)
+    return _within(await anearest_leads(queryset, latitude, longitude, k), radius_km)
+
+
+def with_distances(data, page):
+    """Serialized leads (in `page` order) with their distance_km."""
+    return [{**row, 'distance_km': round(distance, 3)} for row, (distance, _) in zip(data, page)]
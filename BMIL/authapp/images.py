@@ -0,0 +1,194 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+from requests.adapters import HTTPAdapter
+
+from .metrics import IMAGE_FETCH, timed
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+class ImageFetcher:
+    """
+    Fetches lead images for PDF generation.
+
+    - one pooled `requests.Session` per process (keep-alive, bounded pool)
+    - connect/read timeouts plus an overall deadline, so a slow host can't
+      hold a worker for longer than `total_timeout`
+    - bodies larger than `max_bytes` are rejected while streaming, and images
+      past PIL's MAX_IMAGE_PIXELS are treated as failed fetches
+    - successful fetches are downscaled to fit `max_size` and cached on disk;
+      the least recently used images are evicted past `max_cache_bytes`
+    - failures are cached for `negative_ttl` seconds so dead URLs aren't
+      retried on every download
+    """
+
+    def __init__(self, cache_dir, connect_timeout=3.05, read_timeout=5, total_timeout=10,
+                 max_bytes=5 * 1024 * 1024, max_size=(400, 300), negative_ttl=600, pool_size=10,
+                 max_cache_bytes=64 * 1024 * 1024):
+        self.cache_dir = str(cache_dir)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_bytes = max_bytes
+        self.max_size = tuple(max_size)
+        self.negative_ttl = negative_ttl
+        self.pool_size = pool_size
+        self.max_cache_bytes = max_cache_bytes
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def session(self):
+        # Sessions must not be shared across fork(), so rebuild one per process
+        if self._session is None or self._session_pid != os.getpid():
+            with self._session_lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.jpg', base + '.fail'
+
+    def fetch(self, url):
+        """Return the path of a downscaled JPEG for `url`, or None if it can't be loaded."""
+        with timed(IMAGE_FETCH, result='cached') as outcome:
+            return self._fetch(url, outcome)
+
+    def _fetch(self, url, outcome):
+        image_path, failure_path = self._paths(url)
+        try:
+            os.utime(image_path)  # Mark as recently used
+            return image_path
+        except FileNotFoundError:
+            pass
+        try:
+            if time.time() - os.path.getmtime(failure_path) < self.negative_ttl:
+                outcome['result'] = 'failure_cached'
+                return None
+        except FileNotFoundError:
+            pass
+
+        try:
+            data = self._download(url)
+            self._write(image_path, self._downscale(data))
+        except (requests.RequestException, ImageFetchError, UnidentifiedImageError,
+                Image.DecompressionBombError, OSError):
+            outcome['result'] = 'failed'
+            self._write(failure_path, b'')
+            return None
+        outcome['result'] = 'downloaded'
+        self._remove(failure_path)
+        self.evict()
+        return image_path
+
+    def _download(self, url):
+        deadline = time.monotonic() + self.total_timeout
+        with self.session.get(url, stream=True, timeout=(self.connect_timeout, self.read_timeout)) as response:
+            if response.status_code != 200:
+                raise ImageFetchError(f"HTTP {response.status_code}")
+            declared = response.headers.get('Content-Length')
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise ImageFetchError("Image too large")
+            body = bytearray()
+            # read1() returns whatever has arrived, so a host trickling bytes
+            # can't stretch one read past the deadline the way iter_content can
+            while chunk := response.raw.read1(8192, decode_content=True):
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    raise ImageFetchError("Image too large")
+                if time.monotonic() > deadline:
+                    raise ImageFetchError("Image download timed out")
+        return bytes(body)
+
+    def _downscale(self, data):
+        with Image.open(BytesIO(data)) as img:
+            img.draft('RGB', self.max_size)  # Lets JPEG decode at reduced size
+            img = img.convert('RGBA') if img.mode in ('P', 'LA') else img
+            if img.mode == 'RGBA':
+                background = Image.new('RGB', img.size, 'white')
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            else:
+                img = img.convert('RGB')
+            img.thumbnail(self.max_size)
+            out = BytesIO()
+            img.save(out, 'JPEG', quality=85, optimize=True)
+        return out.getvalue()
+
+    def _write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Drop expired failure markers, then LRU images past `max_cache_bytes`."""
+        entries = []
+        total = 0
+        now = time.time()
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith('.fail'):
+                    if now - stat.st_mtime >= self.negative_ttl:
+                        self._remove(entry.path)
+                elif entry.name.endswith('.jpg'):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_cache_bytes:
+            return
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total -= size
+            if total <= self.max_cache_bytes:
+                break
+
+
+_fetcher = None
+
+
+def get_image_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        config = settings.LEAD_IMAGE_FETCH
+        _fetcher = ImageFetcher(
+            config['CACHE_DIR'],
+            connect_timeout=config['CONNECT_TIMEOUT'],
+            read_timeout=config['READ_TIMEOUT'],
+            total_timeout=config['TOTAL_TIMEOUT'],
+            max_bytes=config['MAX_BYTES'],
+            max_size=config['MAX_SIZE'],
+            negative_ttl=config['NEGATIVE_TTL'],
+            pool_size=config['POOL_SIZE'],
+            max_cache_bytes=config['MAX_CACHE_BYTES'],
+        )
+    return _fetcher
@@ -0,0 +1,171 @@
+"""
+Streaming bulk lead import from CSV or NDJSON.
+
+Rows are parsed lazily from the file, validated with LeadSerializer's rules
+and inserted with bulk_create in fixed-size batches, each in its own
+transaction. Only the current batch and a capped error list are kept in
+memory, whatever the file size.
+"""
+import codecs
+import csv
+import json
+from functools import partial
+
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+
+from . import search, similarity, tags
+from .cache import bump_catalog_version
+from .geo import fill_coordinates
+from .models import Lead
+from .serializers import LeadSerializer
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ('csv', 'ndjson')
+
+NULLABLE_FIELDS = {field.name for field in Lead._meta.concrete_fields if field.null}
+
+
+class ImportFileError(Exception):
+    """
+    The file can't be read past `row` (bad text encoding or CSV syntax).
+    Batches before it are already committed; `report` describes them.
+    """
+
+    def __init__(self, row, message):
+        super().__init__(f"Row {row}: {message}")
+        self.row = row
+        self.report = None
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_csv_rows(binary_file, encoding='utf-8-sig'):
+    reader = csv.DictReader(codecs.iterdecode(binary_file, encoding))
+    for row in reader:
+        # CSV has no null; an empty cell in a nullable column means "not set"
+        yield {
+            key: (None if value == '' and key in NULLABLE_FIELDS else value)
+            for key, value in row.items() if key is not None
+        }
+
+
+def iter_ndjson_rows(binary_file):
+    for line in binary_file:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield exc
+            continue
+        yield row if isinstance(row, dict) else ValueError("Each line must be a JSON object")
+
+
+def _numbered(rows):
+    rows = iter(rows)
+    row_number = 0
+    while True:
+        row_number += 1
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as exc:
+            raise ImportFileError(row_number, f"File is not valid {exc.encoding}: {exc.reason}")
+        except csv.Error as exc:
+            raise ImportFileError(row_number, f"Malformed CSV: {exc}")
+        yield row_number, row
+
+
+def iter_rows(binary_file, file_format):
+    if file_format == 'ndjson':
+        return iter_ndjson_rows(binary_file)
+    return iter_csv_rows(binary_file)
+
+
+class LeadImporter:
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, max_errors=MAX_REPORTED_ERRORS):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        # One serializer reused for every row: run_validation() applies the
+        # same field rules as is_valid() without rebuilding the field graph.
+        self.serializer = LeadSerializer()
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def _error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def run(self, rows):
+        """
+        Import `rows` and return the report. Raises ImportFileError if the
+        file stops being readable; the rows before it are still imported.
+        """
+        batch, batch_rows = [], []
+        try:
+            for row_number, row in _numbered(rows):
+                if isinstance(row, Exception):
+                    self._error(row_number, {'non_field_errors': [str(row)]})
+                    continue
+                try:
+                    validated = self.serializer.run_validation(row)
+                except serializers.ValidationError as exc:
+                    self._error(row_number, exc.detail)
+                    continue
+                lead = Lead(**validated)
+                fill_coordinates(lead)  # bulk_create skips Lead.save()
+                batch.append(lead)
+                batch_rows.append(row_number)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, batch_rows)
+                    batch, batch_rows = [], []
+        except ImportFileError as exc:
+            exc.report = self._finish(batch, batch_rows)
+            raise
+        return self._finish(batch, batch_rows)
+
+    def _finish(self, batch, batch_rows):
+        if batch:
+            self._flush(batch, batch_rows)
+        if self.created:
+            bump_catalog_version()
+        return self.report()
+
+    def _flush(self, batch, batch_rows):
+        try:
+            with transaction.atomic():
+                # bulk_create skips post_save, so index the new rows explicitly
+                created = Lead.objects.bulk_create(batch)
+                search.index_leads(created)
+                tags.index_new_leads(created)
+                transaction.on_commit(partial(similarity.update_leads, created), robust=True)
+        except DatabaseError as exc:
+            for row_number in batch_rows:
+                self._error(row_number, {'non_field_errors': [f"Batch insert failed: {exc}"]})
+            return
+        self.created += len(created)
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def import_leads(binary_file, file_format='csv', batch_size=DEFAULT_BATCH_SIZE):
+    return LeadImporter(batch_size=batch_size).run(iter_rows(binary_file, file_format))
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authapp.benchmarks import benchmark_database, summarize
+from authapp.models import Cart, Lead, Review, Wishlist
+
+from .bench_sqlite_concurrency import register_alias
+
+ALIAS = 'loadtest'
+
+SERVERS = {
+    'wsgi': lambda port, threads: [
+        sys.executable, '-m', 'gunicorn', 'BMIL.wsgi:application', '--worker-class', 'gthread',
+        '--workers', '1', '--threads', str(threads), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ],
+    'asgi': lambda port, threads: [
+        sys.executable, '-m', 'uvicorn', 'BMIL.asgi:application', '--workers', '1',
+        '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', '--no-access-log',
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def thread_count(pid):
+    """Threads in `pid` and its child processes (Linux /proc only)."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            count = next(int(line.split()[1]) for line in status if line.startswith('Threads:'))
+        with open(f'/proc/{pid}/task/{pid}/children') as children:
+            return count + sum(thread_count(int(child)) or 0 for child in children.read().split())
+    except (OSError, StopIteration):
+        return None
+
+
+async def http_get(port, raw_request, chunks=1, chunk_delay=0.0):
+    """Send `raw_request` in `chunks` pieces (a slow client), return the status code."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        size = -(-len(raw_request) // chunks)
+        for start in range(0, len(raw_request), size):
+            writer.write(raw_request[start:start + size])
+            await writer.drain()
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+class Command(BaseCommand):
+    help = "Load-test the read endpoints under gunicorn (WSGI, gthread) and uvicorn (ASGI) with slow clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slow-clients', type=int, default=100)
+        parser.add_argument('--slow-seconds', type=float, default=2.0, help="Time a slow client takes to send its request")
+        parser.add_argument('--fast-clients', type=int, default=10)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--threads', type=int, default=8, help="gthread threads for the WSGI worker")
+        parser.add_argument('--leads', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        workdir = Path(tempfile.mkdtemp(prefix='bmil-load-'))
+        try:
+            with benchmark_database():
+                token, paths = self.prepare(workdir / 'load.sqlite3', options['leads'])
+            for name, command in SERVERS.items():
+                result = self.run_server(name, command, workdir / 'load.sqlite3', token, paths, options)
+                self.report(name, result)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def prepare(self, path, lead_count):
+        tuned = settings.DATABASES[DEFAULT_DB_ALIAS]
+        register_alias(ALIAS, {'ENGINE': tuned['ENGINE'], 'NAME': str(path), 'OPTIONS': tuned.get('OPTIONS', {})})
+        call_command('migrate', database=ALIAS, verbosity=0)
+        user = get_user_model().objects.db_manager(ALIAS).create_user('loadtest', password='load-test-password-1')
+        leads = Lead.objects.using(ALIAS).bulk_create([
+            Lead(name=f'Lead {i}', location='Pune', property_type='Flat', property_status='Ready',
+                 service_required_on='Now', budget=1000 + i, requirement='Interior work', price=500)
+            for i in range(lead_count)
+        ], batch_size=1000)
+        lead = Lead.objects.using(ALIAS).order_by('id').first()
+        Wishlist.objects.using(ALIAS).bulk_create([Wishlist(user_id=user.id, lead_id=item.id) for item in leads[:20]])
+        Cart.objects.using(ALIAS).bulk_create([Cart(user_id=user.id, lead_id=item.id, quantity=1) for item in leads[:10]])
+        Review.objects.using(ALIAS).bulk_create([
+            Review(lead_id=lead.id, user_id=user.id, name='Load', email='load@example.com', rating=i % 5 + 1, review_text='Fine')
+            for i in range(20)
+        ])
+        connections[ALIAS].close()
+        paths = [
+            '/api/auth/leads/?facets=0', f'/api/auth/leads/{lead.id}/', f'/api/auth/leads/{lead.id}/reviews/',
+            '/api/auth/wishlists/', '/api/auth/cart/',
+        ]
+        return str(AccessToken.for_user(user)), paths
+
+    def run_server(self, name, command, db_path, token, paths, options):
+        port = free_port()
+        env = {**os.environ, 'BMIL_DATABASE': str(db_path), 'DJANGO_SETTINGS_MODULE': 'BMIL.settings'}
+        server = subprocess.Popen(command(port, options['threads']), cwd=settings.BASE_DIR, env=env)
+        try:
+            self.wait_for(port, server)
+            return asyncio.run(self.load(port, server.pid, token, paths, options))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    def wait_for(self, port, server, timeout=15):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Server exited with {server.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError("Server did not start")
+
+    async def load(self, port, pid, token, paths, options):
+        requests = [
+            f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\nConnection: close\r\n\r\n'.encode()
+            for path in paths
+        ]
+        for raw in requests:  # Warm up connections and caches
+            await http_get(port, raw)
+
+        deadline = time.monotonic() + options['duration']
+        fast, slow, errors, threads = [], [], [], []
+
+        async def fast_client(index):
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    status_code = await http_get(port, requests[index % len(requests)])
+                    (fast if status_code == 200 else errors).append(time.perf_counter() - started)
+                except OSError:
+                    errors.append(time.perf_counter() - started)
+                index += 1
+
+        async def slow_client(index):
+            chunks = 10
+            await asyncio.sleep(options['slow_seconds'] * index / options['slow_clients'])  # Stagger arrivals
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    await http_get(port, requests[index % len(requests)], chunks, options['slow_seconds'] / chunks)
+                    slow.append(time.perf_counter() - started)
+                except OSError:
+                    errors.append(time.perf_counter() - started)
+
+        async def sample_threads():
+            while time.monotonic() < deadline:
+                threads.append(thread_count(pid))
+                await asyncio.sleep(0.5)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            sample_threads(),
+            *(slow_client(i) for i in range(options['slow_clients'])),
+            *(fast_client(i) for i in range(options['fast_clients'])),
+        )
+        return {
+            'fast': fast, 'slow': slow, 'errors': errors, 'elapsed': time.perf_counter() - started,
+            'threads': max((count for count in threads if count), default=None),
+        }
+
+    def report(self, name, result):
+        summary = summarize(result['fast'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{name}: {len(result['fast']) / result['elapsed']:.0f} fast req/s, "
+            f"{len(result['slow'])} slow requests done, {len(result['errors'])} errors, "
+            f"peak server threads {result['threads']}"
+        ))
+        self.stdout.write(
+            f"  fast clients p50={summary['p50_ms']:.1f}ms p95={summary['p95_ms']:.1f}ms p99={summary['p99_ms']:.1f}ms"
+        )
@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authapp import views
+from authapp.authentication import CachedBlacklistRefreshToken, CachedJWTAuthentication, blacklist_cache, user_cache
+from authapp.benchmarks import benchmark_database, measure, summarize
+
+
+class Command(BaseCommand):
+    help = "Compare queries and latency per request for JWTAuthentication vs CachedJWTAuthentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--blacklisted', type=int, default=1000, help="Blacklisted refresh tokens to seed")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            rows = self.run(options['requests'], options['blacklisted'])
+        self.stdout.write(f"{'case':<42}{'queries':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name, summary in rows:
+            self.stdout.write(
+                f"{name:<42}{summary['queries']:>8.2f}{summary['p50_ms']:>9.3f}"
+                f"{summary['p95_ms']:>9.3f}{summary['p99_ms']:>9.3f}"
+            )
+
+    def run(self, iterations, blacklisted):
+        user = get_user_model().objects.create_user('bench', password='bench-password-1')
+        for _ in range(blacklisted):
+            RefreshToken.for_user(user).blacklist()
+        refresh = RefreshToken.for_user(user)
+        header = f'Bearer {refresh.access_token}'
+        request = APIRequestFactory().get('/api/auth/leads/', HTTP_AUTHORIZATION=header)
+        user_cache.clear()
+        blacklist_cache.reset()
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=header)
+
+        def wishlist():
+            assert client.get('/api/auth/wishlists/').status_code == 200
+
+        rows = [
+            ('authenticate: JWTAuthentication', JWTAuthentication().authenticate),
+            ('authenticate: CachedJWTAuthentication', CachedJWTAuthentication().authenticate),
+            ('refresh check: RefreshToken', RefreshToken),
+            ('refresh check: CachedBlacklistRefreshToken', CachedBlacklistRefreshToken),
+        ]
+        args = [request, request, str(refresh), str(refresh)]
+        results = [(name, summarize(*measure(lambda fn=fn, arg=arg: fn(arg), iterations))) for (name, fn), arg in zip(rows, args)]
+
+        with mock.patch.object(views.WishlistView, 'authentication_classes', [JWTAuthentication]):
+            results.append(('GET /wishlists/: JWTAuthentication', summarize(*measure(wishlist, iterations))))
+        results.append(('GET /wishlists/: CachedJWTAuthentication', summarize(*measure(wishlist, iterations))))
+        return results
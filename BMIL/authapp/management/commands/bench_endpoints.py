@@ -0,0 +1,243 @@
+import io
+import json
+import platform
+import time
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authapp import urls
+from authapp.benchmarks import CaptureAllQueries, benchmark_database, summarize
+from authapp.cache import get_response_cache
+from authapp.models import Cart, Lead, Order, Review
+from authapp.ratings import apply_rating_change
+from authapp.seeding import SyntheticData
+
+ADDRESS = {'first_name': 'Bench', 'city': 'Pune', 'country': 'India'}
+
+
+class Context:
+    """Users, clients and ids the scenarios need."""
+
+    def __init__(self):
+        User = get_user_model()
+        self.user = User.objects.create_user('bench_client', password='bench-password-1')
+        self.admin = User.objects.create_superuser('bench_admin', password='bench-password-1')
+        self.client = self._client(self.user)
+        self.admin_client = self._client(self.admin)
+        self.anonymous = APIClient()
+        self.lead_ids = list(Lead.objects.order_by('id').values_list('id', flat=True)[:500])
+        self.review = Review.objects.create(lead_id=self.lead_ids[0], user=self.user, name='Bench', email='b@example.com',
+                                            rating=4, review_text='Benchmark review')
+        apply_rating_change(self.review.lead_id, added=self.review.rating)
+        self.order = Order.objects.create(user=self.user, billing_address=ADDRESS, shipping_address=ADDRESS,
+                                          subtotal=100, cgst=9, sgst=9, total=118)
+
+    @staticmethod
+    def _client(user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def lead(self, i):
+        return self.lead_ids[i % len(self.lead_ids)]
+
+    def fill_cart(self, size=5):
+        Cart.objects.filter(user=self.user).delete()
+        Cart.objects.bulk_create([Cart(user=self.user, lead_id=self.lead(k), quantity=1) for k in range(size)])
+
+
+def import_file(i):
+    rows = ['name,location,property_type,property_status,service_required_on,budget,requirement,tags']
+    rows += [f'Imported {i}-{k},Pune,Flat,Ready,Now,150000,Full interiors,modern' for k in range(20)]
+    upload = io.BytesIO('\n'.join(rows).encode())
+    upload.name = 'leads.csv'
+    return upload
+
+
+def _json(data):
+    return {'data': data, 'format': 'json'}
+
+
+LEAD = {
+    'name': 'Bench lead', 'location': 'Pune', 'property_type': 'Flat', 'property_status': 'Ready',
+    'service_required_on': 'Now', 'budget': '250000.00', 'requirement': 'Kitchen and wardrobes', 'tags': 'modern',
+}
+
+
+def _checkout(ctx, i):
+    ctx.fill_cart()
+    return ctx.client, 'post', '/api/auth/orders/checkout/', _json({'billing_address': ADDRESS, 'shipping_address': ADDRESS})
+
+
+# (label, url name, prepare). prepare(ctx, i) does any untimed setup and
+# returns (client, method, path, request kwargs) for the timed request.
+SCENARIOS = [
+    ('POST signup', 'signup', lambda ctx, i: (
+        ctx.anonymous, 'post', '/api/auth/signup/', _json({'username': f'signup{i}', 'password': 'bench-password-1'}))),
+    ('POST signin', 'signin', lambda ctx, i: (
+        ctx.anonymous, 'post', '/api/auth/signin/', _json({'username': 'bench_client', 'password': 'bench-password-1'}))),
+    ('GET profile', 'profile', lambda ctx, i: (ctx.client, 'get', '/api/auth/profile/', {})),
+    ('POST logout', 'logout', lambda ctx, i: (
+        ctx.client, 'post', '/api/auth/logout/', _json({'refresh': str(RefreshToken.for_user(ctx.user))}))),
+    ('POST token/refresh', 'token-refresh', lambda ctx, i: (
+        ctx.anonymous, 'post', '/api/auth/token/refresh/', _json({'refresh': str(RefreshToken.for_user(ctx.user))}))),
+    ('GET leads', 'lead-list-create', lambda ctx, i: (ctx.client, 'get', '/api/auth/leads/', {})),
+    ('GET leads filtered', 'lead-list-create', lambda ctx, i: (
+        ctx.client, 'get', '/api/auth/leads/?location=Pune&property_type=Flat&budget_min=100000&page_size=50', {})),
+    ('POST leads', 'lead-list-create', lambda ctx, i: (ctx.client, 'post', '/api/auth/leads/', _json(LEAD))),
+    ('GET leads/search', 'lead-search', lambda ctx, i: (ctx.client, 'get', '/api/auth/leads/search/?q=modular+kitchen', {})),
+    ('GET leads/membership', 'lead-membership', lambda ctx, i: (
+        ctx.client, 'get', '/api/auth/leads/membership/?ids=' + ','.join(map(str, ctx.lead_ids[:50])), {})),
+    ('GET leads/export', 'lead-export', lambda ctx, i: (ctx.client, 'get', '/api/auth/leads/export/?format=csv&location=Pune', {})),
+    ('POST leads/import', 'lead-import', lambda ctx, i: (
+        ctx.client, 'post', '/api/auth/leads/import/', {'data': {'file': import_file(i)}, 'format': 'multipart'})),
+    ('GET leads/cache-stats', 'lead-cache-stats', lambda ctx, i: (ctx.admin_client, 'get', '/api/auth/leads/cache-stats/', {})),
+    ('GET lead', 'lead-detail', lambda ctx, i: (ctx.client, 'get', f'/api/auth/leads/{ctx.lead(i)}/', {})),
+    ('PUT lead', 'lead-detail', lambda ctx, i: (
+        ctx.client, 'put', f'/api/auth/leads/{ctx.lead(i)}/', _json({'requirement': f'Updated {i}'}))),
+    ('GET tags/cloud', 'tag-cloud', lambda ctx, i: (ctx.client, 'get', '/api/auth/tags/cloud/', {})),
+    ('GET lead reviews', 'review-list-create', lambda ctx, i: (ctx.client, 'get', f'/api/auth/leads/{ctx.lead(i)}/reviews/', {})),
+    ('GET lead reviews (highest, min 4)', 'review-list-create', lambda ctx, i: (
+        ctx.client, 'get', f'/api/auth/leads/{ctx.lead(i)}/reviews/?sort=highest&min_rating=4', {})),
+    ('POST lead review', 'review-list-create', lambda ctx, i: (
+        ctx.client, 'post', f'/api/auth/leads/{ctx.lead(i)}/reviews/',
+        _json({'name': 'Bench', 'email': 'b@example.com', 'rating': i % 5 + 1, 'review_text': 'Good'}))),
+    ('GET review', 'review-detail', lambda ctx, i: (ctx.client, 'get', f'/api/auth/reviews/{ctx.review.id}/', {})),
+    ('PUT review', 'review-detail', lambda ctx, i: (
+        ctx.client, 'put', f'/api/auth/reviews/{ctx.review.id}/', _json({'rating': i % 5 + 1}))),
+    ('GET wishlists', 'wishlist-list', lambda ctx, i: (ctx.client, 'get', '/api/auth/wishlists/', {})),
+    ('POST wishlist', 'wishlist-manage', lambda ctx, i: (ctx.client, 'post', f'/api/auth/wishlists/{ctx.lead(i)}/', {})),
+    ('GET cart', 'cart-list', lambda ctx, i: (ctx.client, 'get', '/api/auth/cart/', {})),
+    ('POST cart/batch', 'cart-batch', lambda ctx, i: (
+        ctx.client, 'post', '/api/auth/cart/batch/',
+        _json({'operations': [{'lead': ctx.lead(i + k), 'action': 'add', 'quantity': 1} for k in range(10)]}))),
+    ('POST cart item', 'cart-manage', lambda ctx, i: (
+        ctx.client, 'post', f'/api/auth/cart/{ctx.lead(i)}/', _json({'quantity': 1}))),
+    ('GET lead pdf', 'download_leads_pdf', lambda ctx, i: (
+        ctx.client, 'get', f'/api/auth/leads/download/{ctx.lead(i % 5)}/', {})),
+    ('POST leads pdf zip', 'bulk-download-leads-pdf', lambda ctx, i: (
+        ctx.client, 'post', '/api/auth/leads/download/', _json({'lead_ids': ctx.lead_ids[:3]}))),
+    ('GET addresses', 'addresses', lambda ctx, i: (ctx.client, 'get', '/api/auth/addresses/', {})),
+    ('GET orders/fill-details', 'fill-details', lambda ctx, i: (ctx.client, 'get', '/api/auth/orders/fill-details/', {})),
+    ('POST orders', 'create-order', lambda ctx, i: (
+        ctx.client, 'post', '/api/auth/orders/', _json({
+            'billing_address': ADDRESS, 'shipping_address': ADDRESS,
+            'items': [{'lead_id': ctx.lead(i + k), 'quantity': 1} for k in range(5)]}))),
+    ('POST orders/checkout', 'checkout', _checkout),
+    ('PUT order pay', 'process-payment', lambda ctx, i: (ctx.client, 'put', f'/api/auth/orders/{ctx.order.id}/pay/', {})),
+]
+
+
+def consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    if hasattr(response, 'close'):
+        response.close()
+
+
+class Command(BaseCommand):
+    help = "Seed a throwaway database and benchmark every authapp route (latency, throughput, queries)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--leads', type=int, default=20000)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--only', help="Run scenarios whose label contains this text")
+        parser.add_argument('--cold-cache', action='store_true', help="Clear the lead response cache before each request")
+        parser.add_argument('--output', help="Write results as JSON to this file")
+        parser.add_argument('--baseline', help="JSON from an earlier run; fail if an endpoint regressed")
+        parser.add_argument('--metric', choices=['p50_ms', 'p95_ms', 'p99_ms'], default='p50_ms',
+                            help="Latency compared against the baseline (tails are noisy on shared machines)")
+        parser.add_argument('--max-regression', type=float, default=0.25, help="Allowed slowdown as a fraction")
+        parser.add_argument('--min-delta-ms', type=float, default=1.0, help="Ignore slowdowns smaller than this")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            started = time.perf_counter()
+            counts = SyntheticData().seed(users=options['users'], leads=options['leads'])
+            self.stdout.write(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+            ctx = Context()
+            results = self.run_scenarios(ctx, options)
+
+        covered = {url_name for _, url_name, _ in SCENARIOS}
+        uncovered = sorted({p.name for p in urls.urlpatterns} - covered)
+        if uncovered:
+            self.stdout.write(self.style.WARNING(f"Routes without a scenario: {', '.join(uncovered)}"))
+
+        report = {
+            'meta': {
+                'created': datetime.now(timezone.utc).isoformat(),
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+                'cold_cache': options['cold_cache'],
+                'data': counts,
+                'uncovered_routes': uncovered,
+            },
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                json.dump(report, out, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if options['baseline']:
+            self.compare(results, options)
+
+    def run_scenarios(self, ctx, options):
+        results = {}
+        self.stdout.write(f"{'endpoint':<26}{'queries':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}  status")
+        for label, url_name, prepare in SCENARIOS:
+            if options['only'] and options['only'] not in label:
+                continue
+            samples, queries, statuses = [], [], {}
+            for i in range(options['iterations'] + 1):
+                if options['cold_cache']:
+                    get_response_cache().clear()
+                client, method, path, kwargs = prepare(ctx, i)
+                with CaptureAllQueries() as captured:
+                    began = time.perf_counter()
+                    response = getattr(client, method)(path, **kwargs)
+                    consume(response)
+                    elapsed = time.perf_counter() - began
+                if i == 0:
+                    continue  # Warm-up
+                samples.append(elapsed)
+                queries.append(len(captured))
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            summary = summarize(samples, queries)
+            summary.update({
+                'route': url_name,
+                'throughput_rps': len(samples) / sum(samples) if samples else 0.0,
+                'status': {str(code): count for code, count in sorted(statuses.items())},
+            })
+            results[label] = summary
+            self.stdout.write(
+                f"{label:<26}{summary['queries']:>8.1f}{summary['p50_ms']:>9.2f}{summary['p95_ms']:>9.2f}"
+                f"{summary['p99_ms']:>9.2f}{summary['throughput_rps']:>9.0f}  {summary['status']}"
+            )
+        return results
+
+    def compare(self, results, options):
+        with open(options['baseline']) as baseline_file:
+            baseline = json.load(baseline_file)['endpoints']
+        failures = []
+        for label, current in results.items():
+            before = baseline.get(label)
+            if before is None:
+                continue
+            metric = options['metric']
+            slower = current[metric] - before[metric]
+            if slower > options['min_delta_ms'] and current[metric] > before[metric] * (1 + options['max_regression']):
+                failures.append(f"{label}: {metric} {before[metric]:.2f} -> {current[metric]:.2f}")
+            if current['queries'] > before['queries'] + 0.5:
+                failures.append(f"{label}: queries {before['queries']:.1f} -> {current['queries']:.1f}")
+        if failures:
+            raise CommandError("Performance regressions:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
@@ -0,0 +1,140 @@
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.models import F
+
+from authapp.benchmarks import benchmark_database, summarize
+from authapp.models import Lead
+
+SQLITE = 'django.db.backends.sqlite3'
+
+
+def profiles():
+    """Stock Django SQLite settings vs. the ones in settings.DATABASES."""
+    tuned, read = settings.DATABASES[DEFAULT_DB_ALIAS], settings.DATABASES['read']
+    return {
+        'baseline': {
+            'write': {'ENGINE': SQLITE, 'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+            'read': None,
+        },
+        'tuned': {
+            'write': {
+                'ENGINE': SQLITE, 'CONN_MAX_AGE': tuned.get('CONN_MAX_AGE', 0),
+                'CONN_HEALTH_CHECKS': tuned.get('CONN_HEALTH_CHECKS', False), 'OPTIONS': tuned.get('OPTIONS', {}),
+            },
+            'read': {
+                'ENGINE': SQLITE, 'CONN_MAX_AGE': read.get('CONN_MAX_AGE', 0),
+                'CONN_HEALTH_CHECKS': read.get('CONN_HEALTH_CHECKS', False), 'OPTIONS': read.get('OPTIONS', {}),
+            },
+        },
+    }
+
+
+def register_alias(alias, config):
+    connections.settings[alias] = connections.configure_settings({DEFAULT_DB_ALIAS: {}, alias: config})[alias]
+
+
+class Command(BaseCommand):
+    help = "Mixed read/write load from concurrent threads against stock vs. tuned SQLite settings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=300, help="Operations per thread")
+        parser.add_argument('--leads', type=int, default=5000)
+        parser.add_argument('--write-ratio', type=float, default=0.3)
+
+    def handle(self, *args, **options):
+        workdir = Path(tempfile.mkdtemp(prefix='bmil-bench-'))
+        try:
+            with benchmark_database():
+                for name, profile in profiles().items():
+                    result = self.run_profile(workdir / f'{name}.sqlite3', name, profile, options)
+                    self.report(name, result)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_profile(self, path, name, profile, options):
+        write_alias = f'bench_{name}'
+        read_alias = f'bench_{name}_read' if profile['read'] else write_alias
+        register_alias(write_alias, {**profile['write'], 'NAME': str(path)})
+        if profile['read']:
+            register_alias(read_alias, {**profile['read'], 'NAME': str(path)})
+        aliases = {write_alias, read_alias}
+
+        with connections[write_alias].schema_editor() as editor:
+            editor.create_model(Lead)
+        Lead.objects.using(write_alias).bulk_create([
+            Lead(name=f'Lead {i}', location='Pune', property_type='Flat', property_status='Ready',
+                 service_required_on='Now', budget=1000 + i, requirement='Interior work', price=500)
+            for i in range(options['leads'])
+        ], batch_size=1000)
+        for alias in aliases:
+            connections[alias].close()
+
+        samples = {'read': [], 'write': [], 'read_write': []}
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(options['threads'])
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local = {kind: [] for kind in samples}
+            failed = []
+            start.wait()
+            for _ in range(options['ops']):
+                pk = rng.randint(1, options['leads'])
+                roll = rng.random()
+                kind = 'read' if roll >= options['write_ratio'] else ('write' if roll < options['write_ratio'] * 2 / 3 else 'read_write')
+                began = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        list(Lead.objects.using(read_alias).order_by('-created_at', '-id').values('id', 'name', 'price')[:20])
+                    elif kind == 'write':
+                        with transaction.atomic(using=write_alias):
+                            Lead.objects.using(write_alias).filter(pk=pk).update(rating_count=F('rating_count') + 1)
+                    else:
+                        # Read-then-write: the pattern that deadlocks DEFERRED transactions
+                        with transaction.atomic(using=write_alias):
+                            price = Lead.objects.using(write_alias).values_list('price', flat=True).get(pk=pk)
+                            Lead.objects.using(write_alias).filter(pk=pk).update(price=price + 1)
+                    local[kind].append(time.perf_counter() - began)
+                except OperationalError as exc:
+                    failed.append(str(exc))
+                for alias in aliases:  # What request_finished does
+                    connections[alias].close_if_unusable_or_obsolete()
+            for alias in aliases:
+                connections[alias].close()
+            with lock:
+                for kind, values in local.items():
+                    samples[kind].extend(values)
+                errors.extend(failed)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        return {'samples': samples, 'errors': errors, 'elapsed': elapsed}
+
+    def report(self, name, result):
+        done = sum(len(values) for values in result['samples'].values())
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{name}: {done} ok, {len(result['errors'])} failed, {done / result['elapsed']:.0f} ops/s"
+        ))
+        for kind, values in result['samples'].items():
+            summary = summarize(values)
+            self.stdout.write(
+                f"  {kind:<11} n={summary['n']:<5} p50={summary['p50_ms']:.2f}ms "
+                f"p95={summary['p95_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms"
+            )
+        if result['errors']:
+            self.stdout.write(f"  first error: {result['errors'][0]}")
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authapp import similarity
+from authapp.cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = "Rebuild the lead feature matrix and every lead's precomputed similar leads."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = similarity.rebuild(
+            progress=lambda message: self.stdout.write(f"  {message} ({time.perf_counter() - started:.1f}s)"),
+        )
+        bump_catalog_version()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Built neighbours for {count} leads in {elapsed:.2f}s"))
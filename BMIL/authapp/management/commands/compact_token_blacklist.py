@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from authapp.token_cleanup import compact_expired_tokens, compaction_options
+
+
+class Command(BaseCommand):
+    help = "Delete expired OutstandingToken / BlacklistedToken rows in small batches."
+
+    def add_arguments(self, parser):
+        defaults = compaction_options()  # settings.TOKEN_BLACKLIST_COMPACTION
+        parser.add_argument('--batch-size', type=int, default=defaults['batch_size'])
+        parser.add_argument('--pause', type=float, default=defaults['pause'], help="Seconds to sleep between batches")
+        parser.add_argument('--max-seconds', type=float, default=defaults['max_seconds'],
+                            help="Stop after this long (resume on the next run)")
+
+    def handle(self, *args, **options):
+        report = compact_expired_tokens(
+            batch_size=options['batch_size'], pause=options['pause'], max_seconds=options['max_seconds'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {report['outstanding']} outstanding and {report['blacklisted']} blacklisted tokens "
+            f"in {report['batches']} batches, {report['seconds']:.2f}s"
+        ))
@@ -0,0 +1,38 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authapp.importers import FORMATS, ImportFileError, detect_format, import_leads
+
+
+class Command(BaseCommand):
+    help = "Stream leads from a CSV or NDJSON file into the database in batched inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension (csv if unknown).")
+        parser.add_argument('--batch-size', type=int, default=settings.LEAD_IMPORT_BATCH_SIZE)
+        parser.add_argument('--report', help="Write the full JSON error report to this path.")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as source:
+                report = import_leads(source, file_format, batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ImportFileError as exc:
+            raise CommandError(f"{exc} ({exc.report['created']} leads imported before it)")
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            with open(options['report'], 'w') as out:
+                json.dump(report, out, indent=2, default=str)
+        for error in report['errors'][:10]:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'], default=str)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} leads, {report['failed']} rows failed ({elapsed:.2f}s)"
+        ))
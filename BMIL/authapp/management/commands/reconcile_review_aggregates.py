@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authapp.ratings import reconcile_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute Lead rating_avg / rating_count / histogram from the Review table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            fixed = reconcile_aggregates(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Reconciled review aggregates: {fixed} leads corrected in {elapsed:.2f}s"))
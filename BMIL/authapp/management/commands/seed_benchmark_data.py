@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authapp.seeding import SyntheticData
+
+
+class Command(BaseCommand):
+    help = "Bulk-insert synthetic users, leads, reviews, wishlist, cart and order rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--leads', type=int, default=100000)
+        parser.add_argument('--reviews-per-lead', type=int, default=2, help="Average; actual counts vary 0..2x")
+        parser.add_argument('--wishlist-per-user', type=int, default=5)
+        parser.add_argument('--cart-per-user', type=int, default=3)
+        parser.add_argument('--orders-per-user', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible data")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        generator = SyntheticData(
+            batch_size=options['batch_size'], seed=options['seed'],
+            progress=lambda message: self.stdout.write(f"  {message} ({time.perf_counter() - started:.1f}s)"),
+        )
+        counts = generator.seed(
+            users=options['users'], leads=options['leads'], reviews_per_lead=options['reviews_per_lead'],
+            wishlist_per_user=options['wishlist_per_user'], cart_per_user=options['cart_per_user'],
+            orders_per_user=options['orders_per_user'],
+        )
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {time.perf_counter() - started:.1f}s"))
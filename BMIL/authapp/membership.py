@@ -0,0 +1,58 @@
+from django.db.models import Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Cart, Lead, Wishlist
+
+EMPTY_MEMBERSHIP = {'in_wishlist': False, 'in_cart': False, 'cart_quantity': 0}
+
+
+def annotate_membership(queryset, user):
+    """Annotate leads with the user's wishlist/cart state via correlated subqueries."""
+    cart = Cart.objects.filter(user=user, lead=OuterRef('pk'))
+    return queryset.annotate(
+        in_wishlist=Exists(Wishlist.objects.filter(user=user, lead=OuterRef('pk'))),
+        in_cart=Exists(cart),
+        cart_quantity=Coalesce(Subquery(cart.values('quantity')[:1]), Value(0)),
+    )
+
+
+def _membership_rows(user, lead_ids):
+    return annotate_membership(Lead.objects.filter(id__in=lead_ids), user).values_list(
+        'id', 'in_wishlist', 'in_cart', 'cart_quantity'
+    )
+
+
+def _fold_membership(rows):
+    return {
+        lead_id: {'in_wishlist': in_wishlist, 'in_cart': in_cart, 'cart_quantity': cart_quantity}
+        for lead_id, in_wishlist, in_cart, cart_quantity in rows
+    }
+
+
+def membership_for(user, lead_ids):
+    """`{lead_id: {in_wishlist, in_cart, cart_quantity}}` for existing leads, in one query."""
+    if not user.is_authenticated or not lead_ids:
+        return {}
+    return _fold_membership(_membership_rows(user, lead_ids))
+
+
+async def amembership_for(user, lead_ids):
+    if not user.is_authenticated or not lead_ids:
+        return {}
+    return _fold_membership([row async for row in _membership_rows(user, lead_ids)])
+
+
+def _merge_membership(leads, flags):
+    return [{**lead, **flags.get(lead['id'], EMPTY_MEMBERSHIP)} for lead in leads]
+
+
+def with_membership(user, leads):
+    """
+    Return copies of serialized leads with the user's flags merged in. The
+    input may be a shared cached payload, so it is never mutated.
+    """
+    return _merge_membership(leads, membership_for(user, [lead['id'] for lead in leads]))
+
+
+async def awith_membership(user, leads):
+    return _merge_membership(leads, await amembership_for(user, [lead['id'] for lead in leads]))
@@ -0,0 +1,109 @@
+"""
+Prometheus metrics for the API (exposed at /metrics by views.metrics).
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory before the app starts (gunicorn.conf.py does this for
+gunicorn): every process then writes its samples to mmap-backed files there
+and the metrics view merges all of them, so counters and histograms are
+totals across workers and the in-flight gauge is summed over live ones.
+Without it, the process-local default registry is served (runserver).
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+REQUEST_LATENCY = Histogram(
+    'bmil_http_request_duration_seconds', 'Request latency by URL name',
+    ['route', 'method'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter('bmil_http_requests', 'Responses by URL name, method and status code', ['route', 'method', 'status'])
+IN_FLIGHT = Gauge('bmil_http_requests_in_flight', 'Requests being served', multiprocess_mode='livesum')
+REQUEST_QUERIES = Histogram(
+    'bmil_http_request_db_queries', 'SQL queries per request by URL name',
+    ['route', 'method'], buckets=QUERY_BUCKETS,
+)
+PDF_RENDER = Histogram('bmil_pdf_render_seconds', 'Lead PDF render time (cache misses)', buckets=LATENCY_BUCKETS)
+PDF_CACHE = Counter('bmil_pdf_cache_lookups', 'Lead PDF cache lookups', ['result'])
+IMAGE_FETCH = Histogram(
+    'bmil_image_fetch_seconds', 'Lead image fetch time by outcome',
+    ['result'], buckets=LATENCY_BUCKETS,
+)
+
+_request_queries = ContextVar('request_queries', default=None)
+
+
+class QueryCount:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter.value += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(connection):
+    """
+    Keep count_queries as the first execute wrapper of `connection` (called
+    on connection_created), so counting needs no per-request setup in
+    whichever thread the ORM runs; execute_wrapper() pushes and pops after it.
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+@contextmanager
+def counting_queries():
+    """Count this context's queries (sync_to_async copies the context)."""
+    counter = QueryCount()
+    token = _request_queries.set(counter)
+    try:
+        yield counter
+    finally:
+        _request_queries.reset(token)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route
+
+
+def observe_request(request, response, seconds, queries):
+    route, method = route_name(request), request.method
+    REQUEST_LATENCY.labels(route, method).observe(seconds)
+    REQUEST_QUERIES.labels(route, method).observe(queries)
+    REQUESTS.labels(route, method, str(response.status_code)).inc()
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """Observe the block's duration; the block may set labels['result']."""
+    started = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        metric = histogram.labels(**labels) if labels else histogram
+        metric.observe(time.perf_counter() - started)
+
+
+def render_metrics():
+    """(body, content type) in the Prometheus text format."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,139 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from .metrics import IN_FLIGHT, counting_queries, observe_request
+from .profiling import current_profile, finish_profile, profiling_config, start_profile
+from .routers import read_only_request
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReadRoutingMiddleware:
+    """Mark safe-method requests so ReadReplicaRouter may serve their reads from 'read'."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_only_request.set(request.method in SAFE_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            read_only_request.reset(token)
+
+    async def __acall__(self, request):
+        # Async ORM calls copy the context into their worker thread, so the
+        # router still sees the flag.
+        token = read_only_request.set(request.method in SAFE_METHODS)
+        try:
+            return await self.get_response(request)
+        finally:
+            read_only_request.reset(token)
+
+
+class ProfilingMiddleware:
+    """
+    Query count, SQL time, serializer time and wall time per request, as a
+    Server-Timing header on sampled requests; slow requests and N+1 query
+    patterns are logged to authapp.profiling. See settings.REQUEST_PROFILING.
+
+    Streaming responses (exports, bulk PDFs) run most of their queries while
+    the body is sent, so they are profiled until their last chunk. Their
+    headers are gone by then: they are only logged, without Server-Timing.
+    Async iterators are measured up to the first byte only.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = profiling_config()
+        profile = start_profile(config)
+        started = time.perf_counter()
+        if profile is None:
+            response = self.get_response(request)
+        else:
+            token = current_profile.set(profile)
+            try:
+                with profile.record_queries():
+                    response = self.get_response(request)
+            finally:
+                current_profile.reset(token)
+        self.finish(request, response, profile, started, config)
+        return response
+
+    async def __acall__(self, request):
+        config = profiling_config()
+        profile = start_profile(config)
+        started = time.perf_counter()
+        if profile is None:
+            response = await self.get_response(request)
+        else:
+            # Connections are per thread: the ORM calls of this request run
+            # in its thread-sensitive executor, so install the wrappers there
+            token = current_profile.set(profile)
+            recording = await sync_to_async(profile.record_queries)()
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(recording.close)()
+                current_profile.reset(token)
+        self.finish(request, response, profile, started, config)
+        return response
+
+    def finish(self, request, response, profile, started, config):
+        if not response.streaming or response.is_async or getattr(response, 'file_to_stream', None):
+            # FileResponse bodies run no queries and keep their sendfile path
+            finish_profile(request, response, profile, time.perf_counter() - started, config)
+            return
+        content = response.streaming_content
+
+        def profiled_content():
+            # Iterated in the thread that sends the body (also under ASGI,
+            # which consumes sync iterators in a worker thread)
+            with profile.record_queries() if profile is not None else ExitStack():
+                yield from content
+            finish_profile(request, response, profile, time.perf_counter() - started, {**config, 'SERVER_TIMING': False})
+
+        response.streaming_content = profiled_content()
+
+
+class MetricsMiddleware:
+    """Prometheus request metrics (authapp.metrics): latency, status, queries, in-flight."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with IN_FLIGHT.track_inprogress(), counting_queries() as queries:
+            response = self.get_response(request)
+        observe_request(request, response, time.perf_counter() - started, queries.value)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with IN_FLIGHT.track_inprogress(), counting_queries() as queries:
+            response = await self.get_response(request)
+        observe_request(request, response, time.perf_counter() - started, queries.value)
+        return response
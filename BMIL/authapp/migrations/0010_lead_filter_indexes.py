@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0009_order_orderitem_lead_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['property_type', 'property_status', 'budget'], name='lead_type_status_budget_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['location', 'budget'], name='lead_location_budget_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['property_status', 'budget'], name='lead_status_budget_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Kept literal rather than imported from authapp.search so the migration
+# doesn't change if the search module does.
+FTS_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS authapp_lead_fts "
+    "USING fts5(name, requirement, tags, location, tokenize='porter unicode61')"
+)
+FTS_BACKFILL = (
+    "INSERT INTO authapp_lead_fts (rowid, name, requirement, tags, location) "
+    "SELECT id, name, requirement, COALESCE(tags, ''), location FROM authapp_lead"
+)
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(FTS_CREATE)
+    schema_editor.execute(FTS_BACKFILL)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS authapp_lead_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0010_lead_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
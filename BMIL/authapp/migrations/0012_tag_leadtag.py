@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0011_lead_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LeadTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='authapp.lead')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lead_links', to='authapp.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lead', 'tag'], name='leadtag_lead_tag_idx')],
+                'unique_together': {('tag', 'lead')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def normalize(raw):
+    return ' '.join(raw.split()).lower()[:100]
+
+
+def split_lead_tags(apps, schema_editor):
+    Lead = apps.get_model('authapp', 'Lead')
+    Tag = apps.get_model('authapp', 'Tag')
+    LeadTag = apps.get_model('authapp', 'LeadTag')
+
+    tag_ids = {}
+    links = []
+    leads = Lead.objects.exclude(tags__isnull=True).exclude(tags='').values_list('id', 'tags')
+    for lead_id, value in leads.iterator(chunk_size=BATCH_SIZE):
+        for name in {normalize(part) for part in value.split(',')} - {''}:
+            if name not in tag_ids:
+                tag_ids[name] = Tag.objects.get_or_create(name=name)[0].id
+            links.append(LeadTag(lead_id=lead_id, tag_id=tag_ids[name]))
+        if len(links) >= BATCH_SIZE:
+            LeadTag.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    LeadTag.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0012_tag_leadtag'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_lead_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:53
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_review_aggregates(apps, schema_editor):
+    Lead = apps.get_model('authapp', 'Lead')
+    Review = apps.get_model('authapp', 'Review')
+    rows = Review.objects.order_by().values('lead_id').annotate(
+        count=Count('id'),
+        total=Sum('rating'),
+        **{f'rating_{i}': Count('id', filter=Q(rating=i)) for i in range(1, 6)},
+    )
+    for row in rows:
+        Lead.objects.filter(pk=row['lead_id']).update(
+            rating_count=row['count'],
+            rating_sum=row['total'],
+            rating_avg=row['total'] / row['count'],
+            **{f'rating_{i}': row[f'rating_{i}'] for i in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0013_split_lead_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_review_aggregates, migrations.RunPython.noop),
+    ]
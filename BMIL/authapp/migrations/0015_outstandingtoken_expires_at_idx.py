@@ -0,0 +1,21 @@
+from django.db import migrations
+
+# simplejwt's OutstandingToken has no index on expires_at; the blacklist
+# compaction job (authapp/token_cleanup.py) range-scans it in batches.
+INDEX_CREATE = (
+    "CREATE INDEX IF NOT EXISTS token_blacklist_outstandingtoken_expires_at_idx "
+    "ON token_blacklist_outstandingtoken (expires_at)"
+)
+INDEX_DROP = "DROP INDEX IF EXISTS token_blacklist_outstandingtoken_expires_at_idx"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0014_lead_review_aggregates'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(INDEX_CREATE, INDEX_DROP),
+    ]
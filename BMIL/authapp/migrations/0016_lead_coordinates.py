@@ -0,0 +1,156 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:31
+
+import re
+
+import django.core.validators
+from django.db import migrations, models
+
+# The gazetteer and geohash encoder are frozen copies of authapp/geo.py and
+# authapp/data/gazetteer.csv as of this migration, so later edits to either
+# don't change what it does on a fresh database.
+GAZETTEER = {
+    'agra': (27.1767, 78.0081),
+    'ahmedabad': (23.0225, 72.5714),
+    'allahabad': (25.4358, 81.8463),
+    'amritsar': (31.6340, 74.8723),
+    'aurangabad': (19.8762, 75.3433),
+    'bangalore': (12.9716, 77.5946),
+    'baroda': (22.3072, 73.1812),
+    'bengaluru': (12.9716, 77.5946),
+    'bhopal': (23.2599, 77.4126),
+    'bhubaneswar': (20.2961, 85.8245),
+    'bombay': (19.0760, 72.8777),
+    'calcutta': (22.5726, 88.3639),
+    'chandigarh': (30.7333, 76.7794),
+    'chennai': (13.0827, 80.2707),
+    'cochin': (9.9312, 76.2673),
+    'coimbatore': (11.0168, 76.9558),
+    'dehradun': (30.3165, 78.0322),
+    'delhi': (28.6139, 77.2090),
+    'faridabad': (28.4089, 77.3178),
+    'ghaziabad': (28.6692, 77.4538),
+    'goa': (15.4909, 73.8278),
+    'gurgaon': (28.4595, 77.0266),
+    'gurugram': (28.4595, 77.0266),
+    'guwahati': (26.1445, 91.7362),
+    'gwalior': (26.2183, 78.1828),
+    'hyderabad': (17.3850, 78.4867),
+    'indore': (22.7196, 75.8577),
+    'jabalpur': (23.1815, 79.9864),
+    'jaipur': (26.9124, 75.7873),
+    'jodhpur': (26.2389, 73.0243),
+    'kanpur': (26.4499, 80.3319),
+    'kochi': (9.9312, 76.2673),
+    'kolhapur': (16.7050, 74.2433),
+    'kolkata': (22.5726, 88.3639),
+    'kota': (25.2138, 75.8648),
+    'lucknow': (26.8467, 80.9462),
+    'ludhiana': (30.9010, 75.8573),
+    'madras': (13.0827, 80.2707),
+    'madurai': (9.9252, 78.1198),
+    'mangalore': (12.9141, 74.8560),
+    'mangaluru': (12.9141, 74.8560),
+    'meerut': (28.9845, 77.7064),
+    'mumbai': (19.0760, 72.8777),
+    'mysore': (12.2958, 76.6394),
+    'mysuru': (12.2958, 76.6394),
+    'nagpur': (21.1458, 79.0882),
+    'nashik': (19.9975, 73.7898),
+    'navi mumbai': (19.0330, 73.0297),
+    'new delhi': (28.6139, 77.2090),
+    'noida': (28.5355, 77.3910),
+    'panaji': (15.4909, 73.8278),
+    'patna': (25.5941, 85.1376),
+    'prayagraj': (25.4358, 81.8463),
+    'pune': (18.5204, 73.8567),
+    'raipur': (21.2514, 81.6296),
+    'rajkot': (22.3039, 70.8022),
+    'ranchi': (23.3441, 85.3096),
+    'solapur': (17.6599, 75.9064),
+    'srinagar': (34.0837, 74.7973),
+    'surat': (21.1702, 72.8311),
+    'thane': (19.2183, 72.9781),
+    'thiruvananthapuram': (8.5241, 76.9366),
+    'trivandrum': (8.5241, 76.9366),
+    'udaipur': (24.5854, 73.7125),
+    'vadodara': (22.3072, 73.1812),
+    'varanasi': (25.3176, 82.9739),
+    'vijayawada': (16.5062, 80.6480),
+    'visakhapatnam': (17.6868, 83.2185),
+    'vizag': (17.6868, 83.2185),
+}
+GEOHASH_PRECISION = 9
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geocode(location):
+    if not location:
+        return None
+    normalized = re.sub(r'\s+', ' ', location).strip().lower()
+    if normalized in GAZETTEER:
+        return GAZETTEER[normalized]
+    for part in normalized.split(','):
+        part = part.strip()
+        if part in GAZETTEER:
+            return GAZETTEER[part]
+    return None
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def backfill_coordinates(apps, schema_editor):
+    # One UPDATE per distinct location string, not per lead
+    Lead = apps.get_model('authapp', 'Lead')
+    for location in Lead.objects.order_by().values_list('location', flat=True).distinct():
+        point = geocode(location)
+        if point:
+            Lead.objects.filter(location=location).update(
+                latitude=point[0], longitude=point[1], geohash=encode_geohash(*point),
+            )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0015_outstandingtoken_expires_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['geohash'], name='lead_geohash_idx'),
+        ),
+        migrations.RunPython(backfill_coordinates, migrations.RunPython.noop),
+    ]
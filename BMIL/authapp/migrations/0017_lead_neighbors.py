@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0016_lead_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='authapp.lead')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='authapp.lead')),
+            ],
+            options={
+                'unique_together': {('lead', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0017_lead_neighbors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['lead', 'created_at'], name='review_lead_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['lead', 'rating'], name='review_lead_rating_idx'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings  # Import settings for AUTH_USER_MODEL
+from django.core.validators import MaxValueValidator, MinValueValidator
+
+from .geo import fill_coordinates
 
 class CustomUser(AbstractUser):
     pass  # Extend this if needed
@@ -19,9 +22,94 @@ class Lead(models.Model):
     discount_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Geocoded from `location` on save (authapp.geo) unless given explicitly
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False)
+
+    # Denormalized review aggregates, maintained by authapp.ratings
+    rating_avg = models.FloatField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='lead_created_id_idx'),  # Keyset pagination
+            models.Index(fields=['property_type', 'property_status', 'budget'], name='lead_type_status_budget_idx'),
+            models.Index(fields=['location', 'budget'], name='lead_location_budget_idx'),
+            models.Index(fields=['property_status', 'budget'], name='lead_status_budget_idx'),
+            models.Index(fields=['geohash'], name='lead_geohash_idx'),  # Prefix range scans (authapp.geo)
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'location', 'latitude', 'longitude'} <= instance.__dict__.keys():
+            # What save() compares against to tell a moved lead from new coordinates
+            instance._loaded_geo = (instance.location, instance.latitude, instance.longitude)
+        return instance
+
+    def _relocated(self, update_fields):
+        """True if the location changed but the coordinates were not set along with it."""
+        if update_fields is not None:
+            return 'location' in update_fields and 'latitude' not in update_fields
+        loaded = getattr(self, '_loaded_geo', None)
+        if loaded is None:
+            return False  # New (or partially loaded) lead: only missing coordinates are filled in
+        location, latitude, longitude = loaded
+        return self.location != location and (self.latitude, self.longitude) == (latitude, longitude)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'location', 'latitude', 'longitude'} & set(update_fields):
+            # A location edit without coordinates re-geocodes; otherwise only
+            # missing coordinates are filled in
+            fill_coordinates(self, relocate=self._relocated(update_fields))
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude', 'geohash'}
+        super().save(*args, **kwargs)
+        self._loaded_geo = (self.location, self.latitude, self.longitude)
+
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True)  # Normalized: lower-case, single-spaced
+
     def __str__(self):
         return self.name
 
+class LeadTag(models.Model):
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="lead_links")
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name="tag_links")
+
+    class Meta:
+        unique_together = ('tag', 'lead')  # Doubles as the inverted (tag -> leads) index
+        indexes = [
+            models.Index(fields=['lead', 'tag'], name='leadtag_lead_tag_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag.name} - {self.lead.name}"
+
+class LeadNeighbor(models.Model):
+    # Precomputed "similar leads", maintained by authapp.similarity
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name="neighbors")
+    neighbor = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()  # 0 = most similar
+    score = models.FloatField()  # Cosine similarity
+
+    class Meta:
+        unique_together = ('lead', 'rank')  # Doubles as the index the detail view reads
+
+    def __str__(self):
+        return f"{self.lead_id} -> {self.neighbor_id} ({self.score:.3f})"
+
 class Review(models.Model):
     lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name="reviews")  # Link to Lead
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)  # Use CustomUser model
@@ -31,6 +119,13 @@ class Review(models.Model):
     review_text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a lead's reviews (authapp.pagination.ReviewCursorPagination)
+            models.Index(fields=['lead', 'created_at'], name='review_lead_created_idx'),
+            models.Index(fields=['lead', 'rating'], name='review_lead_rating_idx'),
+        ]
+
     def __str__(self):
         return f"Review by {self.name} for {self.lead.name}"
 
@@ -86,7 +181,7 @@ class Order(models.Model):
         ('Failed', 'Failed'),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     billing_address = models.JSONField()
     shipping_address = models.JSONField()
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
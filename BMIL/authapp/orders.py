@@ -0,0 +1,48 @@
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Cart, Order, OrderItem
+from .pricing import compute_totals, unit_price
+
+
+def place_order(user, billing_address, shipping_address, lines):
+    """
+    Insert an order and its items for `(lead_id, unit_price, quantity)` lines
+    with two queries (order INSERT + one bulk INSERT). Call inside a transaction.
+    """
+    totals = compute_totals([(price, quantity) for _, price, quantity in lines])
+    order = Order.objects.create(
+        user=user, billing_address=billing_address, shipping_address=shipping_address, **totals
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, lead_id=lead_id, price=price, quantity=quantity)
+        for lead_id, price, quantity in lines
+    ])
+    return order
+
+
+def checkout_cart(user, billing_address, shipping_address):
+    """
+    Turn the user's cart into an order and empty the cart, atomically and
+    with a fixed number of queries whatever the cart size: one SELECT of cart
+    rows joined to lead prices, the two order INSERTs and one DELETE.
+    """
+    with transaction.atomic():
+        rows = list(
+            Cart.objects.select_for_update()
+            .filter(user=user)
+            .values_list('id', 'lead_id', 'quantity', 'lead__price', 'lead__discount_price')
+        )
+        if not rows:
+            raise ValidationError({'cart': ["Cart is empty"]})
+        lines = []
+        for _, lead_id, quantity, price, discount_price in rows:
+            price = unit_price(price, discount_price)
+            if price is None:
+                raise ValidationError({'cart': [f"Lead {lead_id} is not for sale"]})
+            lines.append((lead_id, price, quantity))
+
+        order = place_order(user, billing_address, shipping_address, lines)
+        # Delete exactly the snapshotted rows; anything added meanwhile stays
+        Cart.objects.filter(id__in=[row[0] for row in rows]).delete()
+    return order, lines
@@ -0,0 +1,218 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError as ParamValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique composite ordering.
+
+    Instead of OFFSET, each page is fetched with a WHERE clause on the last
+    row of the previous page, so with a matching index page N costs the same
+    as page 1. The cursor is an opaque base64 token holding the key values.
+    """
+    ordering = ('created_at', 'id')  # Must end with a unique field
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        return self.ordering
+
+    def encode_cursor(self, values, reverse=False):
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_token(self, token):
+        """(raw key values, reverse) from a cursor token; raises on garbage."""
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return payload['v'], bool(payload['r'])
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            raw_values, reverse = self.decode_token(token)
+            if len(raw_values) != len(self.get_ordering(request)):
+                raise ValueError
+            values = [
+                model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.get_ordering(request), raw_values)
+            ]
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def keyset_filter(self, ordering, values, reverse):
+        """
+        Build `(a, b) > (x, y)` as `a > x OR (a = x AND b > y)`, honouring
+        per-field direction so mixed orderings like ('-rating', '-id') work.
+        """
+        condition = Q()
+        for i, name in enumerate(ordering):
+            field = name.lstrip('-')
+            descending = name.startswith('-') != reverse
+            step = Q(**{f'{field}__{"lt" if descending else "gt"}': values[i]})
+            for prev_name, prev_value in zip(ordering[:i], values[:i]):
+                step &= Q(**{prev_name.lstrip('-'): prev_value})
+            condition = step if not condition else condition | step
+        return condition
+
+    def get_page_queryset(self, queryset, request):
+        """Return the sliced queryset for the requested page (not evaluated)."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size_value = self.get_page_size(request)
+        ordering = self.get_ordering(request)
+        values, self.reverse = self.decode_cursor(request, queryset.model)
+        self.has_cursor = values is not None
+
+        if self.reverse:
+            order_by = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        else:
+            order_by = list(ordering)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, values, self.reverse))
+        return queryset.order_by(*order_by)[:self.page_size_value + 1]
+
+    def finalize_page(self, rows):
+        """Trim the look-ahead row and work out next/previous cursors."""
+        rows = list(rows)
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.page = rows
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finalize_page(self.get_page_queryset(queryset, request))
+
+    def _key_values(self, obj):
+        values = []
+        for name in self.get_ordering(self.request):
+            value = getattr(obj, name.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self._key_values(self.page[-1]))
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        cursor = self.encode_cursor(self._key_values(self.page[0]), reverse=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_payload(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_payload(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class LeadCursorPagination(KeysetPagination):
+    """Lead catalog ordered by (created_at, id), backed by `lead_created_id_idx`."""
+    ordering = ('created_at', 'id')
+
+    def get_page_size(self, request):
+        # Read per request rather than at import, so settings changes apply
+        self.page_size = getattr(settings, 'LEAD_PAGE_SIZE', 20)
+        self.max_page_size = getattr(settings, 'LEAD_MAX_PAGE_SIZE', 100)
+        return super().get_page_size(request)
+
+
+class ReviewCursorPagination(KeysetPagination):
+    """
+    A lead's reviews by ?sort=newest (default), highest or lowest rating.
+    Each ordering ends with the id in the same direction, so the
+    (lead, created_at) and (lead, rating) indexes serve it without a sort:
+    equal ratings are listed newest first by highest and oldest first by lowest.
+    """
+    sort_query_param = 'sort'
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        'highest': ('-rating', '-id'),
+        'lowest': ('rating', 'id'),
+    }
+
+    def get_ordering(self, request):
+        sort = request.query_params.get(self.sort_query_param) or 'newest'
+        if sort not in self.orderings:
+            raise ParamValidationError({self.sort_query_param: [f'Must be one of: {", ".join(self.orderings)}.']})
+        return self.orderings[sort]
+
+
+class LeadDistancePagination(LeadCursorPagination):
+    """
+    Forward-only pages of a [(distance_km, lead_id)] ranking (authapp.geo),
+    keyed on (distance, id) so the next page starts after the last row seen.
+    """
+
+    def paginate_ranking(self, ranking, request, limit=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size_value = limit or self.get_page_size(request)
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            try:
+                distance, lead_id = self.decode_token(token)[0]
+                after = (float(distance), int(lead_id))
+            except (binascii.Error, ValueError, KeyError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+            ranking = [row for row in ranking if row > after]
+        self.page = ranking[:self.page_size_value]
+        self.has_next = len(ranking) > self.page_size_value
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(list(self.page[-1])))
+
+    def get_previous_link(self):
+        return None
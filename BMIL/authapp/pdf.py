@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Image, Table, TableStyle
+
+from .images import get_image_fetcher
+from .metrics import PDF_CACHE, PDF_RENDER, timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Bump whenever the layout below changes so cached PDFs are re-rendered
+PDF_TEMPLATE_VERSION = 1
+
+SNAPSHOT_FIELDS = (
+    'id', 'name', 'location', 'property_type', 'property_status', 'service_required_on',
+    'budget', 'requirement', 'tags', 'image_url', 'price', 'discount_price',
+)
+
+
+def lead_snapshot(lead):
+    """Plain, picklable copy of the fields that appear in the PDF."""
+    return {
+        field: None if getattr(lead, field) is None else str(getattr(lead, field))
+        for field in SNAPSHOT_FIELDS
+    }
+
+
+def content_key(snapshot):
+    payload = json.dumps({'template': PDF_TEMPLATE_VERSION, 'lead': snapshot}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def draw_lead_page(pdf, lead):
+    """
+    Draw one lead (a snapshot dict) on the current page of `pdf`. Returns
+    False if the lead has an image that could not be loaded.
+    """
+    width, height = letter  # Page size
+
+    # 🔹 **Set Header Title**
+    pdf.setFont("Helvetica-Bold", 20)
+    pdf.setFillColor(colors.darkblue)
+    pdf.drawString(200, height - 50, "Lead Details Report")
+    pdf.setStrokeColor(colors.black)
+    pdf.line(50, height - 55, 550, height - 55)  # Add line below title
+
+    # 🔹 **Lead Details in a Box**
+    pdf.setFont("Helvetica", 12)
+    pdf.setFillColor(colors.black)
+    pdf.rect(50, height - 280, 500, 200, stroke=True, fill=False)  # Box for details
+
+    details = [
+        ["Name:", lead['name']],
+        ["Location:", lead['location']],
+        ["Property Type:", lead['property_type']],
+        ["Property Status:", lead['property_status']],
+        ["Service Required On:", lead['service_required_on']],
+        ["Budget:", f"Rs {lead['budget']}"],
+        ["Requirement:", lead['requirement']],
+        ["Tags:", lead['tags'] if lead['tags'] else "N/A"],
+        ["Price:", f"Rs {lead['price']} (Discounted: Rs {lead['discount_price']})"],
+    ]
+
+    table = Table(details, colWidths=[150, 350])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 5),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ]))
+
+    table.wrapOn(pdf, 50, height - 280)
+    table.drawOn(pdf, 55, height - 270)
+
+    # 🔹 **Include Image if Available** (pre-scaled to the 200x150 slot)
+    complete = True
+    if lead['image_url']:
+        img_path = get_image_fetcher().fetch(lead['image_url'])
+        if img_path is not None:
+            img = Image(img_path, width=200, height=150)
+            img.drawOn(pdf, 200, height - 480)  # Adjust position
+            pdf.setFont("Helvetica", 10)
+            pdf.drawString(220, height - 500, "Property Image")
+        else:
+            pdf.drawString(100, height - 500, "Image could not be loaded.")
+            complete = False
+
+    # 🔹 **Footer**
+    pdf.setFont("Helvetica-Oblique", 10)
+    pdf.setFillColor(colors.grey)
+    pdf.drawString(200, 30, "Generated by Interior Leads System | © 2025")
+
+    pdf.showPage()
+    return complete
+
+
+def render_lead_pdf(lead):
+    """
+    Render a single-lead PDF from a snapshot dict. Returns `(data, complete)`
+    where `complete` is False if the image was missing.
+    """
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    complete = draw_lead_page(pdf, lead)
+    pdf.save()
+    return buffer.getvalue(), complete
+
+
+class PdfCache:
+    """
+    Content-addressed store of rendered lead PDFs.
+
+    Files are named by `content_key()`, so an edited lead (or a new template
+    version) simply maps to a new file. Hits refresh the file's mtime and
+    eviction removes the least recently used files once the directory grows
+    past `max_bytes`. Concurrent misses for the same key are collapsed into
+    one render by a per-key lock (threads) plus an flock (processes).
+
+    A PDF rendered without its image is stored under `<key>-image-missing`
+    and served for `degraded_ttl` seconds (the image fetcher's negative TTL),
+    after which the next request re-renders and retries the image.
+    """
+
+    def __init__(self, directory, max_bytes, degraded_ttl=600):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.degraded_ttl = degraded_ttl
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f'{key}.pdf')
+
+    @staticmethod
+    def degraded_key(key):
+        return f'{key}-image-missing'
+
+    def _thread_lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def lookup(self, key):
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def lookup_degraded(self, key):
+        # Not touched on a hit: its mtime is when the image was last tried
+        path = self.path_for(self.degraded_key(key))
+        try:
+            age = time.time() - os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        return path if age <= self.degraded_ttl else None
+
+    def get_or_render(self, snapshot, render=render_lead_pdf):
+        """Return the path of the cached PDF, rendering it first on a miss."""
+        key = content_key(snapshot)
+        path = self.lookup(key) or self.lookup_degraded(key)
+        if path:
+            PDF_CACHE.labels('hit').inc()
+            return path
+
+        with self._thread_lock(key):
+            lock_file = open(self.path_for(key) + '.lock', 'w')
+            try:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Another worker may have rendered it meanwhile
+                path = self.lookup(key) or self.lookup_degraded(key)
+                if path is None:
+                    PDF_CACHE.labels('miss').inc()
+                    with timed(PDF_RENDER):
+                        data, complete = render(snapshot)
+                    path = self._store(key if complete else self.degraded_key(key), data)
+            finally:
+                # Unlinked while still held: a process already waiting on it
+                # finds the stored PDF, and a later miss creates a fresh lock
+                self._remove(self.path_for(key) + '.lock')
+                lock_file.close()
+                with self._locks_guard:
+                    self._locks.pop(key, None)
+        self.evict()
+        return path
+
+    def _store(self, key, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        path = self.path_for(key)
+        os.replace(tmp_path, path)  # Atomic: readers never see a partial file
+        return path
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.pdf'):
+                    stat = entry.stat()
+                    if (entry.name.endswith('-image-missing.pdf')
+                            and time.time() - stat.st_mtime > self.degraded_ttl):
+                        self._remove(entry.path)  # Expired: superseded by the next render
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+_pdf_cache = None
+
+
+def get_pdf_cache():
+    global _pdf_cache
+    if _pdf_cache is None:
+        config = settings.LEAD_PDF_CACHE
+        _pdf_cache = PdfCache(
+            config['DIR'], config['MAX_BYTES'],
+            degraded_ttl=settings.LEAD_IMAGE_FETCH['NEGATIVE_TTL'],
+        )
+    return _pdf_cache
@@ -0,0 +1,38 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from .models import Lead
+
+CENT = Decimal('0.01')
+
+
+def _money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def unit_price(price, discount_price):
+    """What a buyer pays for one unit of a lead: the discount price when set."""
+    return discount_price if discount_price is not None else price
+
+
+def lead_prices(lead_ids):
+    """Current unit price of each lead, fetched in one query. Raises if any is missing or unpriced."""
+    rows = Lead.objects.filter(id__in=set(lead_ids)).values_list('id', 'price', 'discount_price')
+    prices = {lead_id: unit_price(price, discount_price) for lead_id, price, discount_price in rows}
+    missing = sorted(set(lead_ids) - set(prices))
+    if missing:
+        raise ValidationError({'items': [f"Lead {lead_id} not found" for lead_id in missing]})
+    unpriced = sorted(lead_id for lead_id, price in prices.items() if price is None)
+    if unpriced:
+        raise ValidationError({'items': [f"Lead {lead_id} is not for sale" for lead_id in unpriced]})
+    return prices
+
+
+def compute_totals(lines):
+    """Subtotal, CGST, SGST and total for `(unit_price, quantity)` lines."""
+    subtotal = _money(sum((price * quantity for price, quantity in lines), Decimal('0')))
+    cgst = _money(subtotal * Decimal(settings.ORDER_CGST_RATE))
+    sgst = _money(subtotal * Decimal(settings.ORDER_SGST_RATE))
+    return {'subtotal': subtotal, 'cgst': cgst, 'sgst': sgst, 'total': subtotal + cgst + sgst}
@@ -0,0 +1,164 @@
+"""
+Per-request SQL, serializer and wall-time profiling (see ProfilingMiddleware).
+
+A sampled request gets a RequestProfile installed as an execute_wrapper on
+every database alias and in a ContextVar, which serializer timing reads.
+Serialization is timed by authapp's own serializers (ProfiledSerializerMixin
+in authapp/serializers.py) and JSON renderer (ProfiledJSONRenderer below).
+Unsampled requests only pay for the sampling decision and two clock
+readings, which is enough to still catch slow requests.
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar('current_profile', default=None)
+
+DEFAULTS = {
+    'SAMPLE_RATE': 0.0,
+    'SLOW_REQUEST_MS': 500,
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'SERVER_TIMING': True,
+}
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'IN \((?:(?:%s|\?), )*(?:%s|\?)\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """SQL with literals and IN lists collapsed, so per-row variants compare equal."""
+    sql = _LITERALS.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def profiling_config():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_PROFILING', {})}
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+        self._statements = Counter()  # Raw SQL; normalized only when reporting
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+            self._statements[sql] += 1
+
+    def record_queries(self):
+        """
+        Route this thread's queries on every alias through the profile until
+        the returned ExitStack is closed.
+        """
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+    def repeated_statements(self, threshold):
+        """[(normalized sql, count)] run more than `threshold` times, most frequent first."""
+        normalized = Counter()
+        for sql, count in self._statements.items():
+            normalized[normalize_sql(sql)] += count
+        return [(sql, count) for sql, count in normalized.most_common() if count > threshold]
+
+
+def start_profile(config):
+    """A RequestProfile for a sampled request, else None."""
+    rate = config['SAMPLE_RATE']
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    return RequestProfile()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    if hasattr(func, 'async_view'):  # authapp.async_views.split_by_method
+        func = func.async_view if request.method in ('GET', 'HEAD') else func.sync_view
+    view_class = getattr(func, 'view_class', None)
+    return view_class.__name__ if view_class else func.__name__
+
+
+def finish_profile(request, response, profile, seconds, config):
+    """Add Server-Timing to `response` and log slow requests and N+1 patterns."""
+    elapsed_ms = seconds * 1000
+    record = None
+    if profile is not None:
+        record = {
+            'queries': profile.queries,
+            'sql_ms': round(profile.sql_seconds * 1000, 2),
+            'serializer_ms': round(profile.serializer_seconds * 1000, 2),
+        }
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                f'db;dur={record["sql_ms"]};desc="{profile.queries} queries", '
+                f'serialize;dur={record["serializer_ms"]}, total;dur={elapsed_ms:.2f}'
+            )
+        repeated = profile.repeated_statements(config['N_PLUS_ONE_THRESHOLD'])
+        if repeated:
+            _log('n_plus_one', request, response, elapsed_ms, {
+                **record, 'statements': [{'sql': sql, 'count': count} for sql, count in repeated],
+            })
+    if elapsed_ms >= config['SLOW_REQUEST_MS']:
+        _log('slow_request', request, response, elapsed_ms, record or {'sampled': False})
+
+
+def _log(event, request, response, elapsed_ms, details):
+    logger.warning(json.dumps({
+        'event': event,
+        'view': view_name(request),
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(elapsed_ms, 2),
+        **details,
+    }))
+
+
+@contextmanager
+def serializing(profile):
+    """Count the block as serialization time in `profile`; nested blocks count once."""
+    if profile.serializing:
+        yield
+        return
+    profile.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serializer_seconds += time.perf_counter() - started
+        profile.serializing = False
+
+
+class ProfiledJSONRenderer(JSONRenderer):
+    """JSONRenderer whose encoding time counts as serialization in sampled requests."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        profile = current_profile.get()
+        if profile is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        with serializing(profile):
+            return super().render(data, accepted_media_type, renderer_context)
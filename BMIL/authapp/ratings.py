@@ -0,0 +1,81 @@
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .cache import bump_catalog_version
+from .models import Lead, Review
+
+RATINGS = range(1, 6)
+HISTOGRAM_FIELDS = {rating: f'rating_{rating}' for rating in RATINGS}
+
+
+def apply_rating_change(lead_id, added=None, removed=None):
+    """
+    Fold one review change into the lead's aggregates with a single UPDATE.
+
+    `added` is the new rating (create/update), `removed` the old one
+    (update/delete). Every column is computed from its current value in the
+    database, so concurrent review writes cannot lose updates. Call inside
+    the same transaction as the review write.
+    """
+    count_delta = (added is not None) - (removed is not None)
+    sum_delta = (added or 0) - (removed or 0)
+
+    histogram_deltas = {}
+    if added is not None:
+        histogram_deltas[added] = histogram_deltas.get(added, 0) + 1
+    if removed is not None:
+        histogram_deltas[removed] = histogram_deltas.get(removed, 0) - 1
+
+    updates = {
+        HISTOGRAM_FIELDS[rating]: F(HISTOGRAM_FIELDS[rating]) + delta
+        for rating, delta in histogram_deltas.items() if delta
+    }
+    if not updates and not count_delta:
+        return
+    updates['rating_count'] = F('rating_count') + count_delta
+    updates['rating_sum'] = F('rating_sum') + sum_delta
+    # SET expressions see the pre-update row, so apply the deltas here as well
+    updates['rating_avg'] = Coalesce(
+        Cast(F('rating_sum') + sum_delta, FloatField()) / NullIf(F('rating_count') + count_delta, Value(0)),
+        Value(0.0),
+        output_field=FloatField(),
+    )
+    Lead.objects.filter(pk=lead_id).update(**updates)
+    bump_catalog_version()
+
+
+def rating_histogram(lead):
+    return {str(rating): getattr(lead, field) for rating, field in HISTOGRAM_FIELDS.items()}
+
+
+def reconcile_aggregates(batch_size=1000):
+    """
+    Recompute every lead's aggregates from the Review table. Returns the
+    number of leads whose stored values were wrong.
+    """
+    totals = {
+        row['lead_id']: row
+        for row in Review.objects.order_by().values('lead_id').annotate(
+            count=Count('id'),
+            total=Sum('rating'),
+            **{field: Count('id', filter=Q(rating=rating)) for rating, field in HISTOGRAM_FIELDS.items()},
+        )
+    }
+    fields = ['rating_avg', 'rating_count', 'rating_sum', *HISTOGRAM_FIELDS.values()]
+    stale = []
+    for lead in Lead.objects.only('id', *fields).iterator(chunk_size=batch_size):
+        row = totals.get(lead.id)
+        expected = {
+            'rating_count': row['count'] if row else 0,
+            'rating_sum': row['total'] if row else 0,
+            **{field: row[field] if row else 0 for field in HISTOGRAM_FIELDS.values()},
+        }
+        expected['rating_avg'] = expected['rating_sum'] / expected['rating_count'] if expected['rating_count'] else 0.0
+        if any(getattr(lead, field) != value for field, value in expected.items()):
+            for field, value in expected.items():
+                setattr(lead, field, value)
+            stale.append(lead)
+    Lead.objects.bulk_update(stale, fields, batch_size=batch_size)
+    if stale:
+        bump_catalog_version()
+    return len(stale)
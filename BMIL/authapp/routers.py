@@ -0,0 +1,40 @@
+"""
+Read/write split for the 'read' database alias.
+
+Reads go to 'read' only while a safe-method request is being served (see
+authapp.middleware.ReadRoutingMiddleware) and no transaction is open on
+'default', so code that writes and then reads back always sees its own
+writes. Everything else, including management commands, stays on 'default'.
+"""
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = 'read'
+
+read_only_request = ContextVar('read_only_request', default=False)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not read_only_request.get() or READ_ALIAS not in connections.settings:
+            return None
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.in_atomic_block:
+            return None
+        if connections[READ_ALIAS].settings_dict is primary.settings_dict:
+            return None  # Test mirror: same database, keep one connection
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, READ_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == READ_ALIAS:
+            return False
+        return None
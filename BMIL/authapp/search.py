@@ -0,0 +1,147 @@
+import html
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Lead
+
+# Standalone FTS5 table whose rowid is the Lead id. Column order matters for
+# bm25() weights and snippet()/highlight() column numbers below.
+FTS_TABLE = 'authapp_lead_fts'
+FTS_COLUMNS = ('name', 'requirement', 'tags', 'location')
+BM25_WEIGHTS = (5.0, 1.0, 3.0, 2.0)
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    f"USING fts5({', '.join(FTS_COLUMNS)}, tokenize='porter unicode61')"
+)
+BULK_INSERT_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+    f"SELECT id, name, requirement, COALESCE(tags, ''), location FROM authapp_lead"
+)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# highlight()/snippet() wrap matches in these control characters; the text is
+# HTML-escaped first and only then are they turned into <mark> tags
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def fts_enabled(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def _row(lead):
+    return (lead.pk, lead.name, lead.requirement, lead.tags or '', lead.location)
+
+
+def index_leads(leads):
+    """Insert or refresh the FTS rows for the given leads."""
+    if not fts_enabled():
+        return
+    rows = [_row(lead) for lead in leads]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def index_lead(lead):
+    index_leads([lead])
+
+
+def remove_lead(lead_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [lead_id])
+
+
+def rebuild_index():
+    """Repopulate the whole index with one INSERT ... SELECT and merge its segments."""
+    if not fts_enabled():
+        return 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_SQL)
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(BULK_INSERT_SQL)
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+
+def build_match_expression(query):
+    """
+    Turn free text into a safe FTS5 query: every word is quoted (so user
+    input can't inject FTS operators) and the last one is a prefix match.
+    """
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def markup(text):
+    """Highlighted FTS text as safe HTML: escaped, with the matches in <mark>."""
+    return html.escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def search_leads(query, limit=20, offset=0):
+    """
+    Return `(lead, rank, snippets)` tuples ordered by BM25 (best first).
+    Leads are loaded with a single query after ranking.
+    """
+    if not fts_enabled():
+        return _fallback_search(query, limit, offset)
+
+    match = build_match_expression(query)
+    if match is None:
+        return []
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    sql = (
+        f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score, "
+        f"highlight({FTS_TABLE}, 0, %s, %s), "
+        f"snippet({FTS_TABLE}, 1, %s, %s, '…', 16), "
+        f"highlight({FTS_TABLE}, 2, %s, %s), "
+        f"highlight({FTS_TABLE}, 3, %s, %s) "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY score LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [MARK_START, MARK_END] * 4 + [match, limit, offset])
+        hits = cursor.fetchall()
+
+    leads = Lead.objects.in_bulk([hit[0] for hit in hits])
+    results = []
+    for lead_id, score, name, requirement, tags, location in hits:
+        lead = leads.get(lead_id)
+        if lead is None:  # Index row outlived its lead; skip until the next rebuild
+            continue
+        snippets = {
+            'name': markup(name), 'requirement': markup(requirement),
+            'tags': markup(tags), 'location': markup(location),
+        }
+        results.append((lead, -score, snippets))  # bm25() is lower-is-better
+    return results
+
+
+def _fallback_search(query, limit, offset):
+    """Unranked substring search for databases without FTS5."""
+    condition = Q()
+    for token in _TOKEN_RE.findall(query):
+        condition &= (
+            Q(name__icontains=token) | Q(requirement__icontains=token)
+            | Q(tags__icontains=token) | Q(location__icontains=token)
+        )
+    if not condition:
+        return []
+    leads = Lead.objects.filter(condition).order_by('-created_at', '-id')[offset:offset + limit]
+    return [(lead, 0.0, {}) for lead in leads]
@@ -0,0 +1,204 @@
+"""
+Synthetic data for benchmarks and load tests.
+
+Rows are inserted in fixed-size batches, each in its own transaction, and
+generated per batch, so memory stays flat and millions of leads take
+minutes, not hours. Work that post_save would normally do is done in bulk
+instead: rating aggregates are computed while generating the reviews, tags
+are linked per batch, and the search index and similar-lead neighbours are
+rebuilt once at the end.
+"""
+import random
+import uuid
+from array import array
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import search, similarity, tags
+from .cache import bump_catalog_version
+from .geo import encode_geohash, geocode
+from .models import Cart, Lead, Order, OrderItem, Review, Wishlist
+from .pricing import compute_totals, unit_price
+from .ratings import HISTOGRAM_FIELDS
+
+LOCATIONS = ('Pune', 'Mumbai', 'Nashik', 'Nagpur', 'Bengaluru', 'Hyderabad', 'Chennai', 'Delhi', 'Kolkata', 'Ahmedabad')
+PROPERTY_TYPES = ('Flat', 'Villa', 'Office', 'Shop', 'Bungalow', 'Row House')
+PROPERTY_STATUSES = ('Ready', 'Under Construction', 'Renovation')
+SERVICES = ('Immediately', 'Within a month', 'Within 3 months')
+TAGS = ('modern', 'kitchen', 'modular', 'wardrobe', 'false ceiling', 'lighting', 'flooring', 'bathroom', 'luxury', 'budget')
+WORDS = ('complete', 'interior', 'design', 'for', 'a', 'new', '2bhk', '3bhk', 'home', 'with', 'modular', 'kitchen',
+         'wardrobes', 'and', 'lighting', 'office', 'renovation', 'painting', 'woodwork', 'tiles')
+
+
+REVIEW_FIELDS = ('lead', 'user', 'name', 'email', 'rating', 'review_text', 'created_at')
+
+
+def _batches(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def _insert_rows(model, fields, rows):
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})', rows)
+
+
+class SyntheticData:
+    def __init__(self, batch_size=5000, seed=0, progress=None):
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.progress = progress or (lambda message: None)
+        self.run = uuid.uuid4().hex[:8]  # Keeps usernames unique across repeated seeds
+        self.user_ids = array('q')
+        self.lead_ids = array('q')  # Compact even for millions of leads
+        self.counts = {}
+
+    def _count(self, name, amount):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def seed(self, users=100, leads=10000, reviews_per_lead=2, wishlist_per_user=5, cart_per_user=3, orders_per_user=1):
+        self.create_users(users)
+        self.create_leads(leads, reviews_per_lead)
+        self.create_memberships(wishlist_per_user, cart_per_user)
+        self.create_orders(orders_per_user)
+        search.rebuild_index()
+        similarity.rebuild(self.progress)
+        bump_catalog_version()
+        return self.counts
+
+    def create_users(self, count):
+        password = make_password('bench-password-1')  # Hashing per user would dominate the run
+        User = get_user_model()
+        for start, size in _batches(count, self.batch_size):
+            with transaction.atomic():
+                created = User.objects.bulk_create([
+                    User(username=f'bench_{self.run}_{start + i}', email=f'bench{start + i}@example.com', password=password)
+                    for i in range(size)
+                ])
+            self.user_ids.extend(user.pk for user in created)
+            self._count('users', size)
+
+    def _lead_row(self, lead_id, index, now):
+        rng = self.rng
+        price = rng.randrange(100, 5000)
+        discount_price = round(price * 0.8) if rng.random() < 0.3 else None
+        ratings = [rng.randint(1, 5) for _ in range(rng.randint(0, 2 * self.reviews_per_lead))] if self.user_ids else []
+        location = rng.choice(LOCATIONS)
+        city_latitude, city_longitude = geocode(location)
+        latitude = city_latitude + rng.gauss(0, 0.1)  # Spread leads ~10km around the city centre
+        longitude = city_longitude + rng.gauss(0, 0.1)
+        row = {
+            'id': lead_id,
+            'name': f'{rng.choice(PROPERTY_TYPES)} interiors #{index}',
+            'location': location,
+            'latitude': latitude,
+            'longitude': longitude,
+            'geohash': encode_geohash(latitude, longitude),
+            'property_type': rng.choice(PROPERTY_TYPES),
+            'property_status': rng.choice(PROPERTY_STATUSES),
+            'service_required_on': rng.choice(SERVICES),
+            'budget': self._decimal(rng.randrange(50, 5000) * 1000),
+            'requirement': ' '.join(rng.choices(WORDS, k=rng.randint(6, 16))),
+            'tags': ','.join(rng.sample(TAGS, rng.randint(0, 3))),
+            'price': self._decimal(price),
+            'discount_price': None if discount_price is None else self._decimal(discount_price),
+            'created_at': now,
+            # Aggregates as authapp.ratings would have maintained them
+            'rating_count': len(ratings),
+            'rating_sum': sum(ratings),
+            'rating_avg': sum(ratings) / len(ratings) if ratings else 0,
+            **{field: ratings.count(stars) for stars, field in HISTOGRAM_FIELDS.items()},
+        }
+        return row, ratings
+
+    def _decimal(self, value):
+        return connection.ops.adapt_decimalfield_value(Decimal(value), 10, 2)
+
+    def create_leads(self, count, reviews_per_lead):
+        """
+        Leads and reviews are the bulk of the data, so they skip bulk_create's
+        per-value compilation and go through executemany() with ids assigned
+        here (the generated lead ids are needed for reviews and tags anyway).
+        """
+        self.reviews_per_lead = reviews_per_lead
+        rng = self.rng
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        next_id = (Lead.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        for start, size in _batches(count, self.batch_size):
+            rows, reviews = [], []
+            for i in range(size):
+                row, ratings = self._lead_row(next_id + start + i, start + i, now)
+                rows.append(row)
+                reviews.extend(
+                    (row['id'], rng.choice(self.user_ids), 'Bench reviewer', 'reviewer@example.com', rating, 'Synthetic review', now)
+                    for rating in ratings
+                )
+            with transaction.atomic():
+                _insert_rows(Lead, list(rows[0]), [tuple(row.values()) for row in rows])
+                _insert_rows(Review, REVIEW_FIELDS, reviews)
+                tags.index_new_leads([SimpleNamespace(pk=row['id'], tags=row['tags']) for row in rows])
+            self.lead_ids.extend(row['id'] for row in rows)
+            self._count('leads', size)
+            self._count('reviews', len(reviews))
+            self.progress(f"{self.counts['leads']} leads")
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Lead]):  # Explicit ids (PostgreSQL)
+                cursor.execute(sql)
+
+    def _sample_leads(self, count):
+        return self.rng.sample(self.lead_ids, min(count, len(self.lead_ids)))
+
+    def create_memberships(self, wishlist_per_user, cart_per_user):
+        users_per_batch = max(1, self.batch_size // max(1, wishlist_per_user + cart_per_user))
+        for start in range(0, len(self.user_ids), users_per_batch):
+            wishlists, carts = [], []
+            for user_id in self.user_ids[start:start + users_per_batch]:
+                wishlists.extend(Wishlist(user_id=user_id, lead_id=lead_id) for lead_id in self._sample_leads(wishlist_per_user))
+                carts.extend(
+                    Cart(user_id=user_id, lead_id=lead_id, quantity=self.rng.randint(1, 3))
+                    for lead_id in self._sample_leads(cart_per_user)
+                )
+            with transaction.atomic():
+                Wishlist.objects.bulk_create(wishlists, ignore_conflicts=True)
+                Cart.objects.bulk_create(carts, ignore_conflicts=True)
+            self._count('wishlists', len(wishlists))
+            self._count('carts', len(carts))
+
+    def create_orders(self, orders_per_user):
+        address = {'first_name': 'Bench', 'city': 'Pune', 'country': 'India'}
+        users_per_batch = max(1, self.batch_size // max(1, orders_per_user * 3))
+        for start in range(0, len(self.user_ids), users_per_batch):
+            planned = [
+                (user_id, [(lead_id, self.rng.randint(1, 2)) for lead_id in self._sample_leads(self.rng.randint(1, 3))])
+                for user_id in self.user_ids[start:start + users_per_batch] for _ in range(orders_per_user)
+            ]
+            lead_ids = {lead_id for _, lines in planned for lead_id, _ in lines}
+            prices = {
+                lead_id: unit_price(price, discount_price)
+                for lead_id, price, discount_price in Lead.objects.filter(id__in=lead_ids).values_list('id', 'price', 'discount_price')
+            }
+            with transaction.atomic():
+                orders = Order.objects.bulk_create([
+                    Order(user_id=user_id, billing_address=address, shipping_address=address,
+                          payment_status=self.rng.choice(('Pending', 'Paid')),
+                          **compute_totals([(prices[lead_id], quantity) for lead_id, quantity in lines]))
+                    for user_id, lines in planned
+                ])
+                items = OrderItem.objects.bulk_create([
+                    OrderItem(order_id=order.pk, lead_id=lead_id, price=prices[lead_id], quantity=quantity)
+                    for order, (_, lines) in zip(orders, planned) for lead_id, quantity in lines
+                ])
+            self._count('orders', len(orders))
+            self._count('order_items', len(items))
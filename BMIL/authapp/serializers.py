@@ -1,11 +1,29 @@
 from rest_framework import serializers
+from django.db import transaction
 from django.contrib.auth import get_user_model
 from .models import Lead, Review, Wishlist, Cart, Address
 from .models import Order, OrderItem
+from .tags import parse_tags
+from .ratings import HISTOGRAM_FIELDS, rating_histogram
+from .pricing import lead_prices
+from .orders import place_order
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .authentication import CachedBlacklistRefreshToken
+from .profiling import current_profile, serializing
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class ProfiledSerializerMixin:
+    """Counts to_representation() as serialization time in sampled requests (authapp.profiling)."""
+
+    def to_representation(self, instance):
+        profile = current_profile.get()
+        if profile is None:
+            return super().to_representation(instance)
+        with serializing(profile):
+            return super().to_representation(instance)
+
+class UserSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'password', 'email')
@@ -17,50 +35,113 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
-class LeadSerializer(serializers.ModelSerializer):
+class RefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
+
+class LeadSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    tag_list = serializers.SerializerMethodField()  # Normalized view of `tags`; `tags` itself is unchanged
+    rating_histogram = serializers.SerializerMethodField()
+
     class Meta:
         model = Lead
-        fields = '__all__'
+        exclude = ['rating_sum', *HISTOGRAM_FIELDS.values()]  # Exposed via rating_avg / rating_histogram
+        read_only_fields = ['rating_avg', 'rating_count']
+
+    def get_tag_list(self, obj):
+        return parse_tags(obj.tags)
+
+    def get_rating_histogram(self, obj):
+        return rating_histogram(obj)
+
+    def validate(self, attrs):
+        if ('latitude' in attrs) != ('longitude' in attrs):
+            raise serializers.ValidationError("latitude and longitude must be given together.")
+        return attrs
+
+    def update(self, instance, validated_data):
+        # Only write the submitted columns so an edit can't clobber rating
+        # aggregates updated concurrently by review writes.
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
 
-class ReviewSerializer(serializers.ModelSerializer):
+class SimilarLeadSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    # Summary of a lead for the `similar_leads` list on the lead detail
+    class Meta:
+        model = Lead
+        fields = ['id', 'name', 'location', 'property_type', 'budget', 'price', 'discount_price', 'image_url', 'rating_avg']
+
+class ReviewSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ['id', 'lead', 'user', 'name', 'email', 'rating', 'review_text', 'created_at']
         read_only_fields = ['lead', 'user', 'created_at']
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Wishlist
         fields = ['id', 'user', 'lead', 'created_at']
         read_only_fields = ['user', 'created_at']
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Cart
         fields = ['id', 'user', 'lead', 'quantity', 'created_at']
         read_only_fields = ['user', 'created_at']
 
-class AddressSerializer(serializers.ModelSerializer):
+class CartOperationSerializer(serializers.Serializer):
+    ACTIONS = ['add', 'set', 'remove']
+
+    lead = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=ACTIONS, default='add')
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+    def validate(self, data):
+        if data['action'] == 'add' and data['quantity'] < 1:
+            raise serializers.ValidationError({'quantity': "Must be at least 1 when adding."})
+        return data
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+class AddressSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = '__all__'
         read_only_fields = ['user', 'address_type']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = OrderItem
-        fields = '__all__'
+        fields = ['id', 'lead_id', 'price', 'quantity']
+        read_only_fields = ['price']  # Snapshot of the lead price at checkout
+        extra_kwargs = {'quantity': {'min_value': 1}}
 
-class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True, required=True)
+class OrderSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, required=True, allow_empty=False)
 
     class Meta:
         model = Order
         fields = '__all__'
+        read_only_fields = ['user', 'subtotal', 'cgst', 'sgst', 'total', 'payment_status']
 
     def create(self, validated_data):
+        """
+        Create the order and its items in one transaction with a fixed number
+        of queries: one price lookup, one order INSERT and one bulk INSERT.
+        """
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
+        quantities = {}
         for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
-        return order
\ No newline at end of file
+            lead_id = item_data['lead_id']
+            quantities[lead_id] = quantities.get(lead_id, 0) + item_data.get('quantity', 1)
+
+        with transaction.atomic():
+            prices = lead_prices(quantities)
+            return place_order(
+                validated_data['user'],
+                validated_data['billing_address'],
+                validated_data['shipping_address'],
+                [(lead_id, prices[lead_id], qty) for lead_id, qty in quantities.items()],
+            )
\ No newline at end of file
@@ -0,0 +1,52 @@
+import copy
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search, similarity, tags
+from .authentication import configure_caches, user_cache
+from .cache import bump_catalog_version
+from .metrics import install_query_counter
+from .models import Lead
+
+
+@receiver(post_save, sender=Lead)
+def lead_saved(sender, instance, update_fields=None, **kwargs):
+    search.index_lead(instance)
+    if update_fields is None or 'tags' in update_fields:
+        tags.sync_lead_tags(instance)
+    if update_fields is None or set(update_fields) & set(similarity.VECTOR_FIELDS):
+        # After commit, so the save's transaction doesn't wait on the matrix
+        # file and a rolled-back save leaves no vector behind
+        transaction.on_commit(partial(similarity.update_lead, copy.copy(instance)), robust=True)
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=Lead)
+def lead_deleted(sender, instance, **kwargs):
+    search.remove_lead(instance.pk)
+    transaction.on_commit(partial(similarity.remove_lead, instance.pk), robust=True)
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    # Other processes see the change once their cached copy expires
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(setting_changed)
+def jwt_auth_cache_changed(sender, setting, **kwargs):
+    if setting == 'JWT_AUTH_CACHE':
+        configure_caches()
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_query_counter(connection)
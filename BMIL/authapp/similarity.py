@@ -0,0 +1,333 @@
+"""
+"Similar leads": hashed feature vectors and precomputed nearest neighbours.
+
+A lead's requirement words, tags, property type, location and budget band
+are hashed (crc32, with a hashed sign) into FEATURES buckets. Each field gets
+a fixed share of the vector, which is then L2-normalised, so a dot product
+is the cosine similarity. The vectors form a float32 .npy matrix whose row i
+belongs to lead i (zero rows: no such lead). The file is memory-mapped, so
+scoring leads against the whole catalog is one matrix product.
+
+The NEIGHBORS best matches of every lead are stored in LeadNeighbor, and the
+detail view reads them with one indexed query. rebuild() (manage.py
+build_lead_neighbors) computes all of them in blocks. Saving leads only
+rewrites their rows and their own lists, and offers each saved lead to the
+leads it is closest to.
+
+IDF weighting is deliberately left out: it would make every vector depend
+on the whole catalog, and one save could then change all of them.
+"""
+import hashlib
+import math
+import os
+import re
+import tempfile
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from .models import Lead, LeadNeighbor
+from .serializers import SimilarLeadSerializer
+from .tags import normalize_tag, parse_tags
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to no cross-process locking
+    fcntl = None
+
+FEATURES = 256
+VECTOR_FIELDS = ('requirement', 'tags', 'property_type', 'location', 'budget')
+# Share of the vector each field gets (before normalisation)
+FIELD_WEIGHTS = {'requirement': 1.0, 'tags': 1.0, 'property_type': 0.8, 'location': 1.0, 'budget': 0.6}
+
+# Cells (float32) of one block of scores, which bounds a batch's memory
+BLOCK_CELLS = 2 ** 24
+# A saved lead is offered as a neighbour to this many of its closest leads
+REVERSE_CANDIDATES = 32
+# Ids per IN (...) lookup, well under SQLite's bound-variable limit
+ID_CHUNK = 5000
+
+_WORD = re.compile(r'\w+')
+
+
+def neighbor_count():
+    return settings.LEAD_SIMILARITY['NEIGHBORS']
+
+
+def _single(value):
+    name = normalize_tag(value or '')
+    return {name: 1.0} if name else {}
+
+
+def _budget_band(budget):
+    """Half-octave budget band, spilling into the two next to it."""
+    if budget is None or budget <= 0:
+        return {}
+    band = math.floor(2 * math.log2(float(budget)))
+    return {band: 1.0, band - 1: 0.5, band + 1: 0.5}
+
+
+def _tokens(requirement, tags, property_type, location, budget):
+    """{field: {token: weight}} for one lead."""
+    return {
+        'requirement': dict.fromkeys(_WORD.findall((requirement or '').lower()), 1.0),
+        'tags': dict.fromkeys(parse_tags(tags), 1.0),
+        'property_type': _single(property_type),
+        'location': _single(location),
+        'budget': _budget_band(budget),
+    }
+
+
+def lead_values(lead):
+    return tuple(getattr(lead, field) for field in VECTOR_FIELDS)
+
+
+def vectorize(values):
+    """Unit feature vector for a lead's VECTOR_FIELDS values (zero if all are empty)."""
+    vector = np.zeros(FEATURES, dtype=np.float32)
+    for field, tokens in _tokens(*values).items():
+        if not tokens:
+            continue
+        scale = FIELD_WEIGHTS[field] / math.sqrt(sum(weight * weight for weight in tokens.values()))
+        for token, weight in tokens.items():
+            digest = zlib.crc32(f'{field}:{token}'.encode())
+            vector[digest % FEATURES] += weight * scale if digest & 0x80000000 else -weight * scale
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class VectorStore:
+    """
+    The feature matrix file. Writers hold an flock on a side file. A matrix
+    that must grow is written to a new file and swapped in with os.replace,
+    so readers always map a complete one.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def load(self, mode='r'):
+        """The matrix, memory-mapped (empty if it hasn't been built)."""
+        try:
+            matrix = np.load(self.path, mmap_mode=mode)
+        except FileNotFoundError:
+            return np.zeros((0, FEATURES), dtype=np.float32)
+        if matrix.shape[1] != FEATURES:  # Built with another FEATURES; rebuild() replaces it
+            return np.zeros((0, FEATURES), dtype=np.float32)
+        return matrix
+
+    @contextmanager
+    def locked(self):
+        with open(self.path + '.lock', 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield  # Closing the file releases the lock
+
+    def replace(self, rows, fill):
+        """Swap in a new matrix of `rows` zero rows, after fill(matrix)."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        os.close(fd)
+        try:
+            matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(rows, FEATURES))
+            fill(matrix)
+            matrix.flush()
+            del matrix
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def write(self, vectors):
+        """Store {lead id: vector} and return the updated matrix (read-only)."""
+        ids = np.fromiter(vectors, dtype=np.int64, count=len(vectors))
+        block = np.stack(list(vectors.values()))
+        with self.locked():
+            matrix = self.load()
+            if matrix.shape[0] <= ids.max():
+                def fill(grown):
+                    grown[:matrix.shape[0]] = matrix
+                    grown[ids] = block
+                self.replace(max(int(ids.max()) + 1, 2 * matrix.shape[0]), fill)
+            else:
+                matrix = self.load('r+')
+                matrix[ids] = block
+                matrix.flush()
+        return self.load()
+
+    def clear(self, lead_id):
+        with self.locked():
+            matrix = self.load('r+')
+            if lead_id < matrix.shape[0]:
+                matrix[lead_id] = 0
+                matrix.flush()
+
+
+def vector_store():
+    """The store for the database leads are written to (test databases get their own)."""
+    name = str(connections[router.db_for_write(Lead)].settings_dict['NAME'])
+    key = hashlib.sha256(name.encode()).hexdigest()[:16]
+    return VectorStore(os.path.join(settings.LEAD_SIMILARITY['DIR'], f'{key}.npy'))
+
+
+def _block_rows(matrix):
+    return max(1, BLOCK_CELLS // max(1, matrix.shape[0]))
+
+
+def _scores(ids, matrix):
+    """Similarity of leads `ids` to every row of `matrix`, with themselves excluded."""
+    scores = matrix[ids] @ matrix.T
+    scores[np.arange(len(ids)), ids] = -np.inf
+    return scores
+
+
+def _ranked(scores, count):
+    """Per row of `scores`: [(column, score)] of its `count` best positive scores, best first."""
+    count = min(count, scores.shape[1])
+    if count == 0:
+        return [[] for _ in scores]
+    top = np.argpartition(scores, -count, axis=1)[:, -count:]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.lexsort((top, -top_scores))  # Ties go to the lower id
+    return [
+        [(int(columns[i]), float(values[i])) for i in row_order if values[i] > 0]
+        for columns, values, row_order in zip(top, top_scores, order)
+    ]
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), ID_CHUNK):
+        yield ids[start:start + ID_CHUNK]
+
+
+def _existing(ids):
+    found = set()
+    for chunk in _chunks(ids):
+        found.update(Lead.objects.filter(id__in=chunk).values_list('id', flat=True))
+    return found
+
+
+def _store_lists(lists):
+    """Replace the neighbour lists of {lead id: [(neighbor id, score)]}."""
+    rows = [
+        LeadNeighbor(lead_id=lead_id, neighbor_id=neighbor_id, rank=rank, score=score)
+        for lead_id, ranked in lists.items() for rank, (neighbor_id, score) in enumerate(ranked)
+    ]
+    with transaction.atomic():
+        for chunk in _chunks(lists):
+            LeadNeighbor.objects.filter(lead_id__in=chunk).delete()
+        LeadNeighbor.objects.bulk_create(rows, batch_size=ID_CHUNK)
+
+
+def _best(scored, count):
+    return sorted(scored.items(), key=lambda item: (-item[1], item[0]))[:count]
+
+
+def update_leads(leads):
+    """
+    Store the vectors of saved (or bulk-created) leads, recompute their
+    neighbour lists and merge them into the lists of the leads they are
+    closest to, or that already list them. Merged lists are not recomputed,
+    so they can drift until the next rebuild(); e.g. a lead edited away from
+    them stays listed with its new, lower score.
+    """
+    if not leads:
+        return
+    count = neighbor_count()
+    vectors = {lead.pk: vectorize(lead_values(lead)) for lead in leads}
+    matrix = vector_store().write(vectors)
+    ids = np.fromiter(vectors, dtype=np.int64, count=len(vectors))
+    # Rows can outlive their lead (e.g. a rolled-back insert), so candidates
+    # are checked against the table; the slack covers the ones dropped.
+    own, offers = {}, defaultdict(dict)
+    block = _block_rows(matrix)
+    for start in range(0, len(ids), block):
+        block_ids = ids[start:start + block]
+        scores = _scores(block_ids, matrix)
+        position = {lead_id: row for row, lead_id in enumerate(block_ids.tolist())}
+        for lead_id, ranked in zip(position, _ranked(scores, 2 * count + REVERSE_CANDIDATES)):
+            own[lead_id] = ranked
+            for neighbor_id, score in ranked[:REVERSE_CANDIDATES]:
+                offers[neighbor_id][lead_id] = score
+        listing = LeadNeighbor.objects.filter(neighbor_id__in=position).values_list('lead_id', 'neighbor_id')
+        for lead_id, neighbor_id in listing:
+            offers[lead_id][neighbor_id] = float(scores[position[neighbor_id], lead_id]) if lead_id < matrix.shape[0] else 0.0
+
+    existing = _existing({neighbor_id for ranked in own.values() for neighbor_id, _ in ranked} | set(offers))
+    lists = {
+        lead_id: [(neighbor_id, score) for neighbor_id, score in ranked if neighbor_id in existing][:count]
+        for lead_id, ranked in own.items()
+    }
+    offered = [lead_id for lead_id in offers if lead_id in existing and lead_id not in own]
+    current = defaultdict(dict)
+    for chunk in _chunks(offered):
+        for lead_id, neighbor_id, score in LeadNeighbor.objects.filter(lead_id__in=chunk).values_list('lead_id', 'neighbor_id', 'score'):
+            current[lead_id][neighbor_id] = score
+    for lead_id in offered:
+        merged = {**current[lead_id], **offers[lead_id]}
+        ranked = _best({neighbor_id: score for neighbor_id, score in merged.items() if score > 0}, count)
+        if ranked != _best(current[lead_id], count):
+            lists[lead_id] = ranked
+    _store_lists(lists)
+
+
+def update_lead(lead):
+    update_leads([lead])
+
+
+def remove_lead(lead_id):
+    """Zero a deleted lead's row (its LeadNeighbor rows go with it by cascade)."""
+    vector_store().clear(lead_id)
+
+
+def rebuild(progress=None):
+    """Recompute every vector and neighbour list in blocks; returns the number of leads."""
+    progress = progress or (lambda message: None)
+    count = neighbor_count()
+    store = vector_store()
+    size = (Lead.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+    rows = Lead.objects.filter(id__lt=size).order_by('id').values_list('id', *VECTOR_FIELDS)
+    ids = []
+
+    def fill(matrix):
+        for row in rows.iterator(chunk_size=ID_CHUNK):
+            ids.append(row[0])
+            matrix[row[0]] = vectorize(row[1:])
+
+    with store.locked():  # Saves wait, so none land in the matrix being replaced
+        store.replace(size, fill)
+    progress(f"{len(ids)} vectors")
+
+    matrix = store.load()
+    ids = np.array(ids, dtype=np.int64)
+    block = _block_rows(matrix)
+    for start in range(0, len(ids), block):
+        block_ids = ids[start:start + block]
+        _store_lists(dict(zip(block_ids.tolist(), _ranked(_scores(block_ids, matrix), count))))
+        if (start // block) % 100 == 99:
+            progress(f"{start + len(block_ids)} neighbour lists")
+    return len(ids)
+
+
+def neighbors_queryset(lead_id):
+    return LeadNeighbor.objects.filter(lead_id=lead_id).select_related('neighbor').order_by('rank')
+
+
+def serialize_neighbors(neighbors):
+    data = SimilarLeadSerializer([neighbor.neighbor for neighbor in neighbors], many=True).data
+    return [{**row, 'score': round(neighbor.score, 4)} for row, neighbor in zip(data, neighbors)]
+
+
+def similar_leads(lead_id):
+    """The stored `similar_leads` of a lead, in one (lead, rank) index read."""
+    return serialize_neighbors(list(neighbors_queryset(lead_id)))
+
+
+async def asimilar_leads(lead_id):
+    return serialize_neighbors([neighbor async for neighbor in neighbors_queryset(lead_id)])
@@ -0,0 +1,86 @@
+from django.db.models import Count
+
+from .models import LeadTag, Tag
+
+MAX_TAG_LENGTH = 100
+
+
+def normalize_tag(raw):
+    return ' '.join(raw.split()).lower()[:MAX_TAG_LENGTH]
+
+
+def parse_tags(value):
+    """Split a comma-separated `Lead.tags` string into unique normalized names, keeping order."""
+    if not value:
+        return []
+    names = []
+    for part in value.split(','):
+        name = normalize_tag(part)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _tag_ids(names):
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def sync_lead_tags(lead):
+    """Make the lead's LeadTag rows match its `tags` string."""
+    names = parse_tags(lead.tags)
+    wanted = set(_tag_ids(names).values()) if names else set()
+    current = set(LeadTag.objects.filter(lead=lead).values_list('tag_id', flat=True))
+    if current - wanted:
+        LeadTag.objects.filter(lead=lead, tag_id__in=current - wanted).delete()
+    if wanted - current:
+        LeadTag.objects.bulk_create(
+            [LeadTag(lead=lead, tag_id=tag_id) for tag_id in wanted - current],
+            ignore_conflicts=True,
+        )
+
+
+def index_new_leads(leads):
+    """Link freshly inserted leads (e.g. from bulk_create) to their tags in bulk."""
+    names_by_lead = {lead.pk: parse_tags(lead.tags) for lead in leads}
+    all_names = {name for names in names_by_lead.values() for name in names}
+    if not all_names:
+        return
+    tag_ids = _tag_ids(all_names)
+    LeadTag.objects.bulk_create(
+        [
+            LeadTag(lead_id=lead_id, tag_id=tag_ids[name])
+            for lead_id, names in names_by_lead.items()
+            for name in names
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def filter_by_tags(queryset, names, match='any'):
+    """
+    Restrict a Lead queryset to leads carrying any (OR) or all (AND) of the
+    given tags, resolved through the (tag, lead) index rather than a
+    substring scan of `Lead.tags`.
+    """
+    names = [normalize_tag(name) for name in names if normalize_tag(name)]
+    if not names:
+        return queryset
+    links = LeadTag.objects.filter(tag__name__in=names)
+    if match == 'all':
+        links = (
+            links.values('lead_id')
+            .annotate(matched=Count('tag_id', distinct=True))
+            .filter(matched=len(set(names)))
+        )
+    return queryset.filter(id__in=links.values('lead_id'))
+
+
+def tag_cloud(limit=50):
+    """Most used tags with their lead counts, in one grouped query."""
+    return list(
+        Tag.objects.annotate(count=Count('lead_links'))
+        .filter(count__gt=0)
+        .order_by('-count', 'name')
+        .values('name', 'count')[:limit]
+    )
@@ -1,3 +1,1329 @@
-from django.test import TestCase
+import copy
+import csv
+import importlib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from datetime import timedelta
+from decimal import Decimal
+from unittest import addModuleCleanup, mock
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, OperationalError, connections, router
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from PIL import Image
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import bulk_pdf, pdf
+from .authentication import TTLUserCache, blacklist_cache, user_cache
+from .cache import LocalLRUBackend, get_response_cache
+from .carts import collapse_operations
+from .geo import encode_geohash, haversine_km
+from .images import ImageFetcher
+from .membership import EMPTY_MEMBERSHIP, with_membership
+from .middleware import ProfilingMiddleware, ReadRoutingMiddleware
+from .pdf import PdfCache, content_key, lead_snapshot
+from .models import Cart, Lead, LeadNeighbor, LeadTag, Order, OrderItem, Review, Tag, Wishlist
+from .profiling import normalize_sql
+from .routers import READ_ALIAS, read_only_request
+from .search import rebuild_index, search_leads
+from .serializers import OrderSerializer
+from .tags import parse_tags
+from .seeding import SyntheticData
+from .similarity import rebuild as rebuild_neighbors, similar_leads
+
+
+def setUpModule():
+    # Lead saves write similarity vectors to files; keep them out of var/
+    directory = tempfile.mkdtemp()
+    addModuleCleanup(shutil.rmtree, directory)
+    settings_override = override_settings(LEAD_SIMILARITY={**settings.LEAD_SIMILARITY, "DIR": directory})
+    settings_override.enable()
+    addModuleCleanup(settings_override.disable)
+
+
+def _png_bytes(size=(1200, 900)):
+    out = BytesIO()
+    Image.new('RGB', size, 'red').save(out, 'PNG')
+    return out.getvalue()
+
+
+LEAD_DEFAULTS = {"name": "Lead", "location": "Pune", "property_type": "Flat", "property_status": "Ready",
+                 "service_required_on": "Now", "budget": 1000, "requirement": "Interiors"}
+
+
+def _lead(**fields):
+    """Create a lead, with defaults for the required fields not given."""
+    return Lead.objects.create(**{**LEAD_DEFAULTS, **fields})
+
+
+def _leads(count, **fields):
+    """
+    bulk_create() `count` leads named "Lead 0", "Lead 1", ... (no save() or
+    signals). A callable field value is called with the lead's index.
+    """
+    return Lead.objects.bulk_create([
+        Lead(**LEAD_DEFAULTS | {"name": f"Lead {i}"} | {
+            name: value(i) if callable(value) else value for name, value in fields.items()
+        })
+        for i in range(count)
+    ])
+
+
+class _StubImageHandler(BaseHTTPRequestHandler):
+    """Serves /ok.png, /huge.png, /missing.png, /slow.png and /trickle.png for ImageFetcher tests."""
+    hits = {}
+
+    def do_GET(self):
+        type(self).hits[self.path] = type(self).hits.get(self.path, 0) + 1
+        path = self.path.split('?')[0]  # A query string makes a distinct cache key
+        if path == '/ok.png':
+            self._send(200, _png_bytes())
+        elif path == '/huge.png':
+            self._send(200, b'\0' * (64 * 1024))
+        elif path == '/slow.png':
+            time.sleep(1)
+            self._send(200, _png_bytes())
+        elif path == '/trickle.png':
+            self._trickle(_png_bytes())
+        else:
+            self._send(404, b'not found')
+
+    def _send(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The fetcher hung up on a body it had already rejected
+
+    def _trickle(self, body):
+        # One byte per 0.1s: every read completes well inside the read timeout
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            for i in range(len(body)):
+                self.wfile.write(body[i:i + 1])
+                self.wfile.flush()
+                time.sleep(0.1)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageFetcherTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubImageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _StubImageHandler.hits = {}
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.fetcher = ImageFetcher(self.cache_dir, read_timeout=0.3, max_bytes=32 * 1024)
+
+    def test_fetch_downscales_and_caches(self):
+        path = self.fetcher.fetch(self.base_url + '/ok.png')
+        with Image.open(path) as img:
+            self.assertLessEqual(img.size[0], 400)
+            self.assertLessEqual(img.size[1], 300)
+        self.assertEqual(self.fetcher.fetch(self.base_url + '/ok.png'), path)
+        self.assertEqual(_StubImageHandler.hits['/ok.png'], 1)
+
+    def test_failures_are_cached_negatively(self):
+        for name in ('/missing.png', '/huge.png'):
+            self.assertIsNone(self.fetcher.fetch(self.base_url + name))
+            self.assertIsNone(self.fetcher.fetch(self.base_url + name))
+            self.assertEqual(_StubImageHandler.hits[name], 1)
+
+    def test_failure_is_retried_after_negative_ttl(self):
+        self.fetcher.negative_ttl = 0
+        self.fetcher.fetch(self.base_url + '/missing.png')
+        self.fetcher.fetch(self.base_url + '/missing.png')
+        self.assertEqual(_StubImageHandler.hits['/missing.png'], 2)
+
+    def test_slow_host_times_out(self):
+        started = time.monotonic()
+        self.assertIsNone(self.fetcher.fetch(self.base_url + '/slow.png'))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if name.endswith('.jpg')], [])
+
+    def test_trickling_host_hits_total_timeout(self):
+        self.fetcher.total_timeout = 0.5
+        started = time.monotonic()
+        self.assertIsNone(self.fetcher.fetch(self.base_url + '/trickle.png'))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_decompression_bomb_is_a_failed_fetch(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):  # /ok.png is 1200x900
+            self.assertIsNone(self.fetcher.fetch(self.base_url + '/ok.png'))
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if name.endswith('.jpg')], [])
+
+    def test_disk_cache_is_bounded(self):
+        first = self.fetcher.fetch(self.base_url + '/ok.png?1')
+        os.utime(first, (time.time() - 60, time.time() - 60))
+        self.fetcher.max_cache_bytes = os.path.getsize(first) * 3 // 2  # Room for one image
+        second = self.fetcher.fetch(self.base_url + '/ok.png?2')
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+        self.fetcher.fetch(self.base_url + '/ok.png?1')
+        self.assertEqual(_StubImageHandler.hits['/ok.png?1'], 2)
+
+
+class CheckoutTests(TestCase):
+    address = {"first_name": "Asha", "city": "Pune"}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("buyer", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _fill_cart(self, count):
+        leads = _leads(count, price=Decimal("100.00"), discount_price=lambda i: Decimal("80.00") if i % 2 else None)
+        Cart.objects.bulk_create([Cart(user=self.user, lead=lead, quantity=2) for lead in leads])
+
+    def _checkout(self):
+        return self.client.post(
+            "/api/auth/orders/checkout/",
+            {"billing_address": self.address, "shipping_address": self.address},
+            format="json",
+        )
+
+    def test_query_count_is_independent_of_cart_size(self):
+        # SAVEPOINT, cart+lead SELECT, order INSERT, items INSERT, cart DELETE, RELEASE
+        for size in (1, 25):
+            Cart.objects.all().delete()
+            self._fill_cart(size)
+            with self.assertNumQueries(6):
+                response = self._checkout()
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.data["items"]), size)
+
+    def test_checkout_prices_order_and_clears_cart(self):
+        self._fill_cart(2)  # One at 100.00, one discounted to 80.00, two of each
+        response = self._checkout()
+        order = Order.objects.get(id=response.data["order_id"])
+        self.assertEqual(order.subtotal, Decimal("360.00"))
+        self.assertEqual(order.cgst, Decimal("32.40"))
+        self.assertEqual(order.sgst, Decimal("32.40"))
+        self.assertEqual(order.total, Decimal("424.80"))
+        self.assertEqual(order.items.count(), 2)
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_empty_cart_is_rejected(self):
+        response = self._checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class CreateOrderTests(TestCase):
+    address = {"first_name": "Asha", "city": "Pune"}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("buyer", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.leads = [_lead(name=f"Lead {i}", price=Decimal("100.00")) for i in range(10)]
+
+    def _body(self, items):
+        return {"billing_address": self.address, "shipping_address": self.address, "items": items}
+
+    def _post(self, items):
+        return self.client.post("/api/auth/orders/", self._body(items), format="json")
+
+    def test_query_count_is_independent_of_item_count(self):
+        # SAVEPOINT, price SELECT, order INSERT, items INSERT, RELEASE
+        for leads in (self.leads[:1], self.leads):
+            with self.assertNumQueries(5):
+                response = self._post([{"lead_id": lead.id, "quantity": 2} for lead in leads])
+            self.assertEqual(response.status_code, 201)
+            order = Order.objects.get(id=response.data["order_id"])
+            self.assertEqual(order.items.count(), len(leads))
+            self.assertEqual(order.subtotal, Decimal("200.00") * len(leads))
+
+    def test_unknown_lead_creates_no_order(self):
+        response = self._post([{"lead_id": self.leads[0].id}, {"lead_id": 999999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Lead 999999 not found", response.data["items"])
+        self.assertFalse(Order.objects.exists())
+
+    def test_failed_item_insert_rolls_back_the_order(self):
+        serializer = OrderSerializer(data=self._body([{"lead_id": self.leads[0].id}]))
+        serializer.is_valid(raise_exception=True)
+        with mock.patch.object(OrderItem.objects, "bulk_create", side_effect=DatabaseError("disk I/O error")):
+            with self.assertRaises(DatabaseError):
+                serializer.save(user=self.user)
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(ROOT_URLCONF="BMIL.asgi_urls")
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("reader", password="secret-pass-1")
+        leads = _leads(5, budget=lambda i: 1000 + i)
+        Wishlist.objects.create(user=self.user, lead=leads[0])
+        self.lead_id = leads[0].id
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        get_response_cache().clear()
+
+    async def test_payloads_match_sync_views(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=self.headers["Authorization"])
+        for path in ("/api/auth/leads/?page_size=2", "/api/auth/leads/?near=18.52,73.85&nearest=2",
+                     f"/api/auth/leads/{self.lead_id}/", f"/api/auth/leads/{self.lead_id}/reviews/?sort=highest",
+                     "/api/auth/wishlists/"):
+            with override_settings(ROOT_URLCONF="BMIL.urls"):  # The sync views
+                expected = await sync_to_async(client.get)(path)
+            response = await AsyncClient().get(path, headers=self.headers)
+            route = path.split("?")[0]
+            self.assertIsNot(resolve(route, "BMIL.urls").func, resolve(route).func, path)
+            self.assertEqual(response.status_code, expected.status_code, path)
+            self.assertEqual(response.json(), expected.json(), path)
+
+    async def test_login_required(self):
+        response = await AsyncClient().get("/api/auth/cart/")
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response.headers)
+
+
+class AsgiEntryPointTests(SimpleTestCase):
+    def test_asgi_requests_use_the_async_urlconf(self):
+        from BMIL.asgi import ASGI_URLCONF, application
+
+        scope = {"type": "http", "method": "GET", "path": "/api/auth/leads/", "query_string": b"", "headers": []}
+        request, error_response = application.create_request(scope, BytesIO())
+        self.assertIsNone(error_response)
+        self.assertEqual(request.urlconf, ASGI_URLCONF)
+        self.assertEqual(resolve("/api/auth/leads/", request.urlconf).func.__module__, "authapp.async_views")
+        self.assertEqual(resolve("/api/auth/leads/").func.__module__, "authapp.views")  # ROOT_URLCONF is unchanged
+
+
+class SyntheticDataTests(TestCase):
+    def test_seeded_rows_are_consistent(self):
+        counts = SyntheticData(batch_size=7).seed(users=5, leads=20, reviews_per_lead=2)
+        self.assertEqual(Lead.objects.count(), 20)
+        self.assertEqual(Review.objects.count(), counts["reviews"])
+        for lead in Lead.objects.all():
+            ratings = list(Review.objects.filter(lead=lead).values_list("rating", flat=True))
+            self.assertEqual((lead.rating_count, lead.rating_sum), (len(ratings), sum(ratings)))
+            self.assertEqual(lead.rating_5, ratings.count(5))
+        self.assertEqual(Order.objects.count(), 5)
+        lead = Lead.objects.create(name="After seeding", location="Pune", property_type="Flat", property_status="Ready",
+                                   service_required_on="Now", budget=1000, requirement="Interiors")
+        self.assertGreater(lead.id, max(Lead.objects.exclude(id=lead.id).values_list("id", flat=True)))
+
+
+@override_settings(REQUEST_PROFILING={"SAMPLE_RATE": 1, "SLOW_REQUEST_MS": 10000, "N_PLUS_ONE_THRESHOLD": 3})
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.leads = _leads(5)
+
+    def test_normalize_sql_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'  AND n = 3"),
+            normalize_sql("SELECT * FROM t WHERE id IN (%s) AND name = 'y' AND n = 42"),
+        )
+
+    def test_server_timing_header(self):
+        user = get_user_model().objects.create_user("timed", password="secret-pass-1")
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get("/api/auth/cart/")
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+, total;dur=')
+
+    def test_serializer_timing_is_not_patched_into_drf(self):
+        from rest_framework.serializers import BaseSerializer
+
+        self.assertEqual(BaseSerializer.data.fget.__module__, "rest_framework.serializers")
+
+    def test_serializer_and_render_time_are_measured(self):
+        user = get_user_model().objects.create_user("timed", password="secret-pass-1")
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get("/api/auth/leads/?page_size=5")
+        serialize_ms = float(re.search(r"serialize;dur=([\d.]+)", response["Server-Timing"]).group(1))
+        self.assertGreater(serialize_ms, 0)
+
+    def test_streaming_responses_are_profiled_to_the_last_chunk(self):
+        def view(request):
+            def rows():
+                for lead in self.leads:
+                    yield Lead.objects.get(pk=lead.pk).name
+            return StreamingHttpResponse(rows())
+
+        request = RequestFactory().get("/api/auth/cart/")
+        request.resolver_match = resolve("/api/auth/cart/")
+        response = ProfilingMiddleware(view)(request)
+        self.assertNotIn("Server-Timing", response)
+        with self.assertLogs("authapp.profiling", "WARNING") as logs:
+            body = b"".join(response.streaming_content)
+        self.assertEqual(body, b"".join(lead.name.encode() for lead in self.leads))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record["event"], record["queries"]), ("n_plus_one", 5))
+
+    def test_n_plus_one_is_logged_with_view_name(self):
+        def view(request):
+            for lead in self.leads:
+                Lead.objects.get(pk=lead.pk)
+            return HttpResponse()
+
+        request = RequestFactory().get("/api/auth/cart/")
+        request.resolver_match = resolve("/api/auth/cart/")
+        with self.assertLogs("authapp.profiling", "WARNING") as logs:
+            ProfilingMiddleware(view)(request)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record["event"], record["view"], record["queries"]), ("n_plus_one", "CartView", 5))
+        self.assertEqual(record["statements"][0]["count"], 5)
+
+
+class MetricsTests(TestCase):
+    def test_request_metrics_are_exported_by_url_name(self):
+        user = get_user_model().objects.create_user("metered", password="secret-pass-1")
+        client = APIClient()
+        client.force_authenticate(user)
+        labels = {"route": "cart-list", "method": "GET", "status": "200"}
+        before = REGISTRY.get_sample_value("bmil_http_requests_total", labels) or 0
+        client.get("/api/auth/cart/")
+        client.get("/api/auth/cart/")
+        self.assertEqual(REGISTRY.get_sample_value("bmil_http_requests_total", labels), before + 2)
+
+        with override_settings(METRICS_TOKEN="scrape-secret"):
+            response = client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('bmil_http_request_duration_seconds_bucket{le="0.005",method="GET",route="cart-list"}', body)
+        self.assertIn('bmil_http_request_db_queries_count{method="GET",route="cart-list"}', body)
+        self.assertIn("bmil_http_requests_in_flight 1.0", body)  # The scrape itself
+
+    def test_scrape_requires_the_token_or_staff(self):
+        client = APIClient()
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(client.get("/metrics").status_code, 401)  # No token configured: closed
+            self.assertEqual(client.get("/metrics", HTTP_AUTHORIZATION="Bearer ").status_code, 401)
+        with override_settings(METRICS_TOKEN="scrape-secret"):
+            self.assertEqual(client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+            client.force_login(get_user_model().objects.create_user("plain", password="secret-pass-1"))
+            self.assertEqual(client.get("/metrics").status_code, 401)
+            client.force_login(get_user_model().objects.create_user("ops", password="secret-pass-1", is_staff=True))
+            self.assertEqual(client.get("/metrics").status_code, 200)
+
+
+class GeoSearchTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.client = APIClient()
+        # Leads every ~1.1km north of central Pune, plus one in Mumbai
+        self.leads = [
+            Lead.objects.create(name=f"Lead {i}", location="Pune", property_type="Flat", property_status="Ready",
+                                service_required_on="Now", budget=1000, requirement="Interiors",
+                                latitude=18.5204 + i * 0.01, longitude=73.8567)
+            for i in range(8)
+        ]
+        self.mumbai = Lead.objects.create(name="Mumbai lead", location="Andheri, Mumbai", property_type="Flat",
+                                          property_status="Ready", service_required_on="Now", budget=1000,
+                                          requirement="Interiors")
+
+    def test_coordinates_come_from_gazetteer(self):
+        self.assertEqual((self.mumbai.latitude, self.mumbai.longitude), (19.0760, 72.8777))
+        self.assertEqual(self.mumbai.geohash, encode_geohash(19.0760, 72.8777))
+        self.mumbai.location = "Kothrud, Pune"
+        self.mumbai.save(update_fields=["location"])
+        self.mumbai.refresh_from_db()
+        self.assertEqual((self.mumbai.latitude, self.mumbai.longitude), (18.5204, 73.8567))
+        self.mumbai.location = "Andheri, Mumbai"
+        self.mumbai.save()  # Full save: re-geocoded too
+        self.mumbai.refresh_from_db()
+        self.assertEqual((self.mumbai.latitude, self.mumbai.longitude), (19.0760, 72.8777))
+        moved = Lead.objects.get(pk=self.mumbai.pk)
+        moved.location, moved.latitude, moved.longitude = "Kothrud, Pune", 18.5074, 73.8077
+        moved.save()  # Explicit coordinates win
+        self.assertEqual(Lead.objects.values_list("latitude", "longitude").get(pk=moved.pk), (18.5074, 73.8077))
+        unknown = Lead.objects.create(name="Nowhere", location="Atlantis", property_type="Flat", property_status="Ready",
+                                      service_required_on="Now", budget=1000, requirement="Interiors")
+        self.assertIsNone(unknown.geohash)
+
+    def test_radius_search_is_ordered_by_distance_and_paginated(self):
+        response = self.client.get("/api/auth/leads/?near=18.5204,73.8567&radius_km=3.5&page_size=2")
+        self.assertEqual(response.status_code, 200)
+        ids = [lead["id"] for lead in response.data["results"]]
+        self.assertEqual(ids, [self.leads[0].id, self.leads[1].id])
+        self.assertLess(response.data["results"][0]["distance_km"], response.data["results"][1]["distance_km"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([lead["id"] for lead in response.data["results"]], [self.leads[2].id, self.leads[3].id])
+        self.assertIsNone(response.data["next"])  # The 5th lead is ~4.4km away
+
+    def test_nearest_matches_brute_force(self):
+        point = (18.55, 73.86)
+        response = self.client.get(f"/api/auth/leads/?near={point[0]},{point[1]}&nearest=3")
+        expected = sorted(Lead.objects.exclude(geohash=None), key=lambda lead: haversine_km(*point, lead.latitude, lead.longitude))
+        self.assertEqual([lead["id"] for lead in response.data["results"]], [lead.id for lead in expected[:3]])
+
+    def test_geo_module_has_no_request_parsing(self):
+        # Lead.save() imports authapp.geo; ?near= parsing lives in authapp.filters
+        geo = importlib.import_module("authapp.geo")
+        self.assertFalse(hasattr(geo, "geo_query") or hasattr(geo, "ValidationError"))
+
+    def test_invalid_parameters(self):
+        for query in ("radius_km=5", "near=abc&radius_km=5", "near=18.5,73.8", "near=18.5,73.8&radius_km=-1"):
+            self.assertEqual(self.client.get(f"/api/auth/leads/?{query}").status_code, 400, query)
+
+
+class SimilarLeadsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(LEAD_SIMILARITY={"DIR": self.directory, "NEIGHBORS": 3})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        get_response_cache().clear()
+
+    def _lead(self, name, location, property_type, budget, requirement, tags=""):
+        with self.captureOnCommitCallbacks(execute=True):  # Vectors are written after commit
+            return Lead.objects.create(name=name, location=location, property_type=property_type,
+                                       property_status="Ready", service_required_on="Now", budget=budget,
+                                       requirement=requirement, tags=tags)
+
+    def _lists(self):
+        lists = {}
+        for lead_id, neighbor_id, score in LeadNeighbor.objects.values_list("lead_id", "neighbor_id", "score"):
+            lists.setdefault(lead_id, set()).add((neighbor_id, round(score, 4)))
+        return lists
+
+    def test_detail_serves_most_similar_leads(self):
+        kitchen = self._lead("Kitchen", "Pune", "Flat", 500000, "modular kitchen with wardrobes", "kitchen,modular")
+        close = self._lead("Close", "Pune", "Flat", 550000, "modular kitchen and lighting", "kitchen")
+        closer = self._lead("Closer", "Pune", "Flat", 500000, "modular kitchen with wardrobes", "kitchen,modular")
+        self._lead("Office", "Delhi", "Office", 9000000, "office renovation painting", "budget")
+        far = self._lead("Villa", "Chennai", "Villa", 50000, "luxury flooring")
+        with self.assertNumQueries(1):
+            similar = similar_leads(kitchen.id)
+        self.assertEqual([lead["id"] for lead in similar][:2], [closer.id, close.id])
+        self.assertGreater(similar[0]["score"], similar[1]["score"])
+        self.assertNotIn(far.id, [lead["id"] for lead in similar])
+        response = APIClient().get(f"/api/auth/leads/{kitchen.id}/")
+        self.assertEqual(response.data["similar_leads"], similar)
+
+    def test_incremental_updates_match_rebuild(self):
+        rng = random.Random(4)
+        words = ("modular", "kitchen", "wardrobe", "office", "painting", "luxury", "tiles", "lighting")
+        with self.settings(LEAD_SIMILARITY={"DIR": self.directory, "NEIGHBORS": 20}):  # Lists hold every match
+            leads = [
+                self._lead(f"Lead {i}", rng.choice(("Pune", "Mumbai", "Delhi")), rng.choice(("Flat", "Villa")),
+                           rng.choice((100000, 400000, 2000000)), " ".join(rng.sample(words, 3)))
+                for i in range(12)
+            ]
+            leads[0].location = "Delhi"
+            leads[0].requirement = "office painting"
+            with self.captureOnCommitCallbacks(execute=True):
+                leads[0].save(update_fields=["location", "requirement"])
+                leads[1].delete()
+            incremental = self._lists()
+            rebuild_neighbors()
+            self.assertEqual(incremental, self._lists())
+
+    def test_vectors_are_written_only_after_commit(self):
+        first = self._lead("Kitchen", "Pune", "Flat", 500000, "modular kitchen")
+        with self.captureOnCommitCallbacks() as callbacks:
+            second = Lead.objects.create(name="Twin", location="Pune", property_type="Flat", property_status="Ready",
+                                         service_required_on="Now", budget=500000, requirement="modular kitchen")
+        self.assertFalse(LeadNeighbor.objects.exists())  # Nothing written inside the transaction
+        second.requirement = "edited in memory only"  # The saved state is what gets indexed
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._lists(), {first.id: {(second.id, 1.0)}, second.id: {(first.id, 1.0)}})
+
+
+class ReviewListTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("reviewer", password="secret-pass-1")
+        self.lead = Lead.objects.create(name="Reviewed", location="Pune", property_type="Flat", property_status="Ready",
+                                        service_required_on="Now", budget=1000, requirement="Interiors")
+        self.reviews = Review.objects.bulk_create([
+            Review(lead=self.lead, user=user, name="Reviewer", email="r@example.com", rating=rating, review_text="Text")
+            for rating in (3, 5, 1, 4, 5, 2, 3)
+        ])
+        self.client = APIClient()
+
+    def _walk(self, query):
+        ids, url = [], f"/api/auth/leads/{self.lead.id}/reviews/?page_size=2&{query}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, query)
+            ids.extend(review["id"] for review in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_sorted_pages_cover_every_review(self):
+        ids = [review.id for review in self.reviews]
+        self.assertEqual(self._walk("sort=newest"), sorted(ids, reverse=True))  # Same created_at: newest id first
+        by_rating = sorted(self.reviews, key=lambda review: (-review.rating, -review.id))
+        self.assertEqual(self._walk("sort=highest"), [review.id for review in by_rating])
+        self.assertEqual(self._walk("sort=lowest"), [review.id for review in reversed(by_rating)])
+        self.assertEqual(self._walk("sort=highest&min_rating=4"), [review.id for review in by_rating if review.rating >= 4])
+
+    def test_one_query_per_page(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/auth/leads/{self.lead.id}/reviews/?sort=lowest&page_size=5")
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_invalid_parameters(self):
+        for query in ("sort=best", "min_rating=0", "min_rating=five"):
+            response = self.client.get(f"/api/auth/leads/{self.lead.id}/reviews/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+
+class LeadPaginationTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.client = APIClient()
+        leads = _leads(5)
+        Lead.objects.update(created_at=leads[0].created_at)  # All tied: the id breaks ties
+        self.ids = sorted(lead.id for lead in leads)
+
+    def _ids(self, response):
+        return [lead["id"] for lead in response.data["results"]]
+
+    def test_forward_and_back_across_tied_timestamps(self):
+        first = self.client.get("/api/auth/leads/?page_size=2&facets=0")
+        self.assertEqual(self._ids(first), self.ids[:2])
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        third = self.client.get(second.data["next"])
+        self.assertEqual(self._ids(second), self.ids[2:4])
+        self.assertEqual(self._ids(third), self.ids[4:])
+        self.assertIsNone(third.data["next"])
+        self.assertEqual(self._ids(self.client.get(third.data["previous"])), self.ids[2:4])
+        self.assertEqual(self._ids(self.client.get(second.data["previous"])), self.ids[:2])
+
+    @override_settings(LEAD_PAGE_SIZE=3, LEAD_MAX_PAGE_SIZE=4)
+    def test_page_size_settings_apply(self):
+        self.assertEqual(len(self._ids(self.client.get("/api/auth/leads/"))), 3)
+        self.assertEqual(len(self._ids(self.client.get("/api/auth/leads/?page_size=50"))), 4)
+
+    def test_invalid_cursor_is_404(self):
+        for cursor in ("garbage", "eyJ2IjpbMV0sInIiOjB9"):  # Not base64 JSON; wrong number of key values
+            self.assertEqual(self.client.get(f"/api/auth/leads/?cursor={cursor}").status_code, 404, cursor)
+
+
+class LeadFilterTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.client = APIClient()
+        rows = [
+            ("Pune", "Flat", "Ready", 50000, "modular,kitchen"),
+            ("Pune", "Flat", "Under Construction", 300000, "kitchen"),
+            ("Pune", "Villa", "Ready", 700000, "luxury"),
+            ("Mumbai", "Flat", "Ready", 300000, "kitchen"),
+            ("Delhi", "Office", "Ready", 3000000, ""),
+        ]
+        self.leads = [
+            Lead.objects.create(name=f"Lead {i}", location=location, property_type=property_type,
+                                property_status=property_status, service_required_on="Now", budget=budget,
+                                requirement="Interiors", tags=tags)
+            for i, (location, property_type, property_status, budget, tags) in enumerate(rows)
+        ]
+
+    def test_combined_filters(self):
+        response = self.client.get("/api/auth/leads/?location=Pune,Mumbai&property_type=Flat&budget_min=100000"
+                                   "&budget_max=400000&tags=kitchen")
+        self.assertEqual([lead["id"] for lead in response.data["results"]], [self.leads[1].id, self.leads[3].id])
+        response = self.client.get("/api/auth/leads/?tags=modular,kitchen&tags_match=all")
+        self.assertEqual([lead["id"] for lead in response.data["results"]], [self.leads[0].id])
+
+    def test_invalid_numbers_are_rejected(self):
+        for query in ("budget_min=abc", "budget_min=NaN", "budget_max=Infinity", "budget_max=-inf", "tags=x&tags_match=some"):
+            self.assertEqual(self.client.get(f"/api/auth/leads/?{query}").status_code, 400, query)
+
+    def test_facets_count_the_filtered_leads_on_the_first_page_only(self):
+        response = self.client.get("/api/auth/leads/?location=Pune&page_size=2")
+        facets = response.data["facets"]
+        self.assertEqual(facets["property_type"], {"Flat": 2, "Villa": 1})
+        self.assertEqual(facets["property_status"], {"Ready": 2, "Under Construction": 1})
+        self.assertEqual(facets["budget"], {"under_1l": 1, "1l_5l": 1, "5l_10l": 1, "10l_25l": 0, "25l_plus": 0})
+        self.assertNotIn("facets", self.client.get(response.data["next"]).data)
+        self.assertNotIn("facets", self.client.get("/api/auth/leads/?facets=0").data)
+
+
+class LeadSearchTests(TestCase):
+    def setUp(self):
+        self.in_name = _lead(name="Kitchen makeover", requirement="Full home interiors")
+        self.in_requirement = _lead(name="Apartment", requirement="Needs a kitchen and wardrobes")
+        self.other = _lead(name="Office", requirement="Painting only")
+
+    def _ids(self, query):
+        return [lead.id for lead, _, _ in search_leads(query)]
+
+    def test_bm25_prefers_name_matches_and_prefixes_match(self):
+        self.assertEqual(self._ids("kitchen"), [self.in_name.id, self.in_requirement.id])
+        self.assertEqual(self._ids("kitch"), [self.in_name.id, self.in_requirement.id])
+        self.assertEqual(self._ids("wardrobe paint"), [])  # Every word must match
+
+    def test_index_follows_saves_and_deletes(self):
+        self.other.name = "Bathroom remodel"
+        self.other.save()
+        self.assertEqual(self._ids("bathroom"), [self.other.id])
+        self.assertEqual(self._ids("office"), [])
+        self.in_name.delete()
+        self.assertEqual(self._ids("kitchen"), [self.in_requirement.id])
+        self.assertEqual(rebuild_index(), 2)  # Migration 0011's table, repopulated in bulk
+
+    def test_highlights_are_escaped_html(self):
+        lead = _lead(name='<img src=x onerror=alert(1)> kitchen', requirement="a & b kitchen")
+        response = APIClient().get("/api/auth/leads/search/?q=kitchen")
+        highlights = next(row["highlights"] for row in response.data["results"] if row["id"] == lead.id)
+        self.assertEqual(highlights["name"], "&lt;img src=x onerror=alert(1)&gt; <mark>kitchen</mark>")
+        self.assertEqual(highlights["requirement"], "a &amp; b <mark>kitchen</mark>")
+
+
+class TagTests(TestCase):
+    def _names(self, lead):
+        return set(LeadTag.objects.filter(lead=lead).values_list("tag__name", flat=True))
+
+    def test_parse_tags_normalizes_and_dedupes(self):
+        self.assertEqual(parse_tags(" Modular  Kitchen,modular kitchen,, LED "), ["modular kitchen", "led"])
+        self.assertEqual(parse_tags(None), [])
+
+    def test_links_follow_the_tags_field(self):
+        lead = _lead(tags="Kitchen, Lighting")
+        self.assertEqual(self._names(lead), {"kitchen", "lighting"})
+        lead.tags = "kitchen,flooring"
+        lead.save(update_fields=["tags"])
+        self.assertEqual(self._names(lead), {"kitchen", "flooring"})
+        lead.requirement = "Changed"
+        lead.save(update_fields=["requirement"])  # Tags untouched
+        self.assertEqual(self._names(lead), {"kitchen", "flooring"})
+
+    def test_tag_cloud_counts(self):
+        _lead(tags="kitchen,lighting")
+        _lead(tags="Kitchen")
+        _lead(tags="")
+        Tag.objects.create(name="unused")
+        response = APIClient().get("/api/auth/tags/cloud/")
+        self.assertEqual(response.data, [{"name": "kitchen", "count": 2}, {"name": "lighting", "count": 1}])
+        self.assertEqual(APIClient().get("/api/auth/tags/cloud/?limit=x").status_code, 400)
+
+    def test_data_migration_splits_existing_tags(self):
+        migration = importlib.import_module("authapp.migrations.0013_split_lead_tags")
+        # bulk_create skips the post_save indexing
+        first, second = _leads(2, tags=lambda i: ["Kitchen, LED ,kitchen", None][i])
+        migration.split_lead_tags(apps, None)
+        self.assertEqual(self._names(first), {"kitchen", "led"})
+        self.assertEqual(self._names(second), set())
+
+
+class ReviewAggregateTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("rater", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.lead = _lead()
+
+    def _post(self, rating):
+        response = self.client.post(f"/api/auth/leads/{self.lead.id}/reviews/",
+                                    {"name": "R", "email": "r@example.com", "rating": rating, "review_text": "Text"})
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def assertAggregates(self, ratings):
+        self.lead.refresh_from_db()
+        self.assertEqual(self.lead.rating_count, len(ratings))
+        self.assertEqual(self.lead.rating_sum, sum(ratings))
+        self.assertAlmostEqual(self.lead.rating_avg, sum(ratings) / len(ratings) if ratings else 0)
+        for stars in range(1, 6):
+            self.assertEqual(getattr(self.lead, f"rating_{stars}"), ratings.count(stars), stars)
+
+    def test_create_update_delete(self):
+        first, second = self._post(5), self._post(2)
+        self.assertAggregates([5, 2])
+        self.assertEqual(self.client.put(f"/api/auth/reviews/{second}/", {"rating": 4}).status_code, 200)
+        self.assertAggregates([5, 4])
+        self.client.put(f"/api/auth/reviews/{second}/", {"review_text": "Edited"})  # Rating unchanged
+        self.assertAggregates([5, 4])
+        self.assertEqual(self.client.delete(f"/api/auth/reviews/{first}/").status_code, 204)
+        self.assertAggregates([4])
+        self.client.delete(f"/api/auth/reviews/{second}/")
+        self.assertAggregates([])
+
+    def test_only_the_author_can_change_a_review(self):
+        review_id = self._post(3)
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user("other", password="secret-pass-1"))
+        self.assertEqual(other.put(f"/api/auth/reviews/{review_id}/", {"rating": 1}).status_code, 403)
+        self.assertEqual(other.delete(f"/api/auth/reviews/{review_id}/").status_code, 403)
+        self.assertAggregates([3])
+
+    def test_reconcile_command_repairs_drift(self):
+        self._post(5)
+        self._post(3)
+        Lead.objects.filter(id=self.lead.id).update(rating_count=7, rating_sum=1, rating_avg=0.1, rating_5=0)
+        out = StringIO()
+        call_command("reconcile_review_aggregates", stdout=out)
+        self.assertIn("1 leads corrected", out.getvalue())
+        self.assertAggregates([5, 3])
+
+
+class ResponseCacheTests(TestCase):
+    def test_lru_is_bounded_and_evicts_least_recently_used(self):
+        cache = LocalLRUBackend(max_bytes=30)
+        cache.set("a", "x" * 10)  # 12 bytes as JSON
+        cache.set("b", "y" * 10)
+        self.assertEqual(cache.get("a"), "x" * 10)  # Now "b" is the least recently used
+        cache.set("c", "z" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), ("x" * 10, "z" * 10))
+        self.assertLessEqual(cache.stats()["bytes"], 30)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache.set("huge", "w" * 100)  # Larger than the whole cache: not stored
+        self.assertIsNone(cache.get("huge"))
+
+    def test_shared_version_invalidates_every_worker(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        shared = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory}
+        with override_settings(CACHES={**settings.CACHES, "shared": shared}):
+            # Two workers' caches: separate entries, one version file
+            first, second = LocalLRUBackend(version_alias="shared"), LocalLRUBackend(version_alias="shared")
+            self.assertFalse(first.in_process)
+            for backend in (first, second):
+                backend.set(f"leads:v{backend.get_version()}", "cached")
+            first.bump_version()
+            self.assertEqual(second.get_version(), first.get_version())
+            self.assertIsNone(second.get(f"leads:v{second.get_version()}"))
+
+    def test_lead_writes_bump_the_version(self):
+        get_response_cache().clear()
+        lead = _lead(name="Before")
+        client = APIClient()
+        self.assertEqual(client.get(f"/api/auth/leads/{lead.id}/").data["name"], "Before")
+        Lead.objects.filter(id=lead.id).update(name="Behind the cache's back")
+        self.assertEqual(client.get(f"/api/auth/leads/{lead.id}/").data["name"], "Before")  # Served from cache
+        lead.name = "After"
+        lead.save()
+        self.assertEqual(client.get(f"/api/auth/leads/{lead.id}/").data["name"], "After")
+
+    def test_cache_stats_are_admin_only(self):
+        User = get_user_model()
+        client = APIClient()
+        self.assertEqual(client.get("/api/auth/leads/cache-stats/").status_code, 401)
+        client.force_authenticate(User.objects.create_user("plain", password="secret-pass-1"))
+        self.assertEqual(client.get("/api/auth/leads/cache-stats/").status_code, 403)
+        client.force_authenticate(User.objects.create_superuser("admin", password="secret-pass-1"))
+        response = client.get("/api/auth/leads/cache-stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["backend"], "LocalLRUBackend")
+
+
+class PdfCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = PdfCache(self.directory, max_bytes=1024)
+        self.renders = []
+
+    def render(self, snapshot):
+        self.renders.append(snapshot["name"])
+        return b"%PDF-" + snapshot["name"].encode() * 100, True
+
+    def test_content_key_hits_and_misses(self):
+        first = self.cache.get_or_render({"id": 1, "name": "a"}, render=self.render)
+        self.assertEqual(self.cache.get_or_render({"id": 1, "name": "a"}, render=self.render), first)
+        self.assertEqual(self.renders, ["a"])
+        edited = self.cache.get_or_render({"id": 1, "name": "b"}, render=self.render)  # Edited lead: new key
+        self.assertNotEqual(edited, first)
+        self.assertEqual(self.renders, ["a", "b"])
+        self.assertEqual(os.path.basename(edited), content_key({"id": 1, "name": "b"}) + ".pdf")
+
+    def test_eviction_removes_least_recently_used(self):
+        self.cache.max_bytes = 250  # Room for two 105-byte PDFs
+        first, second = [self.cache.get_or_render({"id": i, "name": name}, render=self.render)
+                         for i, name in enumerate("ab")]
+        for age, path in ((30, first), (20, second)):
+            os.utime(path, (time.time() - age, time.time() - age))
+        self.cache.get_or_render({"id": 0, "name": "a"}, render=self.render)  # Hit: "b" is now the LRU
+        third = self.cache.get_or_render({"id": 2, "name": "c"}, render=self.render)
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted(map(os.path.basename, (first, third))))
+
+    def test_concurrent_misses_render_once(self):
+        def slow_render(snapshot):
+            time.sleep(0.2)
+            return self.render(snapshot)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.cache.get_or_render({"id": 1, "name": "a"}, render=slow_render))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.renders, ["a"])
+        self.assertEqual(len(set(results)), 1)
+
+    def test_lock_files_are_removed(self):
+        for i in range(3):
+            self.cache.get_or_render({"id": i, "name": "a"}, render=self.render)
+        self.assertEqual([name for name in os.listdir(self.directory) if not name.endswith(".pdf")], [])
+
+    def test_pdf_without_image_is_cached_for_the_degraded_ttl(self):
+        def render_without_image(snapshot):
+            self.renders.append(snapshot["name"])
+            return b"%PDF-degraded", False
+
+        self.cache.degraded_ttl = 60
+        path = self.cache.get_or_render({"id": 1, "name": "a"}, render=render_without_image)
+        self.assertTrue(path.endswith("-image-missing.pdf"))
+        self.assertEqual(self.cache.get_or_render({"id": 1, "name": "a"}, render=render_without_image), path)
+        self.assertEqual(self.renders, ["a"])
+        os.utime(path, (time.time() - 61, time.time() - 61))  # Image failure has expired: retry it
+        full = self.cache.get_or_render({"id": 1, "name": "a"}, render=self.render)
+        self.assertEqual(os.path.basename(full), content_key({"id": 1, "name": "a"}) + ".pdf")
+        self.assertEqual(self.renders, ["a", "a"])
+        self.assertFalse(os.path.exists(path))
+
+
+class BulkPdfTests(TestCase):
+    def setUp(self):
+        # Forked render workers inherit this cache, so nothing lands in var/
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        bulk_pdf._reset_pool()
+        pdf._pdf_cache = PdfCache(directory, max_bytes=16 * 1024 * 1024)
+        self.addCleanup(setattr, pdf, "_pdf_cache", None)
+        self.addCleanup(bulk_pdf._reset_pool)
+        self.leads = [_lead(name=f"Lead {i}") for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("buyer", password="secret-pass-1"))
+
+    def test_zip_has_one_pdf_per_lead(self):
+        data = b"".join(bulk_pdf.stream_zip([lead_snapshot(lead) for lead in self.leads]))
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(sorted(archive.namelist()), sorted(f"lead_{lead.id}.pdf" for lead in self.leads))
+            for name in archive.namelist():
+                self.assertTrue(archive.read(name).startswith(b"%PDF"))
+
+    def test_merged_pdf_has_one_page_per_lead(self):
+        data = b"".join(bulk_pdf.stream_merged([lead_snapshot(lead) for lead in self.leads]))
+        self.assertTrue(data.startswith(b"%PDF"))
+        self.assertEqual(len(re.findall(rb"/Type /Page\b(?!s)", data)), 3)
+
+    def test_download_view_streams_zip(self):
+        ids = [lead.id for lead in self.leads]
+        response = self.client.post("/api/auth/leads/download/", {"lead_ids": ids + ids[:1]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as archive:
+            self.assertEqual(len(archive.namelist()), 3)  # Duplicate ids are exported once
+
+    def test_download_view_merged_pdf(self):
+        response = self.client.post("/api/auth/leads/download/",
+                                    {"lead_ids": [self.leads[0].id], "format": "pdf"}, format="json")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+    def test_download_view_rejects_bad_requests(self):
+        url = "/api/auth/leads/download/"
+        self.assertEqual(APIClient().post(url, {"lead_ids": [self.leads[0].id]}, format="json").status_code, 401)
+        response = self.client.post(url, {"lead_ids": [self.leads[0].id, 999999]}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data["missing"], [999999])
+        for body in ({"lead_ids": []}, {"lead_ids": ["x"]}, {"lead_ids": [1], "format": "docx"}):
+            self.assertEqual(self.client.post(url, body, format="json").status_code, 400)
+        with override_settings(LEAD_BULK_EXPORT_MAX_LEADS=2):
+            ids = [lead.id for lead in self.leads]
+            self.assertEqual(self.client.post(url, {"lead_ids": ids}, format="json").status_code, 400)
+
+
+class LeadImportTests(TestCase):
+    HEADER = b"name,location,property_type,property_status,service_required_on,budget,requirement\n"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("importer", password="secret-pass-1"))
+
+    def _post(self, data, name="leads.csv"):
+        return self.client.post("/api/auth/leads/import/", {"file": SimpleUploadedFile(name, data)}, format="multipart")
+
+    def test_valid_csv_is_imported(self):
+        response = self._post(self.HEADER + b"A,Pune,Flat,Ready,Now,1000,Paint\nB,Mumbai,Villa,New,Soon,2000,Tiles\n")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["failed"]), (2, 0))
+        self.assertEqual(set(Lead.objects.values_list("name", flat=True)), {"A", "B"})
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        data = b"\n".join([
+            json.dumps({"name": "A", "location": "Pune", "property_type": "Flat", "property_status": "Ready",
+                        "service_required_on": "Now", "budget": "1000", "requirement": "Paint"}).encode(),
+            json.dumps({"name": "B", "budget": "lots"}).encode(),
+            b"not json",
+        ])
+        response = self._post(data, name="leads.ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 2))
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+        self.assertIn("budget", response.data["errors"][0]["errors"])
+
+    def test_undecodable_file_is_rejected_with_its_row(self):
+        response = self._post(self.HEADER + b"A,Pune,Flat,Ready,Now,1000,Paint\nB,M\xff\xfeumbai,Villa,New,Soon,2000,Tiles\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["row"], 2)
+        self.assertEqual(response.data["created"], 1)  # Rows before the bad one are kept
+        self.assertEqual(list(Lead.objects.values_list("name", flat=True)), ["A"])
+
+    def test_command_reports_unreadable_file(self):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "wb") as out:
+            out.write(self.HEADER + b"A,Pune,Flat,Ready,Now,1000,Paint\n\xff\n")
+        self.addCleanup(os.remove, path)
+        with self.assertRaisesMessage(CommandError, "Row 2"):
+            call_command("import_leads", path, stdout=StringIO())
+
+
+class LeadExportTests(TestCase):
+    def setUp(self):
+        self.pune = _lead(name="Pune flat", location="Pune", budget=1000)
+        self.mumbai = _lead(name="=HYPERLINK(\"http://evil\")", location="Mumbai", budget=5000,
+                            property_type="\tFlat", property_status="\rReady")
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("exporter", password="secret-pass-1"))
+
+    def _get(self, query):
+        response = self.client.get("/api/auth/leads/export/" + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        rows = list(csv.DictReader(StringIO(self._get("?format=csv"))))
+        self.assertEqual([row["id"] for row in rows], [str(self.pune.id), str(self.mumbai.id)])
+        self.assertEqual(rows[0]["budget"], "1000.00")
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        rows = list(csv.DictReader(StringIO(self._get("?format=csv"))))
+        self.assertEqual(rows[1]["name"], "'=HYPERLINK(\"http://evil\")")
+        self.assertEqual(rows[1]["property_type"], "'\tFlat")
+        self.assertEqual(rows[1]["property_status"], "'\rReady")
+
+    def test_ndjson_export_is_not_escaped(self):
+        rows = [json.loads(line) for line in self._get("?format=ndjson").splitlines()]
+        self.assertEqual([row["name"] for row in rows], ["Pune flat", self.mumbai.name])
+        self.assertEqual(rows[1]["location"], "Mumbai")
+
+    def test_filters_apply(self):
+        rows = [json.loads(line) for line in self._get("?format=ndjson&location=Mumbai").splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.mumbai.id])
+        self.assertEqual(self._get("?format=ndjson&created_after=2999-01-01"), "")
+        rows = list(csv.DictReader(StringIO(self._get("?format=csv&budget_max=2000"))))
+        self.assertEqual([row["id"] for row in rows], [str(self.pune.id)])
+
+    def test_bad_parameters_and_anonymous_users_are_rejected(self):
+        self.assertEqual(self.client.get("/api/auth/leads/export/?format=csv&created_after=soon").status_code, 400)
+        self.assertEqual(APIClient().get("/api/auth/leads/export/?format=csv").status_code, 401)
+
+    def test_impossible_dates_are_rejected(self):
+        for value in ("2024-02-30", "2024-13-01", "2024-01-01T25:00:00"):
+            with self.subTest(value=value):
+                response = self.client.get(f"/api/auth/leads/export/?format=csv&created_after={value}")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("created_after", json.loads(response.content))
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("buyer", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.leads = [_lead(name=f"Lead {i}", price=Decimal("10.00")) for i in range(6)]
+
+    def _batch(self, operations):
+        return self.client.post("/api/auth/cart/batch/", {"operations": operations}, format="json")
+
+    def _quantities(self):
+        return dict(Cart.objects.filter(user=self.user).values_list("lead_id", "quantity"))
+
+    def test_operations_on_the_same_lead_collapse(self):
+        ops = lambda *pairs: [{"lead": 1, "action": action, "quantity": qty} for action, qty in pairs]
+        self.assertEqual(collapse_operations(ops(("add", 1), ("add", 2))), {1: ("add", 3)})
+        self.assertEqual(collapse_operations(ops(("set", 4), ("add", 1))), {1: ("set", 5)})
+        self.assertEqual(collapse_operations(ops(("add", 2), ("remove", 0))), {1: ("remove", None)})
+        self.assertEqual(collapse_operations(ops(("remove", 0), ("add", 2))), {1: ("set", 2)})
+        self.assertEqual(collapse_operations(ops(("add", 2), ("set", 0))), {1: ("remove", None)})
+
+    def test_adds_increment_existing_rows_in_the_database(self):
+        lead = self.leads[0]
+        Cart.objects.create(user=self.user, lead=lead, quantity=3)
+        with self.assertNumQueries(6) as queries:  # Only adds: no DELETE or upsert
+            response = self._batch([{"lead": lead.id, "quantity": 2}, {"lead": lead.id}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._quantities(), {lead.id: 6})
+        update = next(query["sql"] for query in queries.captured_queries if query["sql"].startswith("UPDATE"))
+        self.assertIn('"authapp_cart"."quantity" +', update)  # Incremented by the database, not read-modify-write
+
+    def test_query_count_is_independent_of_batch_size(self):
+        # lead SELECT, SAVEPOINT, DELETE, upsert, INSERT, UPDATE, RELEASE, cart SELECT
+        for leads in (self.leads[:3], self.leads):
+            Cart.objects.all().delete()
+            operations = [{"lead": leads[0].id, "action": "remove"}]
+            operations += [{"lead": lead.id, "action": "set", "quantity": 4} for lead in leads[1::2]]
+            operations += [{"lead": lead.id, "action": "add", "quantity": 1} for lead in leads[2::2]]
+            with self.assertNumQueries(8):
+                response = self._batch(operations)
+            self.assertEqual(len(response.data["items"]), len(leads) - 1)
+
+    def test_summary_totals(self):
+        response = self._batch([{"lead": self.leads[0].id, "action": "set", "quantity": 3}])
+        self.assertEqual(response.data["subtotal"], Decimal("30.00"))
+        self.assertEqual(response.data["items"][0]["line_total"], Decimal("30.00"))
+
+    def test_invalid_operations_are_rejected_without_changes(self):
+        Cart.objects.create(user=self.user, lead=self.leads[0], quantity=1)
+        response = self._batch([{"lead": self.leads[0].id, "action": "remove"}, {"lead": 999999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Lead 999999 not found", response.data["operations"])
+        for operation in ({"lead": self.leads[1].id, "action": "set", "quantity": -1},
+                          {"lead": self.leads[1].id, "action": "add", "quantity": 0},
+                          {"lead": self.leads[1].id, "action": "empty"}):
+            self.assertEqual(self._batch([operation]).status_code, 400)
+        self.assertEqual(self._batch([]).status_code, 400)
+        self.assertEqual(self._quantities(), {self.leads[0].id: 1})
+
+
+class LeadMembershipTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.user = get_user_model().objects.create_user("buyer", password="secret-pass-1")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.leads = [_lead(name=f"Lead {i}") for i in range(3)]
+        Wishlist.objects.create(user=self.user, lead=self.leads[0])
+        Cart.objects.create(user=self.user, lead=self.leads[1], quantity=4)
+
+    def _flags(self, results):
+        return {lead["id"]: (lead["in_wishlist"], lead["in_cart"], lead["cart_quantity"]) for lead in results}
+
+    def test_with_membership_does_not_mutate_its_input(self):
+        payload = [{"id": lead.id, "name": lead.name} for lead in self.leads]
+        original = copy.deepcopy(payload)
+        merged = with_membership(self.user, payload)
+        self.assertEqual(payload, original)
+        self.assertEqual(merged[1]["cart_quantity"], 4)
+
+    def test_cached_list_is_shared_without_leaking_flags(self):
+        flags = self._flags(self.client.get("/api/auth/leads/").data["results"])
+        self.assertEqual(flags[self.leads[0].id], (True, False, 0))
+        self.assertEqual(flags[self.leads[1].id], (False, True, 4))
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user("other", password="secret-pass-1"))
+        flags = self._flags(other.get("/api/auth/leads/").data["results"])  # Same cached page
+        self.assertEqual(set(flags.values()), {(False, False, 0)})
+
+    def test_anonymous_users_get_no_flags_and_no_queries(self):
+        self.client.get("/api/auth/leads/")  # Warm the shared cache
+        self.client.get(f"/api/auth/leads/{self.leads[1].id}/")
+        with self.assertNumQueries(0):
+            response = APIClient().get("/api/auth/leads/")
+        self.assertEqual(set(self._flags(response.data["results"]).values()), {tuple(EMPTY_MEMBERSHIP.values())})
+        with self.assertNumQueries(0):
+            detail = APIClient().get(f"/api/auth/leads/{self.leads[1].id}/")
+        self.assertFalse(detail.data["in_cart"])
+        self.assertEqual(APIClient().get(f"/api/auth/leads/membership/?ids={self.leads[0].id}").status_code, 401)
+
+    def test_membership_view(self):
+        ids = [self.leads[1].id, 999999, self.leads[0].id, self.leads[1].id]
+        response = self.client.get("/api/auth/leads/membership/?ids=" + ",".join(map(str, ids)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["lead"] for row in response.data], [self.leads[1].id, self.leads[0].id])
+        self.assertEqual(response.data[0]["cart_quantity"], 4)
+        self.assertTrue(response.data[1]["in_wishlist"])
+
+    def test_membership_view_validates_ids(self):
+        for query in ("", "?ids=", "?ids=1,x", "?ids=" + ",".join(map(str, range(1, 202)))):
+            self.assertEqual(self.client.get("/api/auth/leads/membership/" + query).status_code, 400)
+        response = self.client.get("/api/auth/leads/membership/?ids=" + ",".join(map(str, range(1, 201))))
+        self.assertEqual(response.status_code, 200)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        blacklist_cache.reset()
+        self.addCleanup(user_cache.clear)
+        self.addCleanup(blacklist_cache.reset)
+        self.user = get_user_model().objects.create_user("reader", password="secret-pass-1")
+        self.lead = _lead()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def test_reads_use_the_cached_user(self):
+        self.assertEqual(self.client.get("/api/auth/wishlists/").status_code, 200)
+        with self.assertNumQueries(1):  # The wishlist SELECT only: no user lookup
+            self.assertEqual(self.client.get("/api/auth/wishlists/").status_code, 200)
+
+    def test_cached_copies_are_independent(self):
+        user_cache.set(self.user.pk, self.user)
+        cached = user_cache.get(self.user.pk)
+        cached.first_name = "Changed"
+        self.assertEqual(user_cache.get(self.user.pk).first_name, "")
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = TTLUserCache(ttl=0.05)
+        cache.set(self.user.pk, self.user)
+        self.assertEqual(cache.get(self.user.pk).pk, self.user.pk)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get(self.user.pk))
+
+    def test_saving_the_user_invalidates_it(self):
+        self.client.get("/api/auth/wishlists/")
+        self.assertIsNotNone(user_cache.get(self.user.pk))
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(user_cache.get(self.user.pk))
+        self.assertEqual(self.client.get("/api/auth/wishlists/").status_code, 401)
+
+    def test_writes_reload_the_user(self):
+        self.client.get("/api/auth/wishlists/")
+        # Deactivated by another process: this process still has its cached copy
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get("/api/auth/wishlists/").status_code, 200)
+        self.assertEqual(self.client.post(f"/api/auth/wishlists/{self.lead.id}/").status_code, 401)
+        self.assertFalse(Wishlist.objects.exists())
+
+    def test_refresh_rotates_and_blacklists(self):
+        tokens = self.client.post("/api/auth/signin/", {"username": "reader", "password": "secret-pass-1"}).data
+        response = self.client.post("/api/auth/token/refresh/", {"refresh": tokens["refresh"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["refresh"], tokens["refresh"])
+        self.assertEqual(self.client.post("/api/auth/token/refresh/", {"refresh": tokens["refresh"]}).status_code, 401)
+        self.assertEqual(self.client.post("/api/auth/token/refresh/", {"refresh": response.data["refresh"]}).status_code, 200)
+
+    def test_tokens_blacklisted_elsewhere_are_picked_up(self):
+        tokens = self.client.post("/api/auth/signin/", {"username": "reader", "password": "secret-pass-1"}).data
+        outstanding = OutstandingToken.objects.get(user=self.user)
+        self.assertFalse(blacklist_cache.contains(outstanding.jti))
+        BlacklistedToken.objects.create(token=outstanding)  # e.g. by another worker process
+        with override_settings(JWT_AUTH_CACHE={**settings.JWT_AUTH_CACHE, "BLACKLIST_REFRESH_INTERVAL": 0}):
+            self.assertEqual(self.client.post("/api/auth/token/refresh/", {"refresh": tokens["refresh"]}).status_code, 401)
+
+    def test_caches_follow_settings_changes(self):
+        with override_settings(JWT_AUTH_CACHE={**settings.JWT_AUTH_CACHE, "USER_CACHE_TTL": 0.05}):
+            self.client.get("/api/auth/wishlists/")
+            time.sleep(0.06)
+            with self.assertNumQueries(2):  # Expired: the user is read again
+                self.client.get("/api/auth/wishlists/")
+        self.assertEqual(user_cache.ttl, settings.JWT_AUTH_CACHE["USER_CACHE_TTL"])
+        self.assertEqual(blacklist_cache.refresh_interval, settings.JWT_AUTH_CACHE["BLACKLIST_REFRESH_INTERVAL"])
+
+
+class TokenCompactionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("rotator", password="secret-pass-1")
+
+    def _token(self, jti, expires_in, blacklisted):
+        token = OutstandingToken.objects.create(user=self.user, jti=jti, token=jti,
+                                                expires_at=timezone.now() + timedelta(seconds=expires_in))
+        if blacklisted:
+            BlacklistedToken.objects.create(token=token)
+        return token
+
+    @override_settings(TOKEN_BLACKLIST_COMPACTION={"BATCH_SIZE": 2, "PAUSE": 0, "MAX_SECONDS": None})
+    def test_expired_tokens_are_removed_and_live_ones_kept(self):
+        for i in range(5):
+            self._token(f"expired-{i}", -60, blacklisted=i % 2 == 0)
+        self._token("live-blacklisted", 3600, blacklisted=True)
+        self._token("live", 3600, blacklisted=False)
+        out = StringIO()
+        call_command("compact_token_blacklist", stdout=out)  # Batch size from settings: 3 batches
+        self.assertIn("Removed 5 outstanding and 3 blacklisted tokens in 3 batches", out.getvalue())
+        self.assertEqual(set(OutstandingToken.objects.values_list("jti", flat=True)), {"live-blacklisted", "live"})
+        self.assertEqual(list(BlacklistedToken.objects.values_list("token__jti", flat=True)), ["live-blacklisted"])
+
+
+class ReadRoutingTests(SimpleTestCase):
+    def setUp(self):
+        # In tests 'read' mirrors 'default'; give it its own settings so the
+        # router treats it as a separate replica
+        read = connections[READ_ALIAS]
+        patcher = mock.patch.object(read, "settings_dict", dict(read.settings_dict))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _routed(self, read_only):
+        token = read_only_request.set(read_only)
+        try:
+            return router.db_for_read(Lead), router.db_for_write(Lead)
+        finally:
+            read_only_request.reset(token)
+
+    def test_only_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self._routed(read_only=False), ("default", "default"))
+        self.assertEqual(self._routed(read_only=True), (READ_ALIAS, "default"))
+
+    def test_reads_inside_a_transaction_stay_on_default(self):
+        with mock.patch.object(connections["default"], "in_atomic_block", True):
+            self.assertEqual(self._routed(read_only=True), ("default", "default"))
+
+    def test_middleware_flags_safe_methods_only(self):
+        seen = {}
+
+        def view(request):
+            seen[request.method] = read_only_request.get()
+            return HttpResponse()
+
+        middleware = ReadRoutingMiddleware(view)
+        for method in ("get", "head", "post", "put", "delete"):
+            middleware(getattr(RequestFactory(), method)("/"))
+        self.assertEqual(seen, {"GET": True, "HEAD": True, "POST": False, "PUT": False, "DELETE": False})
+        self.assertFalse(read_only_request.get())
+
+    def test_read_connection_cannot_write(self):
+        # Even a write routed to 'read' by mistake fails: the alias is opened query-only
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "replica.sqlite3")
+        primary = DatabaseWrapper({**connections.settings["default"], "NAME": path}, alias="primary-check")
+        replica = DatabaseWrapper({**connections.settings[READ_ALIAS], "NAME": path}, alias="read-check")
+        self.addCleanup(primary.close)
+        self.addCleanup(replica.close)
+        with primary.cursor() as cursor:
+            cursor.execute("CREATE TABLE t (x INTEGER)")
+            cursor.execute("INSERT INTO t VALUES (1)")
+        with replica.cursor() as cursor:
+            cursor.execute("SELECT x FROM t")
+            self.assertEqual(cursor.fetchall(), [(1,)])
+            with self.assertRaises(OperationalError):
+                cursor.execute("INSERT INTO t VALUES (2)")
@@ -0,0 +1,90 @@
+"""
+Compaction of simplejwt's token blacklist tables.
+
+Every refresh rotation adds an OutstandingToken and a BlacklistedToken row,
+and simplejwt never removes them. Once a token has expired its blacklist
+entry is useless (the signature check already rejects it), so both rows can
+go. Deletes run in small batches, each in its own short transaction, with a
+pause in between so logins and refreshes are never blocked for long.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+logger = logging.getLogger(__name__)
+
+
+def compact_expired_tokens(batch_size=1000, pause=0.05, max_seconds=None, now=None):
+    """
+    Delete expired OutstandingToken rows (and their BlacklistedToken rows),
+    oldest first. Stops when nothing is left or after `max_seconds`.
+    """
+    cutoff = now or timezone.now()
+    started = time.perf_counter()
+    report = {'outstanding': 0, 'blacklisted': 0, 'batches': 0}
+    while max_seconds is None or time.perf_counter() - started < max_seconds:
+        # Range scan on the expires_at index (migration 0015)
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lt=cutoff)
+            .order_by('expires_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            # BlacklistedToken rows go with them via the CASCADE fast path
+            _, deleted = OutstandingToken.objects.filter(id__in=ids).delete()
+        report['outstanding'] += deleted.get(OutstandingToken._meta.label, 0)
+        report['blacklisted'] += deleted.get(BlacklistedToken._meta.label, 0)
+        report['batches'] += 1
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)  # Let queued writers in between batches
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+_scheduler = None
+
+
+def _run_scheduler(interval, options):
+    while True:
+        time.sleep(interval)
+        try:
+            report = compact_expired_tokens(**options)
+            logger.info("Token blacklist compaction: %(outstanding)d outstanding, "
+                        "%(blacklisted)d blacklisted rows removed in %(seconds).2fs", report)
+        except Exception:
+            logger.exception("Token blacklist compaction failed")
+        finally:
+            close_old_connections()
+
+
+def compaction_options():
+    """compact_expired_tokens() keyword arguments from TOKEN_BLACKLIST_COMPACTION."""
+    config = getattr(settings, 'TOKEN_BLACKLIST_COMPACTION', {})
+    return {
+        'batch_size': config.get('BATCH_SIZE', 1000),
+        'pause': config.get('PAUSE', 0.05),
+        'max_seconds': config.get('MAX_SECONDS'),
+    }
+
+
+def start_compaction_scheduler():
+    """
+    Start the background compaction thread if TOKEN_BLACKLIST_COMPACTION['INTERVAL']
+    is set. Called from the server entry points (BMIL/wsgi.py, BMIL/asgi.py),
+    so management commands and test runs never start it.
+    """
+    global _scheduler
+    interval = getattr(settings, 'TOKEN_BLACKLIST_COMPACTION', {}).get('INTERVAL')
+    if not interval or _scheduler is not None:
+        return
+    _scheduler = threading.Thread(
+        target=_run_scheduler, args=(interval, compaction_options()), name='token-compaction', daemon=True,
+    )
+    _scheduler.start()
@@ -1,26 +1,38 @@
 from django.urls import path
-from .views import SignUpView, SigninView, LogoutView, ProfileView
-from .views import LeadListCreateView, LeadRetrieveUpdateDeleteView
+from .views import SignUpView, SigninView, LogoutView, ProfileView, TokenRefreshView
+from .views import LeadListCreateView, LeadRetrieveUpdateDeleteView, LeadSearchView, TagCloudView
+from .views import LeadCacheStatsView, LeadImportView, LeadExportView, LeadMembershipView
 from .views import ReviewListCreateView, ReviewRetrieveUpdateDeleteView
 from .views import WishlistView, CartView, download_lead_pdf, AddressView
 from .views import FillDetailsView, CreateOrderView, ProcessPaymentView
+from .views import BulkLeadPdfView, CheckoutView, CartBatchView
 
 urlpatterns = [
     path('signup/', SignUpView.as_view(), name='signup'),
     path('signin/', SigninView.as_view(), name='signin'),
     path('profile/', ProfileView.as_view(), name='profile'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('leads/', LeadListCreateView.as_view(), name='lead-list-create'),
+    path('leads/search/', LeadSearchView.as_view(), name='lead-search'),
+    path('leads/membership/', LeadMembershipView.as_view(), name='lead-membership'),
+    path('leads/export/', LeadExportView.as_view(), name='lead-export'),
+    path('leads/import/', LeadImportView.as_view(), name='lead-import'),
+    path('leads/cache-stats/', LeadCacheStatsView.as_view(), name='lead-cache-stats'),
     path('leads/<int:lead_id>/', LeadRetrieveUpdateDeleteView.as_view(), name='lead-detail'),
+    path('tags/cloud/', TagCloudView.as_view(), name='tag-cloud'),
     path('leads/<int:lead_id>/reviews/', ReviewListCreateView.as_view(), name='review-list-create'),
     path('reviews/<int:review_id>/', ReviewRetrieveUpdateDeleteView.as_view(), name='review-detail'),
     path('wishlists/', WishlistView.as_view(), name='wishlist-list'),
     path('wishlists/<int:lead_id>/', WishlistView.as_view(), name='wishlist-manage'),
     path('cart/', CartView.as_view(), name='cart-list'),
+    path('cart/batch/', CartBatchView.as_view(), name='cart-batch'),
     path('cart/<int:lead_id>/', CartView.as_view(), name='cart-manage'),
     path("leads/download/<int:lead_id>/", download_lead_pdf, name="download_leads_pdf"),
+    path("leads/download/", BulkLeadPdfView.as_view(), name="bulk-download-leads-pdf"),
     path('addresses/', AddressView.as_view(), name='addresses'),
     path('orders/fill-details/', FillDetailsView.as_view(), name='fill-details'),
     path('orders/', CreateOrderView.as_view(), name='create-order'),
+    path('orders/checkout/', CheckoutView.as_view(), name='checkout'),
     path('orders/<int:order_id>/pay/', ProcessPaymentView.as_view(), name='process-payment'),
 ]
\ No newline at end of file
@@ -1,26 +1,56 @@
+import hmac
+
 from rest_framework import generics, permissions
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
 from .serializers import UserSerializer
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import CachedBlacklistRefreshToken, CachedJWTAuthentication
+from rest_framework_simplejwt.views import TokenRefreshView as BaseTokenRefreshView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from .models import Lead, Review, Wishlist, Cart, Address
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from .serializers import LeadSerializer, ReviewSerializer
 from .serializers import WishlistSerializer, CartSerializer, AddressSerializer
-from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.platypus import Image, Paragraph, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from io import BytesIO
-import requests
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
 from .models import Order
 from .serializers import OrderSerializer
+from .pagination import LeadCursorPagination, LeadDistancePagination, ReviewCursorPagination
+from .filters import filter_leads, filter_reviews, geo_query, lead_facets
+from .geo import ranking_for, with_distances
+from .search import search_leads
+from .similarity import similar_leads
+from .tags import tag_cloud
+from .ratings import apply_rating_change
+from django.db import transaction
+from .cache import cached_payload, cache_stats
+from rest_framework.permissions import IsAdminUser
+from .pdf import get_pdf_cache, lead_snapshot
+from .bulk_pdf import stream_merged, stream_zip
+from .importers import FORMATS as IMPORT_FORMATS, ImportFileError, detect_format, import_leads
+from rest_framework.parsers import MultiPartParser
+from .exporters import CSVRenderer, NDJSONRenderer, export_queryset, stream_csv, stream_ndjson
+from .orders import checkout_cart
+from .carts import apply_cart_operations, cart_summary
+from .serializers import CartBatchSerializer, RefreshSerializer
+from .membership import membership_for, with_membership
+from django.conf import settings
 from django.contrib.auth.models import User
+from .metrics import render_metrics
+
+class ReadHeavyAuthenticationMixin:
+    """
+    Resolve the JWT user from the in-process cache (authapp/authentication.py)
+    on safe methods. Writes keep the default authentication, which loads the
+    user from the database, so a deactivated or changed user can't write
+    from a stale cached copy.
+    """
+
+    def get_authenticators(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return [CachedJWTAuthentication()]
+        return super().get_authenticators()
 
 #SignUp
 class SignUpView(generics.CreateAPIView):
@@ -37,7 +67,7 @@ class SigninView(generics.GenericAPIView):
         user = authenticate(username=username, password=password)
         
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = CachedBlacklistRefreshToken.for_user(user)
             return Response({
                 'access': str(refresh.access_token),
                 'refresh': str(refresh)
@@ -56,14 +86,18 @@ class LogoutView(APIView):
             return Response({"error": "Refresh token is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
             return Response({"message": "Logged out successfully"}, status=status.HTTP_200_OK)
         except Exception:
             return Response({"error": "Invalid or expired refresh token"}, status=status.HTTP_400_BAD_REQUEST)
 
+# Refresh (rotates and blacklists the old refresh token)
+class TokenRefreshView(BaseTokenRefreshView):
+    serializer_class = RefreshSerializer
+
 #Get profile
-class ProfileView(generics.RetrieveAPIView):
+class ProfileView(ReadHeavyAuthenticationMixin, generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
@@ -71,14 +105,42 @@ class ProfileView(generics.RetrieveAPIView):
         return self.request.user
     
 #Leads Section
-class LeadListCreateView(generics.GenericAPIView):
+class LeadListCreateView(ReadHeavyAuthenticationMixin, generics.GenericAPIView):
     serializer_class = LeadSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = LeadCursorPagination
 
     def get(self, request):
-        leads = Lead.objects.all()
-        serializer = self.get_serializer(leads, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """
+        List leads one keyset page at a time (?cursor=, ?page_size=), filtered by
+        ?location=, ?property_type=, ?property_status=, ?budget_min=, ?budget_max=.
+        Facet counts are returned with the first page only (?facets=0 skips them).
+        ?near=<lat>,<lon> with ?radius_km= and/or ?nearest=<k> lists leads by
+        distance instead, each with distance_km.
+        """
+        payload = cached_payload('leads', [request.build_absolute_uri()], lambda: self.build_page(request))
+        # The cached page is shared by all users; per-user flags cost one extra query
+        payload = {**payload, 'results': with_membership(request.user, payload['results'])}
+        return Response(payload, status=status.HTTP_200_OK)
+
+    def build_page(self, request):
+        leads = filter_leads(Lead.objects.all(), request.query_params)
+        query = geo_query(request.query_params)
+        if query is not None:
+            return self.build_distance_page(request, leads, query)
+        page = self.paginate_queryset(leads)
+        serializer = self.get_serializer(page, many=True)
+        payload = self.paginator.get_paginated_payload(list(serializer.data))
+        if 'cursor' not in request.query_params and request.query_params.get('facets') != '0':
+            payload['facets'] = lead_facets(leads)
+        return payload
+
+    def build_distance_page(self, request, leads, query):
+        paginator = LeadDistancePagination()
+        page = paginator.paginate_ranking(ranking_for(leads, query), request, limit=query[3])
+        by_id = Lead.objects.in_bulk([lead_id for _, lead_id in page])
+        serializer = self.get_serializer([by_id[lead_id] for _, lead_id in page], many=True)
+        return paginator.get_paginated_payload(with_distances(serializer.data, page))
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -87,7 +149,7 @@ class LeadListCreateView(generics.GenericAPIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class LeadRetrieveUpdateDeleteView(generics.GenericAPIView):
+class LeadRetrieveUpdateDeleteView(ReadHeavyAuthenticationMixin, generics.GenericAPIView):
     serializer_class = LeadSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
@@ -98,11 +160,16 @@ class LeadRetrieveUpdateDeleteView(generics.GenericAPIView):
             return None
 
     def get(self, request, lead_id):
+        data = cached_payload('lead', [lead_id], lambda: self.build_detail(lead_id))
+        if data is None:
+            return Response({"error": "Lead not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(with_membership(request.user, [data])[0], status=status.HTTP_200_OK)
+
+    def build_detail(self, lead_id):
         lead = self.get_object(lead_id)
         if not lead:
-            return Response({"error": "Lead not found"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = self.get_serializer(lead)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+            return None
+        return {**self.get_serializer(lead).data, "similar_leads": similar_leads(lead.pk)}
 
     def put(self, request, lead_id):
         lead = self.get_object(lead_id)
@@ -123,15 +190,111 @@ class LeadRetrieveUpdateDeleteView(generics.GenericAPIView):
         lead.delete()
         return Response({"message": "Lead deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
-class ReviewListCreateView(generics.GenericAPIView):
+class LeadImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        """Bulk-create leads from an uploaded CSV or NDJSON file ("file", optional "format")"""
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "A file upload named 'file' is required"}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get("format") or detect_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response({"error": "format must be 'csv' or 'ndjson'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload.open("rb")
+        try:
+            report = import_leads(upload, file_format, batch_size=settings.LEAD_IMPORT_BATCH_SIZE)
+        except ImportFileError as exc:
+            # Rows before the unreadable one were imported; report them too
+            return Response({"error": str(exc), "row": exc.row, **exc.report}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+class LeadMembershipView(ReadHeavyAuthenticationMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    max_ids = 200
+
+    def get(self, request):
+        """Wishlist/cart flags for many leads at once (?ids=1,2,3)"""
+        try:
+            lead_ids = [int(part) for part in request.query_params.get("ids", "").split(",") if part.strip()]
+        except ValueError:
+            return Response({"error": "ids must be a comma-separated list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not lead_ids or len(lead_ids) > self.max_ids:
+            return Response({"error": f"Provide between 1 and {self.max_ids} ids"}, status=status.HTTP_400_BAD_REQUEST)
+
+        flags = membership_for(request.user, lead_ids)
+        return Response([{"lead": lead_id, **flags[lead_id]} for lead_id in dict.fromkeys(lead_ids) if lead_id in flags],
+                        status=status.HTTP_200_OK)
+
+class LeadExportView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]  # Picked by ?format=csv|ndjson or Accept
+
+    def get(self, request):
+        """Stream every matching lead as CSV or NDJSON (lead list filters + ?created_after=/?created_before=)"""
+        rows = export_queryset(Lead.objects.all(), request.query_params)
+        export_format = request.accepted_renderer.format
+        stream = stream_csv(rows) if export_format == "csv" else stream_ndjson(rows)
+        response = StreamingHttpResponse(stream, content_type=request.accepted_media_type)
+        response["Content-Disposition"] = f'attachment; filename="leads.{export_format}"'
+        return response
+
+class LeadCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """Hit/miss counters and size of the lead response cache"""
+        return Response(cache_stats(), status=status.HTTP_200_OK)
+
+class LeadSearchView(ReadHeavyAuthenticationMixin, generics.GenericAPIView):
+    serializer_class = LeadSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        """Full-text search over leads (?q=), BM25-ranked with highlighted snippets"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', settings.LEAD_PAGE_SIZE)), 1), settings.LEAD_MAX_PAGE_SIZE)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({"error": "limit and offset must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        hits = search_leads(query, limit=limit, offset=offset)
+        results = []
+        for lead, rank, snippets in hits:
+            data = self.get_serializer(lead).data
+            data['rank'] = rank
+            data['highlights'] = snippets
+            results.append(data)
+        return Response({"query": query, "offset": offset, "limit": limit, "results": results}, status=status.HTTP_200_OK)
+
+class TagCloudView(ReadHeavyAuthenticationMixin, APIView):
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        """Most used tags with lead counts (?limit=, max 200)"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 200)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(tag_cloud(limit), status=status.HTTP_200_OK)
+
+class ReviewListCreateView(ReadHeavyAuthenticationMixin, generics.GenericAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get(self, request, lead_id):
-        """Get all reviews for a specific lead"""
-        reviews = Review.objects.filter(lead_id=lead_id)
-        serializer = self.get_serializer(reviews, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """A lead's reviews, cursor-paginated (?sort=newest|highest|lowest, ?min_rating=, ?page_size=)"""
+        reviews = filter_reviews(Review.objects.filter(lead_id=lead_id), request.query_params)
+        paginator = ReviewCursorPagination()
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request, lead_id):
         """Create a new review for a specific lead"""
@@ -144,7 +307,9 @@ class ReviewListCreateView(generics.GenericAPIView):
         serializer = self.get_serializer(data=data)
 
         if serializer.is_valid():
-            serializer.save(lead=lead, user=request.user)  # 🔹 Explicitly pass lead & user
+            with transaction.atomic():
+                review = serializer.save(lead=lead, user=request.user)  # 🔹 Explicitly pass lead & user
+                apply_rating_change(lead.id, added=review.rating)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -153,9 +318,10 @@ class ReviewRetrieveUpdateDeleteView(generics.GenericAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-    def get_object(self, review_id):
+    def get_object(self, review_id, for_update=False):
+        reviews = Review.objects.select_for_update() if for_update else Review.objects
         try:
-            return Review.objects.get(id=review_id)
+            return reviews.get(id=review_id)
         except Review.DoesNotExist:
             return None
 
@@ -170,32 +336,40 @@ class ReviewRetrieveUpdateDeleteView(generics.GenericAPIView):
 
     def put(self, request, review_id):
         """Update a review (only by the review creator)"""
-        review = self.get_object(review_id)
-        if not review:
-            return Response({"error": "Review not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        if request.user != review.user:
-            return Response({"error": "You can only update your own review"}, status=status.HTTP_403_FORBIDDEN)
-
-        serializer = self.get_serializer(review, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # The old rating is read under the row lock, so concurrent edits of the
+        # same review each apply their delta to the rating the other left
+        with transaction.atomic():
+            review = self.get_object(review_id, for_update=True)
+            if not review:
+                return Response({"error": "Review not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            if request.user.pk != review.user_id:
+                return Response({"error": "You can only update your own review"}, status=status.HTTP_403_FORBIDDEN)
+
+            old_rating = review.rating
+            serializer = self.get_serializer(review, data=request.data, partial=True)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            review = serializer.save()
+            if review.rating != old_rating:
+                apply_rating_change(review.lead_id, added=review.rating, removed=old_rating)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def delete(self, request, review_id):
         """Delete a review (only by the review creator)"""
-        review = self.get_object(review_id)
-        if not review:
-            return Response({"error": "Review not found"}, status=status.HTTP_404_NOT_FOUND)
+        with transaction.atomic():
+            review = self.get_object(review_id, for_update=True)
+            if not review:
+                return Response({"error": "Review not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if request.user != review.user:
-            return Response({"error": "You can only delete your own review"}, status=status.HTTP_403_FORBIDDEN)
+            if request.user.pk != review.user_id:
+                return Response({"error": "You can only delete your own review"}, status=status.HTTP_403_FORBIDDEN)
 
-        review.delete()
+            review.delete()
+            apply_rating_change(review.lead_id, removed=review.rating)
         return Response({"message": "Review deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
-class WishlistView(generics.GenericAPIView):
+class WishlistView(ReadHeavyAuthenticationMixin, generics.GenericAPIView):
     serializer_class = WishlistSerializer
     permission_classes = [IsAuthenticated]
 
@@ -228,7 +402,7 @@ class WishlistView(generics.GenericAPIView):
         except Wishlist.DoesNotExist:
             return Response({"error": "Lead not in wishlist"}, status=status.HTTP_404_NOT_FOUND)    
         
-class CartView(generics.GenericAPIView):
+class CartView(ReadHeavyAuthenticationMixin, generics.GenericAPIView):
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated]
 
@@ -245,14 +419,16 @@ class CartView(generics.GenericAPIView):
         except Lead.DoesNotExist:
             return Response({"error": "Lead not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        quantity = request.data.get("quantity", 1)  # Default quantity = 1
-
-        cart_item, created = Cart.objects.get_or_create(user=request.user, lead=lead, defaults={"quantity": quantity})
-
-        if not created:
-            cart_item.quantity += int(quantity)  # Increase quantity if already in cart
-            cart_item.save()
-
+        try:
+            quantity = int(request.data.get("quantity", 1))  # Default quantity = 1
+        except (TypeError, ValueError):
+            return Response({"error": "quantity must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1:
+            return Response({"error": "quantity must be at least 1"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Database-side increment, so concurrent adds from several tabs all count
+        apply_cart_operations(request.user, [{"lead": lead.id, "action": "add", "quantity": quantity}])
+        cart_item = Cart.objects.get(user=request.user, lead=lead)
         return Response(CartSerializer(cart_item).data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, lead_id):
@@ -264,81 +440,63 @@ class CartView(generics.GenericAPIView):
         except Cart.DoesNotExist:
             return Response({"error": "Lead not in cart"}, status=status.HTTP_404_NOT_FOUND)
         
+class CartBatchView(generics.GenericAPIView):
+    serializer_class = CartBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Add, set or remove many cart lines at once; returns the full cart with totals"""
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        apply_cart_operations(request.user, serializer.validated_data["operations"])
+        return Response(cart_summary(request.user), status=status.HTTP_200_OK)
+
 def download_lead_pdf(request, lead_id):
-    """Generate and download a professional-looking PDF for a specific lead"""
+    """Download a professional-looking PDF for a specific lead, rendered once per lead version"""
     try:
         lead = Lead.objects.get(id=lead_id)
     except Lead.DoesNotExist:
         return HttpResponse("Lead not found", status=404)
 
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="lead_{lead_id}.pdf"'
-
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter  # Page size
-
-    # 🔹 **Set Header Title**
-    pdf.setFont("Helvetica-Bold", 20)
-    pdf.setFillColor(colors.darkblue)
-    pdf.drawString(200, height - 50, "Lead Details Report")
-    pdf.setStrokeColor(colors.black)
-    pdf.line(50, height - 55, 550, height - 55)  # Add line below title
-
-    # 🔹 **Lead Details in a Box**
-    pdf.setFont("Helvetica", 12)
-    pdf.setFillColor(colors.black)
-    pdf.rect(50, height - 280, 500, 200, stroke=True, fill=False)  # Box for details
-
-    details = [
-        ["Name:", lead.name],
-        ["Location:", lead.location],
-        ["Property Type:", lead.property_type],
-        ["Property Status:", lead.property_status],
-        ["Service Required On:", lead.service_required_on],
-        ["Budget:", f"Rs {lead.budget}"],
-        ["Requirement:", lead.requirement],
-        ["Tags:", lead.tags if lead.tags else "N/A"],
-        ["Price:", f"Rs {lead.price} (Discounted: Rs {lead.discount_price})"],
-    ]
-
-    table = Table(details, colWidths=[150, 350])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 5),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-    ]))
-
-    table.wrapOn(pdf, 50, height - 280)
-    table.drawOn(pdf, 55, height - 270)
-
-    # 🔹 **Include Image if Available**
-    if lead.image_url:
+    path = get_pdf_cache().get_or_render(lead_snapshot(lead))
+    try:
+        pdf_file = open(path, "rb")
+    except FileNotFoundError:  # Evicted between render and open
+        pdf_file = open(get_pdf_cache().get_or_render(lead_snapshot(lead)), "rb")
+    return FileResponse(pdf_file, as_attachment=True, filename=f"lead_{lead_id}.pdf", content_type="application/pdf")
+
+class BulkLeadPdfView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Download several leads as a ZIP of PDFs ("format": "zip") or one merged PDF ("format": "pdf")"""
+        lead_ids = request.data.get("lead_ids")
+        export_format = request.data.get("format", "zip")
+        if not isinstance(lead_ids, list) or not lead_ids:
+            return Response({"error": "lead_ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if export_format not in ("zip", "pdf"):
+            return Response({"error": "format must be 'zip' or 'pdf'"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(lead_ids) > settings.LEAD_BULK_EXPORT_MAX_LEADS:
+            return Response({"error": f"At most {settings.LEAD_BULK_EXPORT_MAX_LEADS} leads per export"},
+                            status=status.HTTP_400_BAD_REQUEST)
         try:
-            img_response = requests.get(lead.image_url, stream=True)
-            if img_response.status_code == 200:
-                img_data = BytesIO(img_response.content)
-                img = Image(img_data, width=200, height=150)
-                img.drawOn(pdf, 200, height - 480)  # Adjust position
-                pdf.setFont("Helvetica", 10)
-                pdf.drawString(220, height - 500, "Property Image")
-        except Exception as e:
-            pdf.drawString(100, height - 500, "Image could not be loaded.")
-
-    # 🔹 **Footer**
-    pdf.setFont("Helvetica-Oblique", 10)
-    pdf.setFillColor(colors.grey)
-    pdf.drawString(200, 30, "Generated by Interior Leads System | © 2025")
-
-    pdf.showPage()
-    pdf.save()
-
-    buffer.seek(0)
-    response.write(buffer.read())
-    return response
+            lead_ids = list(dict.fromkeys(int(lead_id) for lead_id in lead_ids))
+        except (TypeError, ValueError):
+            return Response({"error": "lead_ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        leads = Lead.objects.in_bulk(lead_ids)
+        missing = [lead_id for lead_id in lead_ids if lead_id not in leads]
+        if missing:
+            return Response({"error": "Lead not found", "missing": missing}, status=status.HTTP_404_NOT_FOUND)
+
+        snapshots = [lead_snapshot(leads[lead_id]) for lead_id in lead_ids]
+        if export_format == "zip":
+            response = StreamingHttpResponse(stream_zip(snapshots), content_type="application/zip")
+        else:
+            response = StreamingHttpResponse(stream_merged(snapshots), content_type="application/pdf")
+        response["Content-Disposition"] = f'attachment; filename="leads.{export_format}"'
+        return response
 
 class AddressView(APIView):
     permission_classes = [IsAuthenticated]
@@ -406,6 +564,32 @@ class CreateOrderView(generics.CreateAPIView):
             return Response({"order_id": order.id, "message": "Order created successfully"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class CheckoutView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Convert the user's cart into an order and empty the cart, in one transaction"""
+        billing_address = request.data.get("billing_address")
+        shipping_address = request.data.get("shipping_address")
+        if billing_address is None or shipping_address is None:
+            # Fall back to the saved addresses (one extra query)
+            saved = {address.address_type: AddressSerializer(address).data for address in Address.objects.filter(user=request.user)}
+            billing_address = billing_address if billing_address is not None else saved.get("billing")
+            shipping_address = shipping_address if shipping_address is not None else saved.get("shipping", billing_address)
+        if not isinstance(billing_address, dict) or not isinstance(shipping_address, dict):
+            return Response({"error": "billing_address and shipping_address are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        order, lines = checkout_cart(request.user, billing_address, shipping_address)
+        return Response({
+            "order_id": order.id,
+            "message": "Order created successfully",
+            "items": [{"lead_id": lead_id, "price": price, "quantity": quantity} for lead_id, price, quantity in lines],
+            "subtotal": order.subtotal,
+            "cgst": order.cgst,
+            "sgst": order.sgst,
+            "total": order.total,
+        }, status=status.HTTP_201_CREATED)
+
 class ProcessPaymentView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
@@ -416,4 +600,16 @@ class ProcessPaymentView(generics.GenericAPIView):
             order.save()
             return Response({"order_id": order.id, "payment_status": "Paid", "message": "Payment successful"}, status=status.HTTP_200_OK)
         except Order.DoesNotExist:
-            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+def metrics(request):
+    """Prometheus scrape endpoint, merged across worker processes (see authapp.metrics)"""
+    # Fails closed: the METRICS_TOKEN bearer token or a staff session is required
+    token = settings.METRICS_TOKEN
+    presented = request.headers.get("Authorization", "")
+    token_ok = bool(token) and hmac.compare_digest(presented.encode(), f"Bearer {token}".encode())
+    if not (token_ok or request.user.is_staff):
+        return HttpResponse("Unauthorized", status=401)
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
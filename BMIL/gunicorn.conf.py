@@ -0,0 +1,24 @@
+"""
+gunicorn settings, loaded automatically when gunicorn is started from this
+directory. Workers share Prometheus metrics through mmap files in
+PROMETHEUS_MULTIPROC_DIR (see authapp/metrics.py), which has to be set before
+the workers import the app and is emptied whenever the server starts. The
+worker count is passed on to settings as WEB_CONCURRENCY.
+"""
+import os
+import shutil
+from pathlib import Path
+
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', str(Path(__file__).resolve().parent / 'var' / 'metrics'))
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    # Read by settings.WEB_WORKERS in the forked workers
+    os.environ['WEB_CONCURRENCY'] = str(server.cfg.workers)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)